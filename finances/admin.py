@@ -1,11 +1,16 @@
 from django.contrib import admin
 
-from .models import Category, Transaction, Investment, Budget
+from .models import Category, Transaction, Investment, InvestmentValuation, Budget, MonthlySummary, DailyBalance, DataVersion, ExportJob
 
 admin.site.register(Category)
 admin.site.register(Transaction)
 admin.site.register(Investment)
+admin.site.register(InvestmentValuation)
 admin.site.register(Budget)
+admin.site.register(MonthlySummary)
+admin.site.register(DailyBalance)
+admin.site.register(DataVersion)
+admin.site.register(ExportJob)
 
 
 
@@ -0,0 +1,508 @@
+"""
+Servicios de agregación compartidos por las vistas y las APIs de gráficos.
+
+Cada función arma una sola consulta agrupada y completa en Python los huecos
+(meses sin movimientos), de modo que el número de consultas no depende del
+largo del rango pedido. Las agregaciones por mes completo leen la tabla
+materializada MonthlySummary; las de rangos arbitrarios van contra Transaction.
+
+Los totales se devuelven en centavos enteros (money.cents_sum): quien los
+muestra los convierte con money.to_float o money.to_decimal.
+"""
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from django.db.models import Count, DecimalField, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, TruncDay, TruncMonth, TruncWeek
+from django.utils import timezone
+
+from .models import Budget, Category, Investment, MonthlySummary, Transaction
+from .money import cents_sum, percentage, to_float
+
+TRANSACTION_TYPES = [code for code, _ in Transaction.TRANSACTION_TYPES]
+
+
+def _as_date(value):
+    if isinstance(value, datetime):
+        if timezone.is_aware(value):
+            return timezone.localdate(value)
+        return value.date()
+    return value
+
+
+def month_start(value):
+    """Primer día del mes de `value` (acepta date o datetime)."""
+    return _as_date(value).replace(day=1)
+
+
+def next_month(value):
+    """Primer día del mes siguiente a `value`."""
+    return (month_start(value) + timedelta(days=32)).replace(day=1)
+
+
+def month_end(value):
+    """Último día del mes de `value`."""
+    return next_month(value) - timedelta(days=1)
+
+
+def iter_months(start, end):
+    """Genera el primer día de cada mes entre `start` y `end` (inclusive)."""
+    current = month_start(start)
+    last = month_start(end)
+    while current <= last:
+        yield current
+        current = next_month(current)
+
+
+def empty_totals():
+    return {transaction_type: 0 for transaction_type in TRANSACTION_TYPES}
+
+
+def _type_sums(field):
+    return {
+        transaction_type: cents_sum(field, filter=Q(transaction_type=transaction_type))
+        for transaction_type in TRANSACTION_TYPES
+    }
+
+
+def monthly_totals_queryset(user, start, end):
+    """
+    Consulta agrupada mes × tipo de transacción sobre MonthlySummary.
+
+    Devuelve una fila por mes con movimientos: {'month', 'INCOME', 'EXPENSE', 'INVESTMENT'}.
+    """
+    return (
+        MonthlySummary.objects
+        .filter(user=user, month__range=[month_start(start), month_start(end)])
+        .values('month')
+        .annotate(**_type_sums('total'))
+        .order_by('month')
+    )
+
+
+def live_monthly_totals_queryset(user, start, end):
+    """Igual que monthly_totals_queryset pero calculado en vivo sobre Transaction."""
+    return (
+        Transaction.objects
+        .filter(user=user, date__range=[month_start(start), month_end(end)])
+        .annotate(month=TruncMonth('date'))
+        .values('month')
+        .annotate(**_type_sums('amount'))
+        .order_by('month')
+    )
+
+
+def build_monthly_grid(rows, start, end):
+    """
+    Convierte las filas agrupadas en un OrderedDict {primer_dia_mes: {tipo: centavos}}
+    con todos los meses del rango, rellenando con ceros los que no tienen datos.
+    """
+    grid = OrderedDict((month, empty_totals()) for month in iter_months(start, end))
+    for row in rows:
+        month = month_start(row['month'])
+        if month not in grid:
+            continue
+        for transaction_type in TRANSACTION_TYPES:
+            grid[month][transaction_type] = row[transaction_type]
+    return grid
+
+
+def monthly_totals(user, start, end):
+    """Totales por mes y tipo entre `start` y `end` en una sola consulta."""
+    return build_monthly_grid(monthly_totals_queryset(user, start, end), start, end)
+
+
+async def amonthly_totals(user, start, end):
+    """Versión async de monthly_totals (ORM async, para las vistas bajo ASGI)."""
+    rows = [row async for row in monthly_totals_queryset(user, start, end)]
+    return build_monthly_grid(rows, start, end)
+
+
+def category_rollup_queryset(transactions, transaction_type='EXPENSE', category_type=None):
+    """Consulta agrupada por categoría (sin evaluar) sobre un queryset de transacciones ya filtrado."""
+    transactions = transactions.filter(transaction_type=transaction_type)
+    if category_type:
+        transactions = transactions.filter(category__category_type=category_type)
+    return (
+        transactions
+        .values('category_id', 'category__name', 'category__color', 'category__icon')
+        .annotate(total=cents_sum('amount'))
+        .order_by('category__name')
+    )
+
+
+def _rollup_rows(rows):
+    return [
+        {
+            'id': row['category_id'],
+            'name': row['category__name'],
+            'color': row['category__color'],
+            'icon': row['category__icon'],
+            'total': row['total'],
+        }
+        for row in rows
+        if row['total'] > 0
+    ]
+
+
+def category_rollup(transactions, transaction_type='EXPENSE', category_type=None):
+    """
+    Suma por categoría sobre un queryset de transacciones ya filtrado.
+
+    Agrupa por `category_id` trayendo nombre, color e ícono en el mismo JOIN,
+    así que cuesta una consulta sin importar cuántas categorías tenga el usuario.
+    Solo devuelve categorías con total (en centavos) mayor a cero, ordenadas por nombre.
+    """
+    return _rollup_rows(category_rollup_queryset(transactions, transaction_type, category_type))
+
+
+def _user_transactions(user, start=None, end=None):
+    transactions = Transaction.objects.filter(user=user)
+    if start:
+        transactions = transactions.filter(date__gte=_as_date(start))
+    if end:
+        transactions = transactions.filter(date__lte=_as_date(end))
+    return transactions
+
+
+def user_category_rollup(user, start=None, end=None, transaction_type='EXPENSE', category_type=None):
+    """Rollup por categoría de las transacciones del usuario entre `start` y `end`."""
+    return category_rollup(_user_transactions(user, start, end), transaction_type, category_type)
+
+
+async def auser_category_rollup(user, start=None, end=None, transaction_type='EXPENSE', category_type=None):
+    """Versión async de user_category_rollup."""
+    queryset = category_rollup_queryset(_user_transactions(user, start, end), transaction_type, category_type)
+    return _rollup_rows([row async for row in queryset])
+
+
+# Granularidades del gasto por categoría (?granularity=) y grupo que junta lo que queda fuera de ?top=
+SPENDING_GRANULARITIES = {'day': TruncDay, 'week': TruncWeek, 'month': TruncMonth}
+OTHER_CATEGORY = {'id': None, 'name': 'Otros', 'color': '#6c757d', 'icon': 'fas fa-ellipsis-h'}
+
+
+def period_start(day, granularity):
+    """Inicio del período (día, semana desde el lunes o mes) que contiene `day`."""
+    if granularity == 'week':
+        return day - timedelta(days=day.weekday())
+    if granularity == 'month':
+        return day.replace(day=1)
+    return day
+
+
+def iter_periods(start, end, granularity):
+    """Genera el inicio de cada período entre `start` y `end` (inclusive)."""
+    if granularity == 'month':
+        yield from iter_months(start, end)
+        return
+    step = timedelta(days=7 if granularity == 'week' else 1)
+    current = period_start(start, granularity)
+    while current <= end:
+        yield current
+        current += step
+
+
+def category_spending_queryset(user, start, end, granularity=None):
+    """
+    Gasto por categoría (× período si hay `granularity`) entre `start` y `end`:
+    una sola consulta agrupada, sin evaluar.
+    """
+    transactions = _user_transactions(user, start, end).filter(transaction_type='EXPENSE')
+    columns = ['category_id', 'category__name', 'category__color', 'category__icon']
+    if granularity:
+        transactions = transactions.annotate(period=SPENDING_GRANULARITIES[granularity]('date'))
+        columns.append('period')
+    return transactions.values(*columns).annotate(total=cents_sum('amount')).order_by()
+
+
+def category_spending(rows, start, end, granularity=None, top=None):
+    """
+    Arma la respuesta columnar del gasto por categoría a partir de las filas
+    agrupadas: una lista por atributo de categoría y, con `granularity`, una
+    serie por categoría alineada con `periods` (con ceros en los períodos sin
+    gasto). Las categorías van de mayor a menor gasto; con `top`, las que
+    sobran se suman en una categoría "Otros" al final. Montos en pesos.
+    """
+    start, end = _as_date(start), _as_date(end)
+    periods = list(iter_periods(start, end, granularity)) if granularity else []
+    positions = {period: index for index, period in enumerate(periods)}
+    by_category = {}
+    for row in rows:
+        entry = by_category.get(row['category_id'])
+        if entry is None:
+            entry = by_category[row['category_id']] = {
+                'id': row['category_id'],
+                'name': row['category__name'],
+                'color': row['category__color'],
+                'icon': row['category__icon'],
+                'total': 0,
+                'series': [0] * len(periods),
+            }
+        entry['total'] += row['total']
+        if granularity:
+            entry['series'][positions[_as_date(row['period'])]] += row['total']
+
+    categories = sorted(
+        (entry for entry in by_category.values() if entry['total'] > 0),
+        key=lambda entry: (-entry['total'], entry['name']),
+    )
+    if top is not None and len(categories) > top:
+        rest = categories[top:]
+        other = dict(OTHER_CATEGORY, total=sum(entry['total'] for entry in rest))
+        other['series'] = [sum(column) for column in zip(*(entry['series'] for entry in rest))]
+        categories = categories[:top] + [other]
+
+    data = {
+        'start_date': start.strftime('%Y-%m-%d'),
+        'end_date': end.strftime('%Y-%m-%d'),
+        'granularity': granularity,
+        'categories': {
+            'id': [entry['id'] for entry in categories],
+            'name': [entry['name'] for entry in categories],
+            'color': [entry['color'] for entry in categories],
+            'icon': [entry['icon'] for entry in categories],
+            'total': [to_float(entry['total']) for entry in categories],
+        },
+    }
+    if granularity:
+        data['periods'] = [period.strftime('%Y-%m-%d') for period in periods]
+        data['series'] = [[to_float(cents) for cents in entry['series']] for entry in categories]
+    return data
+
+
+async def acategory_spending(user, start, end, granularity=None, top=None):
+    """Gasto por categoría de `user` en columnas (ver category_spending), con una sola consulta."""
+    queryset = category_spending_queryset(user, start, end, granularity)
+    return category_spending([row async for row in queryset], start, end, granularity, top)
+
+
+def monthly_category_rollup(user, start, end, transaction_type='EXPENSE', category_type=None):
+    """
+    Rollup por categoría para los meses completos entre `start` y `end`,
+    leído de MonthlySummary (misma forma que category_rollup).
+    """
+    summaries = MonthlySummary.objects.filter(
+        user=user,
+        transaction_type=transaction_type,
+        month__range=[month_start(start), month_start(end)],
+    )
+    if category_type:
+        summaries = summaries.filter(category__category_type=category_type)
+    rows = (
+        summaries
+        .values('category_id', 'category__name', 'category__color', 'category__icon')
+        .annotate(total=cents_sum('total'))
+        .order_by('category__name')
+    )
+    return _rollup_rows(rows)
+
+
+def month_overview(user, month, category_transaction_type='EXPENSE', category_type='EXPENSE'):
+    """
+    Totales por tipo y rollup por categoría de un mes en una sola consulta.
+
+    Agrupa MonthlySummary por categoría con una suma condicional por tipo; los
+    totales del mes salen de sumar esas filas en Python. Devuelve
+    (totales por tipo, lista con la forma de category_rollup).
+    """
+    rows = (
+        MonthlySummary.objects
+        .filter(user=user, month=month_start(month))
+        .values('category_id', 'category__name', 'category__color', 'category__icon', 'category__category_type')
+        .annotate(**_type_sums('total'))
+        .order_by('category__name')
+    )
+    totals = empty_totals()
+    categories = []
+    for row in rows:
+        for transaction_type in TRANSACTION_TYPES:
+            totals[transaction_type] += row[transaction_type]
+        total = row[category_transaction_type]
+        if category_type and row['category__category_type'] != category_type:
+            continue
+        if total > 0:
+            categories.append({
+                'id': row['category_id'],
+                'name': row['category__name'],
+                'color': row['category__color'],
+                'icon': row['category__icon'],
+                'total': total,
+            })
+    return totals, categories
+
+
+def _sum_subquery(queryset, field):
+    """Subconsulta correlacionada con la suma de `field` por categoría (0 si no hay filas)."""
+    rows = queryset.filter(category=OuterRef('pk')).values('category').annotate(total=Sum(field)).values('total')
+    return Coalesce(
+        Subquery(rows),
+        Value(Decimal('0')),
+        output_field=DecimalField(max_digits=14, decimal_places=2),
+    )
+
+
+def budget_overview(user, start, end):
+    """
+    Presupuesto contra gasto real por categoría para los meses completos entre
+    `start` y `end`, en una sola consulta sobre Category con dos subconsultas
+    agrupadas (Budget y Transaction, cada una por su índice usuario/categoría/fecha).
+
+    Incluye las categorías de gasto y cualquier otra con presupuesto en el rango.
+    `budget_limit` de la categoría se toma como límite mensual: se compara contra
+    límite × meses del rango.
+    """
+    first = month_start(start)
+    after_last = next_month(end)
+    months = len(list(iter_months(first, end)))
+    budgets = Budget.objects.filter(user=user, month__gte=first, month__lt=after_last)
+    expenses = Transaction.objects.filter(
+        user=user, transaction_type='EXPENSE', date__gte=first, date__lt=after_last,
+    )
+    categories = (
+        Category.objects
+        .filter(user=user)
+        .annotate(
+            allocated=_sum_subquery(budgets, 'allocated_amount'),
+            spent=_sum_subquery(expenses, 'amount'),
+        )
+        .filter(Q(category_type='EXPENSE') | Q(allocated__gt=0))
+        .values('id', 'name', 'color', 'icon', 'budget_limit', 'allocated', 'spent')
+        .order_by('name')
+    )
+    rows = []
+    for row in categories:
+        allocated = row['allocated']
+        spent = row['spent']
+        limit = row['budget_limit'] * months if row['budget_limit'] is not None else None
+        rows.append({
+            **row,
+            'remaining': allocated - spent,
+            'percentage': float(spent / allocated * 100) if allocated else None,
+            'limit': limit,
+            'over_budget': allocated > 0 and spent > allocated,
+            'over_limit': limit is not None and spent > limit,
+        })
+    return rows
+
+
+def _period_stats_queryset(user, start, end):
+    return Transaction.objects.filter(user=user, date__gte=_as_date(start), date__lte=_as_date(end))
+
+
+def _period_stats(row):
+    totals = {transaction_type: row[transaction_type] for transaction_type in TRANSACTION_TYPES}
+    return totals, row['transaction_count']
+
+
+def period_stats(user, start, end):
+    """(totales por tipo, cantidad de transacciones) entre `start` y `end` en un solo aggregate."""
+    return _period_stats(_period_stats_queryset(user, start, end).aggregate(
+        **_type_sums('amount'), transaction_count=Count('id'),
+    ))
+
+
+async def aperiod_stats(user, start, end):
+    """Versión async de period_stats."""
+    return _period_stats(await _period_stats_queryset(user, start, end).aaggregate(
+        **_type_sums('amount'), transaction_count=Count('id'),
+    ))
+
+
+# Series del API por lotes (api/chart-data/) y días que cubre cada período de estadísticas
+CHART_SERIES = ('trend', 'stats_week', 'stats_month', 'stats_year', 'categories', 'investments')
+STATS_PERIODS = {'week': 7, 'month': 30, 'year': 365}
+TREND_DAYS = 180
+
+
+def _to_float(totals):
+    return {transaction_type: to_float(cents) for transaction_type, cents in totals.items()}
+
+
+def chart_series(user, series, today=None):
+    """
+    Calcula las series pedidas (subconjunto de CHART_SERIES) para los gráficos.
+
+    Las series de transacciones salen de una sola consulta agrupada por
+    día × tipo × categoría sobre la ventana más amplia pedida; cada serie se
+    arma en Python filtrando esas filas. `investments` es un aggregate aparte
+    sobre Investment. Cada serie tiene la misma forma que su API individual
+    (financial-data, transaction-stats, category-spending).
+    """
+    today = today or timezone.localdate()
+    series = [name for name in CHART_SERIES if name in set(series)]
+    trend_start = month_start(today - timedelta(days=TREND_DAYS))
+    category_start = today.replace(day=1)
+
+    starts = []
+    if 'trend' in series:
+        starts.append(trend_start)
+    starts += [today - timedelta(days=STATS_PERIODS[name[6:]]) for name in series if name.startswith('stats_')]
+    if 'categories' in series:
+        starts.append(category_start)
+
+    rows = []
+    if starts:
+        # La tendencia incluye el mes en curso completo, igual que MonthlySummary
+        end = month_end(today) if 'trend' in series else today
+        rows = list(
+            Transaction.objects
+            .filter(user=user, date__gte=min(starts), date__lte=end)
+            .values('date', 'transaction_type', 'category_id', 'category__name', 'category__color', 'category__icon')
+            .annotate(total=cents_sum('amount'), count=Count('id'))
+            .order_by()
+        )
+
+    data = {}
+    for name in series:
+        if name == 'trend':
+            grid = build_monthly_grid([], trend_start, today)
+            for row in rows:
+                month = month_start(row['date'])
+                if month in grid:
+                    grid[month][row['transaction_type']] += row['total']
+            data[name] = {
+                'months': [month.strftime('%b') for month in grid],
+                'income': [to_float(totals['INCOME']) for totals in grid.values()],
+                'expense': [to_float(totals['EXPENSE']) for totals in grid.values()],
+            }
+        elif name.startswith('stats_'):
+            period = name[6:]
+            start = today - timedelta(days=STATS_PERIODS[period])
+            totals = empty_totals()
+            count = 0
+            for row in rows:
+                if start <= row['date'] <= today:
+                    totals[row['transaction_type']] += row['total']
+                    count += row['count']
+            totals = _to_float(totals)
+            data[name] = {
+                'total_income': totals['INCOME'],
+                'total_expenses': totals['EXPENSE'],
+                'total_investments': totals['INVESTMENT'],
+                'transaction_count': count,
+                'period': period,
+                'start_date': start.strftime('%Y-%m-%d'),
+                'end_date': today.strftime('%Y-%m-%d'),
+            }
+        elif name == 'categories':
+            data[name] = category_spending(
+                [
+                    row for row in rows
+                    if row['transaction_type'] == 'EXPENSE' and category_start <= row['date'] <= today
+                ],
+                category_start, today,
+            )
+        elif name == 'investments':
+            # Igual que la tarjeta del dashboard: solo inversiones activas
+            totals = Investment.objects.filter(user=user, is_active=True).aggregate(
+                count=Count('id'), initial=cents_sum('initial_amount'), current=cents_sum('current_value'),
+            )
+            initial, current = totals['initial'], totals['current']
+            data[name] = {
+                'count': totals['count'],
+                'total_invested': to_float(initial),
+                'current_value': to_float(current),
+                'roi': percentage(current - initial, initial),
+            }
+    return data
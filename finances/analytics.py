@@ -0,0 +1,290 @@
+"""
+Análisis vectorizado del historial de transacciones con NumPy.
+
+`load` trae las transacciones del usuario en una sola consulta y las guarda en
+arreglos compactos (fecha como ordinal, monto en centavos enteros, tipo y
+categoría como códigos). Sobre esos arreglos `analyze` calcula, sin recorrer
+filas en Python:
+
+- totales mensuales por tipo y su promedio móvil,
+- variación contra el mes anterior,
+- pronóstico del gasto del mes en curso por categoría (nivel reciente más
+  componente estacional del mismo mes en años anteriores),
+- gastos inusuales según el puntaje z dentro de su categoría.
+
+Los montos se suman en centavos (enteros) y solo se pasan a pesos al armar el
+resultado, que es JSON serializable para la API y la plantilla de reportes.
+"""
+from datetime import date
+from functools import cached_property
+
+import numpy as np
+from django.db.models import BigIntegerField, F
+from django.db.models.functions import Cast, Round
+from django.utils import timezone
+
+from .models import Category, Transaction
+
+# Meses analizados por defecto (incluido el mes en curso); con 13 o más hay componente estacional
+DEFAULT_MONTHS = 24
+MAX_MONTHS = 120
+
+# Meses del promedio móvil y del nivel reciente del pronóstico
+ROLLING_WINDOW = 3
+
+# Puntaje z a partir del cual un gasto se considera inusual, y mínimo de gastos en la categoría
+ANOMALY_Z = 3.0
+ANOMALY_MIN_SAMPLES = 5
+MAX_ANOMALIES = 10
+
+TYPES = [code for code, _ in Transaction.TRANSACTION_TYPES]
+TYPE_CODES = {code: index for index, code in enumerate(TYPES)}
+EXPENSE = TYPE_CODES['EXPENSE']
+
+# datetime64[D] cuenta días desde 1970-01-01; los ordinales de Python desde 0001-01-01
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+class TransactionArrays:
+    """Columnas de las transacciones de un usuario, ordenadas por fecha."""
+
+    def __init__(self, ids, ordinals, cents, types, category_codes, category_ids):
+        self.ids = ids
+        self.ordinals = ordinals
+        self.cents = cents
+        self.types = types
+        self.category_codes = category_codes
+        # category_ids[código] -> id de la categoría
+        self.category_ids = category_ids
+
+    def __len__(self):
+        return len(self.ids)
+
+    @cached_property
+    def month_numbers(self):
+        """Mes de cada transacción como meses desde 1970-01 (se calcula una vez)."""
+        return (self.ordinals - _EPOCH_ORDINAL).astype('datetime64[D]').astype('datetime64[M]').astype(np.int64)
+
+    def month_offsets(self, first_month):
+        """Posición del mes de cada transacción contando desde `first_month` (datetime64[M])."""
+        return self.month_numbers - first_month.astype(np.int64)
+
+
+def load(user, start=None, end=None):
+    """Transacciones de `user` entre `start` y `end` (inclusive) en una sola consulta."""
+    transactions = Transaction.objects.filter(user=user)
+    if start is not None:
+        transactions = transactions.filter(date__gte=start)
+    if end is not None:
+        transactions = transactions.filter(date__lte=end)
+    rows = list(
+        transactions
+        .annotate(cents=Cast(Round(F('amount') * 100), BigIntegerField()))
+        .order_by('date', 'id')
+        .values_list('id', 'date', 'transaction_type', 'category_id', 'cents')
+    )
+    count = len(rows)
+    if not count:
+        empty = np.zeros(0, dtype=np.int64)
+        return TransactionArrays(empty, empty.astype(np.int32), empty, empty.astype(np.int8), empty, empty)
+
+    ids, dates, types, categories, cents = zip(*rows)
+    category_ids, category_codes = np.unique(np.fromiter(categories, np.int64, count), return_inverse=True)
+    return TransactionArrays(
+        ids=np.fromiter(ids, np.int64, count),
+        ordinals=np.fromiter(map(date.toordinal, dates), np.int32, count),
+        cents=np.fromiter(cents, np.int64, count),
+        types=np.fromiter(map(TYPE_CODES.__getitem__, types), np.int8, count),
+        category_codes=category_codes,
+        category_ids=category_ids,
+    )
+
+
+def monthly_cube(arrays, first_month, months):
+    """
+    Totales en centavos por (tipo, categoría, mes) para `months` meses desde
+    `first_month` (datetime64[M]), con un solo bincount. Sumando el eje de
+    categorías salen los totales mensuales por tipo.
+    """
+    categories = len(arrays.category_ids)
+    index = (arrays.types.astype(np.int64) * categories + arrays.category_codes) * months
+    index += arrays.month_offsets(first_month)
+    totals = np.bincount(index, weights=arrays.cents, minlength=len(TYPES) * categories * months)
+    return np.rint(totals).astype(np.int64).reshape(len(TYPES), categories, months)
+
+
+def rolling_mean(values, window=ROLLING_WINDOW):
+    """Promedio de los últimos `window` valores en cada posición (NaN mientras no alcanza la ventana)."""
+    result = np.full(len(values), np.nan)
+    if len(values) >= window:
+        sums = np.cumsum(np.concatenate(([0], values)))
+        result[window - 1:] = (sums[window:] - sums[:-window]) / window
+    return result
+
+
+def month_over_month(values):
+    """(diferencia, variación porcentual) contra el mes anterior; NaN sin mes anterior o si era cero."""
+    values = values.astype(float)
+    delta = np.full(len(values), np.nan)
+    pct = np.full(len(values), np.nan)
+    if len(values) > 1:
+        previous = values[:-1]
+        delta[1:] = values[1:] - previous
+        nonzero = previous != 0
+        pct[1:][nonzero] = delta[1:][nonzero] / np.abs(previous[nonzero]) * 100
+    return delta, pct
+
+
+def seasonal_forecast(history, calendar_months, target_month, window=ROLLING_WINDOW):
+    """
+    Pronóstico por fila de `history` (categoría, mes completo) para el mes
+    calendario `target_month` (1-12): promedio de los últimos `window` meses
+    más la diferencia entre el promedio de ese mes calendario y el promedio
+    general. La parte estacional solo se usa con al menos un año de historia.
+    """
+    if history.shape[1] == 0:
+        return np.zeros(history.shape[0])
+    level = history[:, -window:].mean(axis=1)
+    seasonal = np.zeros(history.shape[0])
+    same_month = calendar_months == target_month
+    if history.shape[1] >= 12 and same_month.any():
+        seasonal = history[:, same_month].mean(axis=1) - history.mean(axis=1)
+    return np.maximum(level + seasonal, 0)
+
+
+def expense_zscores(arrays):
+    """
+    (puntaje z, gastos de su categoría) de cada transacción; el puntaje se
+    mide contra los gastos de la misma categoría y es 0 para lo que no es gasto.
+    """
+    is_expense = arrays.types == EXPENSE
+    weights = is_expense.astype(float)
+    codes = arrays.category_codes
+    categories = len(arrays.category_ids)
+    counts = np.bincount(codes, weights=weights, minlength=categories)
+    means = np.bincount(codes, weights=arrays.cents * weights, minlength=categories) / np.maximum(counts, 1)
+    deviations = arrays.cents - means[codes]
+    stds = np.sqrt(np.bincount(codes, weights=deviations ** 2 * weights, minlength=categories) / np.maximum(counts, 1))
+    row_stds = stds[codes]
+    scores = np.divide(deviations, row_stds, out=np.zeros(len(arrays)), where=is_expense & (row_stds > 0))
+    return scores, counts[codes]
+
+
+def _pesos(values):
+    return [None if np.isnan(value) else round(float(value) / 100, 2) for value in values]
+
+
+def _pct(values):
+    return [None if np.isnan(value) else round(float(value), 1) for value in values]
+
+
+def first_month_of(today, months):
+    """Primer mes (datetime64[M]) de una ventana de `months` meses que termina en el mes de `today`."""
+    return np.datetime64(today, 'M') - (months - 1)
+
+
+def compute(arrays, today, months=DEFAULT_MONTHS):
+    """
+    Todo el cálculo sobre `arrays` (sin consultas): series mensuales con su
+    promedio móvil y variación, pronóstico del mes en curso por categoría y
+    posiciones de los gastos inusuales, más recientes primero. Montos en centavos.
+    """
+    first_month = first_month_of(today, months)
+    month_labels = np.arange(first_month, first_month + months)
+    cube = monthly_cube(arrays, first_month, months)
+    totals = cube.sum(axis=1)
+    income, expense = totals[TYPE_CODES['INCOME']], totals[EXPENSE]
+    series = {'income': income, 'expense': expense, 'net': income - expense}
+
+    # El mes en curso está incompleto: se pronostica con los meses anteriores
+    by_category = cube[EXPENSE]
+    history = by_category[:, :-1]
+    calendar_months = month_labels[:-1].astype(np.int64) % 12 + 1
+    forecast = seasonal_forecast(history, calendar_months, today.month)
+
+    scores, samples = expense_zscores(arrays)
+    flagged = np.flatnonzero((scores >= ANOMALY_Z) & (samples >= ANOMALY_MIN_SAMPLES))
+    # Ordenadas por fecha: los más recientes primero
+    flagged = flagged[::-1][:MAX_ANOMALIES]
+
+    return {
+        'months': month_labels,
+        'series': series,
+        'rolling': {name: rolling_mean(values) for name, values in series.items()},
+        'month_over_month': {name: month_over_month(values) for name, values in series.items()},
+        'seasonal': history.shape[1] >= 12,
+        'forecast': forecast,
+        'spent': by_category[:, -1],
+        'anomalies': flagged,
+        'anomaly_scores': scores[flagged],
+    }
+
+
+def analyze(user, today=None, months=DEFAULT_MONTHS):
+    """
+    Análisis de los últimos `months` meses (incluido el actual) listo para JSON,
+    con montos en pesos. Tres consultas: transacciones, categorías y
+    descripciones de los gastos inusuales.
+    """
+    today = today or timezone.localdate()
+    arrays = load(user, first_month_of(today, months).astype('datetime64[D]').item(), today)
+    result = compute(arrays, today, months)
+
+    categories = {
+        row['id']: row
+        for row in Category.objects.filter(id__in=arrays.category_ids.tolist()).values('id', 'name', 'color')
+    } if len(arrays) else {}
+    anomaly_ids = arrays.ids[result['anomalies']].tolist()
+    descriptions = dict(
+        Transaction.objects.filter(id__in=anomaly_ids).values_list('id', 'description')
+    ) if anomaly_ids else {}
+
+    forecast, spent = result['forecast'], result['spent']
+    forecast_rows = []
+    for code in np.argsort(-forecast, kind='stable'):
+        if forecast[code] <= 0 and spent[code] <= 0:
+            continue
+        category = categories[int(arrays.category_ids[code])]
+        forecast_rows.append({
+            'category_id': category['id'],
+            'name': category['name'],
+            'color': category['color'],
+            'forecast': round(float(forecast[code]) / 100, 2),
+            'spent': round(float(spent[code]) / 100, 2),
+        })
+
+    anomalies = []
+    for index, score in zip(result['anomalies'], result['anomaly_scores']):
+        transaction_id = int(arrays.ids[index])
+        category = categories[int(arrays.category_ids[arrays.category_codes[index]])]
+        anomalies.append({
+            'id': transaction_id,
+            'date': date.fromordinal(int(arrays.ordinals[index])).isoformat(),
+            'description': descriptions.get(transaction_id, ''),
+            'category': category['name'],
+            'color': category['color'],
+            'amount': round(float(arrays.cents[index]) / 100, 2),
+            'z': round(float(score), 2),
+        })
+
+    return {
+        'months': [str(month) for month in result['months']],
+        'transactions': len(arrays),
+        'totals': {name: _pesos(values.astype(float)) for name, values in result['series'].items()},
+        'rolling': {
+            'window': ROLLING_WINDOW,
+            **{name: _pesos(values) for name, values in result['rolling'].items()},
+        },
+        'month_over_month': {
+            name: {'delta': _pesos(delta), 'pct': _pct(pct)}
+            for name, (delta, pct) in result['month_over_month'].items()
+        },
+        'forecast': {
+            'month': str(result['months'][-1]),
+            'seasonal': result['seasonal'],
+            'total': round(float(forecast.sum()) / 100, 2),
+            'spent': round(float(spent.sum()) / 100, 2),
+            'categories': forecast_rows,
+        },
+        'anomalies': anomalies,
+    }
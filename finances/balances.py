@@ -0,0 +1,255 @@
+"""
+Saldo acumulado diario por usuario (DailyBalance).
+
+Hay una fila por usuario y día con movimientos: `net` es el neto del día
+(ingresos − gastos − inversiones) y `balance` el saldo al cierre de ese día.
+Un cambio de X el día D suma X al `net` de D y al `balance` de D y de los días
+siguientes con un UPDATE por rango; los días anteriores no se tocan. El saldo
+en cualquier fecha es el `balance` de la última fila hasta esa fecha, una
+búsqueda por el índice único (usuario, fecha).
+"""
+from collections import OrderedDict, defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Case, F, Q, Sum, Value, When
+
+from .models import DailyBalance, Transaction
+
+# Signo de cada tipo de transacción en el saldo
+SIGNS = {'INCOME': 1, 'EXPENSE': -1, 'INVESTMENT': -1}
+
+# A partir de cuántos días por usuario conviene recalcular el sufijo en memoria
+BULK_DELTA_THRESHOLD = 20
+
+ZERO = Decimal('0')
+
+
+def signed_amount(state):
+    return Decimal(str(state['amount'])) * SIGNS[state['transaction_type']]
+
+
+def deltas_for_change(old=None, new=None):
+    """Deltas {(usuario, día): monto} entre dos estados de una transacción (Transaction.TRACKED_FIELDS)."""
+    deltas = defaultdict(Decimal)
+    if old is not None:
+        deltas[(old['user_id'], old['date'])] -= signed_amount(old)
+    if new is not None:
+        deltas[(new['user_id'], new['date'])] += signed_amount(new)
+    return {key: amount for key, amount in deltas.items() if amount}
+
+
+def deltas_for_transactions(transactions, sign=1):
+    """Deltas acumulados para una lista de transacciones (altas con sign=1, bajas con sign=-1)."""
+    deltas = defaultdict(Decimal)
+    for obj in transactions:
+        state = obj.tracked_state()
+        deltas[(state['user_id'], state['date'])] += sign * signed_amount(state)
+    return {key: amount for key, amount in deltas.items() if amount}
+
+
+def _previous_balance(user_id, day):
+    """Saldo al cierre del último día con movimientos anterior a `day`."""
+    return (
+        DailyBalance.objects
+        .filter(user_id=user_id, date__lt=day)
+        .order_by('-date')
+        .values_list('balance', flat=True)
+        .first()
+    ) or ZERO
+
+
+def _apply_user_deltas(user_id, day_deltas):
+    """
+    Recorre los días cambiados en orden. Las filas entre un día cambiado y el
+    siguiente suben lo acumulado hasta ese día, así que cada fila se toca una vez.
+    """
+    days = sorted(day_deltas)
+    existing = set(DailyBalance.objects.filter(user_id=user_id, date__in=days).values_list('date', flat=True))
+    cumulative = ZERO
+    for i, day in enumerate(days):
+        amount = day_deltas[day]
+        cumulative += amount
+        rows = DailyBalance.objects.filter(user_id=user_id, date__gte=day)
+        if i + 1 < len(days):
+            rows = rows.filter(date__lt=days[i + 1])
+        if day in existing:
+            rows.update(
+                balance=F('balance') + cumulative,
+                net=F('net') + Case(When(date=day, then=Value(amount)), default=Value(ZERO)),
+            )
+        else:
+            rows.update(balance=F('balance') + cumulative)
+            # La fila anterior ya tiene aplicados los cambios de los días previos
+            DailyBalance.objects.create(
+                user_id=user_id, date=day, net=amount, balance=_previous_balance(user_id, day) + amount,
+            )
+    if existing:
+        # Días que quedaron sin movimiento neto (p. ej. la transacción se movió de fecha)
+        DailyBalance.objects.filter(user_id=user_id, date__in=existing, net=0).delete()
+
+
+def _apply_user_deltas_in_bulk(user_id, day_deltas):
+    """
+    Variante para muchos días (importaciones, generación en lote): lee una vez
+    las filas desde el primer día cambiado, las corrige en memoria y las escribe
+    con bulk_update y bulk_create.
+    """
+    days = sorted(day_deltas)
+    rows = {
+        row.date: row
+        for row in DailyBalance.objects.select_for_update().filter(user_id=user_id, date__gte=days[0])
+    }
+    previous = _previous_balance(user_id, days[0])
+    cumulative = ZERO
+    to_update, to_create, to_delete = [], [], []
+    for day in sorted(set(rows) | set(days)):
+        amount = day_deltas.get(day, ZERO)
+        cumulative += amount
+        row = rows.get(day)
+        if row is None:
+            row = DailyBalance(user_id=user_id, date=day, net=amount, balance=previous + amount)
+            to_create.append(row)
+        else:
+            row.net += amount
+            row.balance += cumulative
+            (to_delete if amount and not row.net else to_update).append(row)
+        previous = row.balance
+    DailyBalance.objects.bulk_update(to_update, ['net', 'balance'], batch_size=500)
+    DailyBalance.objects.bulk_create(to_create, batch_size=500)
+    if to_delete:
+        DailyBalance.objects.filter(pk__in=[row.pk for row in to_delete]).delete()
+
+
+def apply_deltas(deltas):
+    """Aplica los deltas {(usuario, día): monto} desplazando solo los días posteriores."""
+    by_user = defaultdict(dict)
+    for (user_id, day), amount in deltas.items():
+        by_user[user_id][day] = by_user[user_id].get(day, ZERO) + amount
+    with transaction.atomic():
+        for user_id, day_deltas in by_user.items():
+            # Serializa los cambios de saldo de un mismo usuario (las filas nuevas leen el saldo anterior)
+            list(User.objects.select_for_update().filter(pk=user_id).values_list('pk', flat=True))
+            if len(day_deltas) > BULK_DELTA_THRESHOLD:
+                _apply_user_deltas_in_bulk(user_id, day_deltas)
+            else:
+                _apply_user_deltas(user_id, day_deltas)
+
+
+def _balance_at_queryset(user, day):
+    return DailyBalance.objects.filter(user=user, date__lte=day).order_by('-date').values_list('balance', flat=True)
+
+
+def balance_at(user, day):
+    """Saldo al cierre de `day`."""
+    return _balance_at_queryset(user, day).first() or ZERO
+
+
+async def abalance_at(user, day):
+    """Versión async de balance_at."""
+    return await _balance_at_queryset(user, day).afirst() or ZERO
+
+
+def _series_queryset(user, start, end):
+    return DailyBalance.objects.filter(user=user, date__range=[start, end]).order_by('date').values_list('date', 'balance')
+
+
+def _fill_series(opening, rows, start, end):
+    series = OrderedDict()
+    balances = dict(rows)
+    balance = opening
+    day = start
+    while day <= end:
+        balance = balances.get(day, balance)
+        series[day] = balance
+        day += timedelta(days=1)
+    return series
+
+
+def balance_series(user, start, end):
+    """OrderedDict {día: saldo al cierre} con todos los días entre `start` y `end`."""
+    opening = balance_at(user, start - timedelta(days=1))
+    return _fill_series(opening, _series_queryset(user, start, end), start, end)
+
+
+async def abalance_series(user, start, end):
+    """Versión async de balance_series."""
+    opening = await abalance_at(user, start - timedelta(days=1))
+    rows = [row async for row in _series_queryset(user, start, end)]
+    return _fill_series(opening, rows, start, end)
+
+
+def live_daily_rows(users=None):
+    """Neto por (usuario, día) calculado directamente sobre Transaction, ordenado por usuario y fecha."""
+    transactions = Transaction.objects.all()
+    if users is not None:
+        transactions = transactions.filter(user__in=users)
+    # Una suma por tipo (exacta en cualquier motor); el signo se aplica en Python
+    rows = (
+        transactions
+        .values('user_id', 'date')
+        .annotate(**{
+            transaction_type: Sum('amount', filter=Q(transaction_type=transaction_type))
+            for transaction_type in SIGNS
+        })
+        .order_by('user_id', 'date')
+    )
+    for row in rows.iterator():
+        yield {
+            'user_id': row['user_id'],
+            'date': row['date'],
+            'net': sum((sign * (row[transaction_type] or ZERO) for transaction_type, sign in SIGNS.items()), ZERO),
+        }
+
+
+def _running(rows):
+    """Recorre las filas en vivo devolviendo (usuario, día, neto, saldo) de los días con neto distinto de cero."""
+    user_id = None
+    balance = ZERO
+    for row in rows:
+        if row['user_id'] != user_id:
+            user_id = row['user_id']
+            balance = ZERO
+        if not row['net']:
+            continue
+        balance += row['net']
+        yield user_id, row['date'], row['net'], balance
+
+
+def rebuild(users=None, batch_size=1000):
+    """Borra y recalcula los saldos diarios (de todos los usuarios o solo de `users`)."""
+    with transaction.atomic():
+        stored = DailyBalance.objects.all()
+        if users is not None:
+            stored = stored.filter(user__in=users)
+        stored.delete()
+        rows = [
+            DailyBalance(user_id=user_id, date=day, net=net, balance=balance)
+            for user_id, day, net, balance in _running(live_daily_rows(users))
+        ]
+        DailyBalance.objects.bulk_create(rows, batch_size=batch_size)
+    return len(rows)
+
+
+def find_drift(users=None):
+    """
+    Compara DailyBalance contra el saldo calculado en vivo.
+    Devuelve una lista de ((usuario, día), (neto, saldo) guardado, (neto, saldo) en vivo).
+    """
+    stored = DailyBalance.objects.all()
+    if users is not None:
+        stored = stored.filter(user__in=users)
+    stored_map = {
+        (row['user_id'], row['date']): (row['net'], row['balance'])
+        for row in stored.values('user_id', 'date', 'net', 'balance')
+    }
+    live_map = {(user_id, day): (net, balance) for user_id, day, net, balance in _running(live_daily_rows(users))}
+    drift = []
+    for key in sorted(set(stored_map) | set(live_map)):
+        stored_value = stored_map.get(key, (ZERO, ZERO))
+        live_value = live_map.get(key, (ZERO, ZERO))
+        if stored_value != live_value:
+            drift.append((key, stored_value, live_value))
+    return drift
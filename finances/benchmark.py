@@ -0,0 +1,607 @@
+"""
+Datos sintéticos y arnés de rendimiento.
+
+`seed_users` genera usuarios con categorías, transacciones recurrentes y
+sueltas, inversiones y presupuestos usando bulk_create por lotes.
+`run_benchmark` recorre las vistas principales con el cliente de pruebas de
+Django midiendo latencia y número de consultas, y `compare` contrasta el
+resultado contra una línea base guardada en JSON. `load_test` hace peticiones
+HTTP reales contra un servidor levantado (comparación WSGI vs ASGI) y
+`benchmark_analytics` compara el análisis con NumPy contra bucles con el ORM.
+`money_microbenchmarks` mide sumas y serialización con centavos enteros
+frente a Decimal.
+"""
+import itertools
+import json
+import random
+import time
+import timeit
+import urllib.error
+import urllib.request
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from decimal import Decimal
+from importlib import import_module
+from urllib.parse import urlencode
+
+import numpy as np
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.db import transaction as db_transaction
+from django.db.models import Sum
+from django.http import JsonResponse
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from . import analytics, budgets, fastjson, money
+from .aggregations import iter_months, month_start, next_month
+from .models import Budget, Category, Investment, Transaction
+from .recurring import next_occurrence_after, occurrence_for
+from .signals import transactions_bulk_created
+
+DEFAULT_PREFIX = 'bench'
+DEFAULT_PASSWORD = 'benchmark-123'
+DEFAULT_BATCH_SIZE = 5000
+
+# (nombre, tipo, color, ícono)
+CATEGORY_TEMPLATES = [
+    ('Salario', 'INCOME', '#28a745', 'fas fa-money-bill'),
+    ('Freelance', 'INCOME', '#20c997', 'fas fa-laptop'),
+    ('Renta', 'EXPENSE', '#dc3545', 'fas fa-home'),
+    ('Supermercado', 'EXPENSE', '#fd7e14', 'fas fa-shopping-cart'),
+    ('Transporte', 'EXPENSE', '#ffc107', 'fas fa-car'),
+    ('Restaurantes', 'EXPENSE', '#e83e8c', 'fas fa-utensils'),
+    ('Servicios', 'EXPENSE', '#6f42c1', 'fas fa-bolt'),
+    ('Suscripciones', 'EXPENSE', '#6610f2', 'fas fa-tv'),
+    ('Salud', 'EXPENSE', '#17a2b8', 'fas fa-heartbeat'),
+    ('Entretenimiento', 'EXPENSE', '#FF6B6B', 'fas fa-film'),
+    ('Fondo de inversión', 'INVESTMENT', '#007bff', 'fas fa-chart-line'),
+]
+
+# Movimientos mensuales fijos: (categoría, día del mes, rango de monto)
+RECURRING_TEMPLATES = [
+    ('Salario', 1, (15000, 45000)),
+    ('Renta', 5, (4000, 15000)),
+    ('Servicios', 10, (300, 1500)),
+    ('Suscripciones', 15, (99, 600)),
+    ('Fondo de inversión', 20, (500, 5000)),
+]
+
+# Peso relativo de cada categoría en los movimientos sueltos
+ONE_OFF_WEIGHTS = {
+    'Supermercado': 30,
+    'Transporte': 20,
+    'Restaurantes': 20,
+    'Entretenimiento': 10,
+    'Salud': 5,
+    'Freelance': 5,
+    'Servicios': 5,
+    'Fondo de inversión': 5,
+}
+
+ONE_OFF_DESCRIPTIONS = {
+    'Supermercado': ['Despensa semanal', 'Mercado', 'Tienda de la esquina'],
+    'Transporte': ['Gasolina', 'Taxi', 'Metro', 'Estacionamiento'],
+    'Restaurantes': ['Comida', 'Cena', 'Café', 'Tacos'],
+    'Entretenimiento': ['Cine', 'Concierto', 'Libros'],
+    'Salud': ['Farmacia', 'Consulta médica'],
+    'Freelance': ['Proyecto', 'Consultoría'],
+    'Servicios': ['Internet', 'Teléfono'],
+    'Fondo de inversión': ['Aportación extra'],
+}
+
+
+def _money(rng, low, high):
+    return Decimal(rng.randint(low * 100, high * 100)) / 100
+
+
+class BenchmarkSeeder:
+    """Genera los datos de un conjunto de usuarios sintéticos."""
+
+    def __init__(self, months=24, transactions=2000, batch_size=DEFAULT_BATCH_SIZE, seed=None, today=None):
+        self.months = months
+        self.transactions = transactions
+        self.batch_size = batch_size
+        self.rng = random.Random(seed)
+        self.today = today or timezone.localdate()
+        self.start = month_start(self.today - timedelta(days=30 * (months - 1)))
+        self.created = 0
+        self._batch = []
+
+    def flush(self, user):
+        if not self._batch:
+            return
+        created = Transaction.objects.bulk_create(self._batch)
+        transactions_bulk_created.send(sender=Transaction, user=user, transactions=created)
+        self.created += len(created)
+        self._batch = []
+
+    def append(self, user, obj):
+        self._batch.append(obj)
+        if len(self._batch) >= self.batch_size:
+            self.flush(user)
+
+    def add(self, user, **fields):
+        self.append(user, Transaction(user=user, **fields))
+
+    def seed_user(self, user):
+        rng = self.rng
+        categories = {
+            category.name: category
+            for category in Category.objects.bulk_create([
+                Category(user=user, name=name, category_type=category_type, color=color, icon=icon)
+                for name, category_type, color, icon in CATEGORY_TEMPLATES
+            ])
+        }
+
+        # Plantillas recurrentes con su historia ya generada (como lo haría generate_recurring)
+        templates = []
+        for name, day, (low, high) in RECURRING_TEMPLATES:
+            category = categories[name]
+            template = Transaction(user=user, category=category, amount=_money(rng, low, high),
+                                   description=f'{name} mensual', transaction_type=category.category_type,
+                                   date=self.start.replace(day=day), is_recurring=True,
+                                   recurrence_interval='MONTHLY')
+            template.schedule_recurrence()
+            templates.append(template)
+        self._batch.extend(templates)
+        self.flush(user)
+        recurring = len(templates)
+        for template in templates:
+            date = template.next_occurrence
+            while date <= self.today:
+                self.append(user, occurrence_for(template, date))
+                date = next_occurrence_after(template.date, template.recurrence_interval, date)
+                recurring += 1
+            template.next_occurrence = date
+        Transaction.objects.bulk_update(templates, ['next_occurrence'])
+
+        names = list(ONE_OFF_WEIGHTS)
+        weights = list(ONE_OFF_WEIGHTS.values())
+        span = (self.today - self.start).days
+        for _ in range(max(self.transactions - recurring, 0)):
+            category = categories[rng.choices(names, weights)[0]]
+            self.add(user, category=category, amount=_money(rng, 20, 2500),
+                     description=rng.choice(ONE_OFF_DESCRIPTIONS[category.name]),
+                     transaction_type=category.category_type,
+                     date=self.start + timedelta(days=rng.randint(0, span)))
+        self.flush(user)
+
+        Investment.objects.bulk_create([
+            Investment(
+                user=user,
+                name=f'Inversión {n + 1}',
+                investment_type=rng.choice(Investment.INVESTMENT_TYPES)[0],
+                initial_amount=initial,
+                current_value=(initial * Decimal(rng.uniform(0.7, 1.6))).quantize(Decimal('0.01')),
+                start_date=self.start + timedelta(days=rng.randint(0, span)),
+                expected_return=Decimal(rng.randint(2, 15)),
+                risk_level=rng.choice(['LOW', 'MEDIUM', 'HIGH']),
+            )
+            for n, initial in enumerate(_money(rng, 5000, 200000) for _ in range(rng.randint(1, 5)))
+        ])
+
+        budget_months = list(iter_months(self.start, self.today))[-12:]
+        Budget.objects.bulk_create([
+            Budget(user=user, category=category, month=month, allocated_amount=_money(rng, 500, 20000))
+            for category in categories.values() if category.category_type == 'EXPENSE'
+            for month in budget_months
+        ])
+        # bulk_create no pasa por las señales: el gasto inicial se calcula en bloque
+        budgets.reconcile([user])
+
+
+def seed_users(count, transactions=2000, months=24, prefix=DEFAULT_PREFIX, password=DEFAULT_PASSWORD,
+               batch_size=DEFAULT_BATCH_SIZE, seed=None, progress=None):
+    """
+    Crea `count` usuarios `<prefix>00001...` con `transactions` movimientos cada uno.
+    Cada usuario se genera en su propia transacción de base de datos.
+    Devuelve (usuarios creados, transacciones creadas).
+    """
+    seeder = BenchmarkSeeder(months=months, transactions=transactions, batch_size=batch_size, seed=seed)
+    hashed = make_password(password)
+    offset = User.objects.filter(username__startswith=prefix).count()
+    users = User.objects.bulk_create([
+        User(username=f'{prefix}{offset + n + 1:05d}', password=hashed, email=f'{prefix}{offset + n + 1:05d}@example.com')
+        for n in range(count)
+    ])
+    if users and users[0].pk is None:
+        # Backends sin RETURNING: volver a leer los usuarios para tener sus ids
+        users = list(User.objects.filter(username__in=[user.username for user in users]).order_by('username'))
+    for n, user in enumerate(users, start=1):
+        with db_transaction.atomic():
+            seeder.seed_user(user)
+        if progress:
+            progress(n, len(users), seeder.created)
+    return users, seeder.created
+
+
+Endpoint = namedtuple('Endpoint', ['name', 'url_name', 'params', 'headers'])
+
+ENDPOINTS = [
+    Endpoint('dashboard', 'dashboard', {}, {}),
+    Endpoint('transactions', 'transactions', {}, {}),
+    Endpoint('reports', 'reports', {}, {}),
+    Endpoint('financial_data', 'financial_data', {}, {}),
+    Endpoint('transaction_stats', 'transaction_stats', {'period': 'month'}, {'HTTP_X_REQUESTED_WITH': 'XMLHttpRequest'}),
+    Endpoint('export_transactions', 'export_transactions', {}, {}),
+    Endpoint('chart_data', 'chart_data', {}, {}),
+    Endpoint('analytics', 'analytics', {}, {}),
+]
+
+
+class BenchmarkError(Exception):
+    """Una vista respondió con error durante la medición."""
+
+
+class QueryCounter:
+    """Cuenta las consultas ejecutadas sin depender de DEBUG (connection.execute_wrapper)."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def percentile(values, pct):
+    """Percentil con interpolación lineal sobre una lista no vacía."""
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * pct / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def summarize(timings, queries):
+    return {
+        'samples': len(timings),
+        'mean_ms': round(sum(timings) / len(timings), 3),
+        'p50_ms': round(percentile(timings, 50), 3),
+        'p95_ms': round(percentile(timings, 95), 3),
+        'p99_ms': round(percentile(timings, 99), 3),
+        'max_ms': round(max(timings), 3),
+        'queries': max(queries),
+    }
+
+
+def run_benchmark(users, iterations=20, warmup=2, warm_cache=False, endpoints=ENDPOINTS):
+    """
+    Mide cada endpoint `iterations` veces (más `warmup` descartadas), rotando
+    entre `users`. Sin `warm_cache` la caché se vacía antes de cada petición
+    para medir el camino completo a la base de datos.
+    """
+    if not users:
+        raise BenchmarkError("No hay usuarios para medir (ejecuta seed_benchmark primero)")
+    clients = []
+    for user in users:
+        client = Client()
+        client.force_login(user)
+        clients.append(client)
+
+    results = {}
+    with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+        for endpoint in endpoints:
+            url = reverse(endpoint.url_name)
+            timings = []
+            queries = []
+            for i in range(warmup + iterations):
+                client = clients[i % len(clients)]
+                if not warm_cache:
+                    cache.clear()
+                counter = QueryCounter()
+                with connection.execute_wrapper(counter):
+                    started = time.perf_counter()
+                    response = client.get(url, endpoint.params, **endpoint.headers)
+                    if response.streaming:
+                        for _ in response.streaming_content:
+                            pass
+                    elapsed = (time.perf_counter() - started) * 1000
+                if response.status_code != 200:
+                    raise BenchmarkError(f"{endpoint.name} respondió {response.status_code}")
+                if i >= warmup:
+                    timings.append(elapsed)
+                    queries.append(counter.count)
+            results[endpoint.name] = summarize(timings, queries)
+    return results
+
+
+def compare(results, baseline, threshold=0.2, noise_ms=2.0):
+    """
+    Lista de regresiones frente a `baseline`: p95 más de `threshold` (fracción)
+    por encima de la línea base, ignorando diferencias menores a `noise_ms`, o
+    más consultas que en la línea base.
+    """
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get('endpoints', {}).get(name)
+        if previous is None:
+            continue
+        limit = max(previous['p95_ms'] * (1 + threshold), previous['p95_ms'] + noise_ms)
+        if current['p95_ms'] > limit:
+            regressions.append(
+                f"{name}: p95 {current['p95_ms']:.1f} ms > {limit:.1f} ms (línea base {previous['p95_ms']:.1f} ms)"
+            )
+        if current['queries'] > previous['queries']:
+            regressions.append(f"{name}: {current['queries']} consultas > {previous['queries']} en la línea base")
+    return regressions
+
+
+def build_report(results, iterations, users, warm_cache):
+    return {
+        'meta': {
+            'created': timezone.now().isoformat(),
+            'database': connection.vendor,
+            'iterations': iterations,
+            'users': len(users),
+            'warm_cache': warm_cache,
+        },
+        'endpoints': results,
+    }
+
+
+def load_baseline(path):
+    with open(path, encoding='utf-8') as fileobj:
+        return json.load(fileobj)
+
+
+def save_report(report, path):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as fileobj:
+        json.dump(report, fileobj, indent=2, ensure_ascii=False)
+
+
+# Endpoints de gráficos que el front pide en ráfagas (vistas async bajo ASGI)
+CHART_ENDPOINTS = [endpoint for endpoint in ENDPOINTS if endpoint.name in ('financial_data', 'transaction_stats')] + [
+    Endpoint('category_spending', 'category_spending', {}, {}),
+]
+
+
+def session_cookie(user):
+    """Crea una sesión autenticada para `user` y devuelve el encabezado Cookie."""
+    session = import_module(settings.SESSION_ENGINE).SessionStore()
+    session[SESSION_KEY] = str(user.pk)
+    session[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+    session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+    session.create()
+    return f'{settings.SESSION_COOKIE_NAME}={session.session_key}'
+
+
+def load_test(base_url, cookie, endpoints=CHART_ENDPOINTS, concurrency=20, total=500, timeout=10):
+    """
+    Dispara `total` peticiones HTTP reales contra un servidor en `base_url` con
+    `concurrency` clientes simultáneos, rotando entre `endpoints`.
+    Devuelve throughput, errores y percentiles de latencia.
+    """
+    def header_name(meta_key):
+        return '-'.join(part.capitalize() for part in meta_key[len('HTTP_'):].split('_'))
+
+    requests = []
+    for endpoint in endpoints:
+        url = base_url.rstrip('/') + reverse(endpoint.url_name)
+        if endpoint.params:
+            url += '?' + urlencode(endpoint.params)
+        headers = {header_name(key): value for key, value in endpoint.headers.items()}
+        headers['Cookie'] = cookie
+        requests.append((url, headers))
+
+    def fetch(i):
+        url, headers = requests[i % len(requests)]
+        started = time.perf_counter()
+        try:
+            with urllib.request.urlopen(urllib.request.Request(url, headers=headers), timeout=timeout) as response:
+                response.read()
+                ok = response.status == 200 and response.url == url
+        except (urllib.error.URLError, OSError):
+            ok = False
+        return (time.perf_counter() - started) * 1000, ok
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(fetch, range(total)))
+    elapsed = time.perf_counter() - started
+
+    timings = [ms for ms, ok in results if ok]
+    summary = {
+        'requests': total,
+        'errors': sum(1 for _, ok in results if not ok),
+        'concurrency': concurrency,
+        'requests_per_second': round(total / elapsed, 1),
+    }
+    if timings:
+        summary.update({
+            'p50_ms': round(percentile(timings, 50), 2),
+            'p95_ms': round(percentile(timings, 95), 2),
+            'p99_ms': round(percentile(timings, 99), 2),
+        })
+    return summary
+
+
+def orm_analysis(user, today=None, months=analytics.DEFAULT_MONTHS):
+    """
+    Referencia sin NumPy de analytics.compute: una consulta por mes, tipo y
+    categoría y bucles en Python. Devuelve lo mismo que compute (en centavos)
+    salvo las posiciones de los gastos inusuales, que aquí son sus ids.
+    """
+    today = today or timezone.localdate()
+    month_starts = [month_start(today)]
+    while len(month_starts) < months:
+        month_starts.insert(0, month_start(month_starts[0] - timedelta(days=1)))
+    transactions = Transaction.objects.filter(user=user, date__gte=month_starts[0], date__lte=today)
+
+    def cents(queryset):
+        return int((queryset.aggregate(total=Sum('amount'))['total'] or 0) * 100)
+
+    series = {'income': [], 'expense': []}
+    for first in month_starts:
+        in_month = transactions.filter(date__gte=first, date__lt=next_month(first))
+        series['income'].append(cents(in_month.filter(transaction_type='INCOME')))
+        series['expense'].append(cents(in_month.filter(transaction_type='EXPENSE')))
+    series['net'] = [income - expense for income, expense in zip(series['income'], series['expense'])]
+
+    window = analytics.ROLLING_WINDOW
+    rolling = {
+        name: [None if i < window - 1 else sum(values[i - window + 1:i + 1]) / window for i in range(len(values))]
+        for name, values in series.items()
+    }
+    month_over_month = {}
+    for name, values in series.items():
+        deltas, pcts = [None], [None]
+        for previous, value in zip(values, values[1:]):
+            deltas.append(value - previous)
+            pcts.append((value - previous) / abs(previous) * 100 if previous else None)
+        month_over_month[name] = (deltas, pcts)
+
+    forecast, spent, anomalies = {}, {}, []
+    for category_id in transactions.order_by().values_list('category_id', flat=True).distinct():
+        expenses = transactions.filter(category_id=category_id, transaction_type='EXPENSE')
+        monthly = [cents(expenses.filter(date__gte=first, date__lt=next_month(first))) for first in month_starts]
+        history, spent[category_id] = monthly[:-1], monthly[-1]
+        level = sum(history[-window:]) / len(history[-window:]) if history else 0
+        seasonal = 0
+        same_month = [value for first, value in zip(month_starts, history) if first.month == today.month]
+        if len(history) >= 12 and same_month:
+            seasonal = sum(same_month) / len(same_month) - sum(history) / len(history)
+        forecast[category_id] = max(level + seasonal, 0)
+
+        amounts = [(transaction.id, transaction.date, int(transaction.amount * 100)) for transaction in expenses]
+        if len(amounts) >= analytics.ANOMALY_MIN_SAMPLES:
+            mean = sum(amount for _, _, amount in amounts) / len(amounts)
+            std = (sum((amount - mean) ** 2 for _, _, amount in amounts) / len(amounts)) ** 0.5
+            anomalies.extend(
+                (day, transaction_id) for transaction_id, day, amount in amounts
+                if std and (amount - mean) / std >= analytics.ANOMALY_Z
+            )
+
+    anomalies.sort(reverse=True)
+    return {
+        'series': series,
+        'rolling': rolling,
+        'month_over_month': month_over_month,
+        'forecast': forecast,
+        'spent': spent,
+        'anomalies': [transaction_id for _, transaction_id in anomalies[:analytics.MAX_ANOMALIES]],
+    }
+
+
+def synthetic_arrays(rows=100_000, months=analytics.DEFAULT_MONTHS, categories=12, seed=None, today=None):
+    """Historial aleatorio de `rows` transacciones directamente en arreglos (sin base de datos)."""
+    rng = np.random.default_rng(seed)
+    today = today or timezone.localdate()
+    first_day = analytics.first_month_of(today, months).astype('datetime64[D]').item().toordinal()
+    ordinals = np.sort(rng.integers(first_day, today.toordinal() + 1, rows)).astype(np.int32)
+    return analytics.TransactionArrays(
+        ids=np.arange(1, rows + 1, dtype=np.int64),
+        ordinals=ordinals,
+        cents=rng.lognormal(8, 1, rows).astype(np.int64) + 1,
+        types=rng.choice(len(analytics.TYPES), rows, p=[0.1, 0.85, 0.05]).astype(np.int8),
+        category_codes=rng.integers(0, categories, rows),
+        category_ids=np.arange(1, categories + 1, dtype=np.int64),
+    )
+
+
+def _timed(function, iterations, warmup):
+    timings, queries = [], []
+    for i in range(warmup + iterations):
+        counter = QueryCounter()
+        with connection.execute_wrapper(counter):
+            started = time.perf_counter()
+            function()
+            elapsed = (time.perf_counter() - started) * 1000
+        if i >= warmup:
+            timings.append(elapsed)
+            queries.append(counter.count)
+    return summarize(timings, queries)
+
+
+def benchmark_analytics(users, iterations=10, warmup=1, months=analytics.DEFAULT_MONTHS, synthetic_rows=100_000):
+    """
+    Compara analytics.analyze (una consulta + NumPy) con orm_analysis (bucles
+    con el ORM) sobre los usuarios dados, y mide el cálculo vectorizado solo
+    sobre `synthetic_rows` transacciones generadas en memoria.
+    """
+    if not users:
+        raise BenchmarkError("No hay usuarios para medir (ejecuta seed_benchmark primero)")
+    today = timezone.localdate()
+    rotation = itertools.count()
+
+    def next_user():
+        return users[next(rotation) % len(users)]
+
+    arrays = synthetic_arrays(synthetic_rows, months, seed=0, today=today)
+    return {
+        'numpy': _timed(lambda: analytics.analyze(next_user(), today, months), iterations, warmup),
+        'orm_loop': _timed(lambda: orm_analysis(next_user(), today, months), iterations, warmup),
+        f'numpy_compute_{synthetic_rows}': _timed(lambda: analytics.compute(arrays, today, months), iterations, warmup),
+    }
+
+
+def money_payload(points=50_000, seed=None):
+    """Montos aleatorios como Decimal y como centavos (los mismos valores), repartidos en 12 meses."""
+    rng = random.Random(seed)
+    cents = [rng.randint(1, 5_000_000) for _ in range(points)]
+    months = [i % 12 for i in range(points)]
+    return [Decimal(value).scaleb(-2) for value in cents], cents, months
+
+
+def _best_ms(function, repeat):
+    return round(min(timeit.repeat(function, number=1, repeat=repeat)) * 1000, 3)
+
+
+def money_microbenchmarks(points=50_000, repeat=5, seed=0):
+    """
+    Compara el camino anterior (sumas Decimal, float() por valor y json.dumps /
+    JsonResponse) con el de centavos enteros y fastjson sobre una serie de
+    `points` montos. Devuelve el mejor tiempo de cada variante y la diferencia
+    entre sumar floats y convertir una sola vez la suma exacta en centavos.
+    """
+    decimals, cents, months = money_payload(points, seed)
+
+    def sum_decimal():
+        totals = [Decimal('0')] * 12
+        for month, amount in zip(months, decimals):
+            totals[month] += amount
+        return totals
+
+    def sum_cents():
+        totals = [0] * 12
+        for month, amount in zip(months, cents):
+            totals[month] += amount
+        return totals
+
+    def serialize_decimal():
+        return json.dumps({'amounts': [float(amount) for amount in decimals]})
+
+    def serialize_cents():
+        return fastjson.dumps({'amounts': [money.to_float(amount) for amount in cents]})
+
+    def response_decimal():
+        return JsonResponse({'amounts': [float(amount) for amount in decimals]}).content
+
+    def response_cents():
+        return fastjson.FastJsonResponse({'amounts': [money.to_float(amount) for amount in cents]}).content
+
+    if json.loads(serialize_decimal()) != json.loads(serialize_cents()):
+        raise BenchmarkError("Los dos caminos no producen los mismos montos")
+    float_total = sum(float(amount) for amount in decimals)
+    return {
+        'points': points,
+        'backend': 'orjson' if fastjson.orjson is not None else 'json',
+        'timings_ms': {
+            'sum_decimal': _best_ms(sum_decimal, repeat),
+            'sum_cents': _best_ms(sum_cents, repeat),
+            'serialize_decimal_json': _best_ms(serialize_decimal, repeat),
+            'serialize_cents_fastjson': _best_ms(serialize_cents, repeat),
+            'jsonresponse_decimal': _best_ms(response_decimal, repeat),
+            'fastjsonresponse_cents': _best_ms(response_cents, repeat),
+        },
+        'float_sum_drift': abs(float_total - money.to_float(sum(cents))),
+    }
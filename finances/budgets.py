@@ -0,0 +1,117 @@
+"""
+Mantenimiento incremental de Budget.spent_amount.
+
+Usa los mismos deltas que MonthlySummary (ver summaries.py): de cada delta
+de tipo EXPENSE sale un ajuste con F() sobre el presupuesto (usuario,
+categoría, mes) si existe. Así las páginas de presupuestos leen el gasto
+ya calculado, sin sumar transacciones.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import F, Sum
+from django.db.models.functions import TruncMonth
+
+from .aggregations import month_start, next_month
+from .models import Budget, Transaction
+
+# A partir de cuántas claves conviene buscar primero los presupuestos existentes
+BULK_DELTA_THRESHOLD = 20
+
+
+def budget_deltas(summary_deltas):
+    """{(usuario, mes, categoría, tipo): (monto, cantidad)} -> {(usuario, mes, categoría): monto} solo de gastos."""
+    deltas = defaultdict(Decimal)
+    for (user_id, month, category_id, transaction_type), (amount, _) in summary_deltas.items():
+        if transaction_type == 'EXPENSE' and amount:
+            deltas[(user_id, month, category_id)] += amount
+    return {key: amount for key, amount in deltas.items() if amount}
+
+
+def _increment(budgets, amount):
+    budgets.update(spent_amount=F('spent_amount') + amount)
+
+
+def apply_deltas(summary_deltas):
+    """Ajusta spent_amount de los presupuestos afectados (los que no existen se ignoran)."""
+    deltas = budget_deltas(summary_deltas)
+    if not deltas:
+        return
+    with transaction.atomic():
+        if len(deltas) <= BULK_DELTA_THRESHOLD:
+            for (user_id, month, category_id), amount in deltas.items():
+                _increment(Budget.objects.filter(user_id=user_id, month=month, category_id=category_id), amount)
+            return
+        # Muchas claves (importaciones): una consulta para saber cuáles tienen presupuesto
+        budgets = Budget.objects.filter(
+            user_id__in={key[0] for key in deltas},
+            month__in={key[1] for key in deltas},
+            category_id__in={key[2] for key in deltas},
+        ).values_list('pk', 'user_id', 'month', 'category_id')
+        for pk, user_id, month, category_id in budgets:
+            amount = deltas.get((user_id, month, category_id))
+            if amount:
+                _increment(Budget.objects.filter(pk=pk), amount)
+
+
+def spent_for(user_id, category_id, month):
+    """Gasto real de una categoría en un mes, sumado desde Transaction."""
+    start = month_start(month)
+    return Transaction.objects.filter(
+        user_id=user_id,
+        category_id=category_id,
+        transaction_type='EXPENSE',
+        date__gte=start,
+        date__lt=next_month(start),
+    ).aggregate(total=Sum('amount'))['total'] or Decimal('0')
+
+
+def live_spent(budgets):
+    """
+    {(usuario, mes, categoría): gasto} para los presupuestos dados, en una sola
+    consulta agrupada sobre Transaction.
+    """
+    keys = {(budget.user_id, month_start(budget.month), budget.category_id) for budget in budgets}
+    if not keys:
+        return {}
+    rows = (
+        Transaction.objects
+        .filter(
+            user_id__in={key[0] for key in keys},
+            category_id__in={key[2] for key in keys},
+            transaction_type='EXPENSE',
+            date__gte=min(key[1] for key in keys),
+            date__lt=next_month(max(key[1] for key in keys)),
+        )
+        .annotate(month=TruncMonth('date'))
+        .values('user_id', 'month', 'category_id')
+        .annotate(total=Sum('amount'))
+        .order_by()
+    )
+    return {
+        (row['user_id'], month_start(row['month']), row['category_id']): row['total']
+        for row in rows
+    }
+
+
+def reconcile(users=None, fix=True, batch_size=1000):
+    """
+    Compara spent_amount contra el gasto real y, con `fix`, corrige las
+    diferencias con bulk_update. Devuelve [(presupuesto, guardado, real)].
+    """
+    budgets = Budget.objects.select_related('category').order_by('pk')
+    if users is not None:
+        budgets = budgets.filter(user__in=users)
+    with transaction.atomic():
+        budgets = list(budgets.select_for_update(of=('self',)) if fix else budgets)
+        actual = live_spent(budgets)
+        drift = []
+        for budget in budgets:
+            spent = actual.get((budget.user_id, month_start(budget.month), budget.category_id), Decimal('0'))
+            if budget.spent_amount != spent:
+                drift.append((budget, budget.spent_amount, spent))
+                budget.spent_amount = spent
+        if fix and drift:
+            Budget.objects.bulk_update([budget for budget, _, _ in drift], ['spent_amount'], batch_size=batch_size)
+    return drift
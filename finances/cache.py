@@ -0,0 +1,68 @@
+"""
+Caché por usuario de los datos derivados (dashboard, totales mensuales).
+
+Cada usuario tiene un número de generación guardado en la caché y todas sus
+claves lo incluyen. Al guardar o borrar una Transaction, Category o Investment
+del usuario (ver signals.py) la generación se incrementa y sus entradas
+anteriores dejan de usarse; expiran solas por TIMEOUT.
+
+Usa el backend `default` de Django (memoria local, archivo o base de datos
+según CACHE_BACKEND en settings), así que no requiere servicios externos.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+TIMEOUT = getattr(settings, 'FINANCES_CACHE_TIMEOUT', 60 * 60)
+
+KEY_PREFIX = 'finances'
+
+
+def _generation_key(user_id):
+    return f'{KEY_PREFIX}:{user_id}:generation'
+
+
+def generation(user_id):
+    key = _generation_key(user_id)
+    value = cache.get(key)
+    if value is None:
+        # add() no pisa el valor si otra petición lo creó primero
+        cache.add(key, 1, timeout=None)
+        value = cache.get(key, 1)
+    return value
+
+
+def user_key(user_id, name, *parts):
+    """Clave versionada: finances:<usuario>:<generación>:<nombre>:<partes>."""
+    return ':'.join(str(part) for part in (KEY_PREFIX, user_id, generation(user_id), name, *parts))
+
+
+def get_or_build(user_id, name, parts, builder, timeout=TIMEOUT):
+    """Devuelve la entrada cacheada o la construye con `builder()` y la guarda."""
+    key = user_key(user_id, name, *parts)
+    value = cache.get(key)
+    if value is None:
+        value = builder()
+        cache.set(key, value, timeout)
+    return value
+
+
+def _bump(user_id):
+    key = _generation_key(user_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # La clave no existe (caché vacía o expulsada): cualquier valor nuevo invalida
+        cache.set(key, 2, timeout=None)
+
+
+def invalidate_user(user_id):
+    """
+    Invalida todas las entradas del usuario. Se incrementa ahora (para que el
+    resto de la petición vea datos frescos) y otra vez al confirmar la
+    transacción, por si otra petición cacheó los datos viejos entretanto.
+    """
+    if user_id is None:
+        return
+    _bump(user_id)
+    transaction.on_commit(lambda: _bump(user_id))
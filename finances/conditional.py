@@ -0,0 +1,115 @@
+"""
+Respuestas condicionales (ETag / Last-Modified) a partir de DataVersion.
+
+`bump` incrementa la versión del usuario desde las señales. El decorador
+`condition_on_data_version` lee esa versión con una consulta por clave
+primaria y, si el cliente ya tiene la respuesta (If-None-Match o
+If-Modified-Since), devuelve 304 antes de ejecutar la vista. A diferencia de
+django.views.decorators.http.condition, la consulta también es async cuando
+la vista lo es.
+"""
+from datetime import datetime, time
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+from .models import DataVersion
+
+# Usuario sin fila de versión: todavía no cambió ningún dato
+INITIAL_STATE = (0, None)
+
+
+def bump(user_id):
+    """Incrementa la versión de datos del usuario (crea la fila la primera vez)."""
+    if user_id is None:
+        return
+    now = timezone.now()
+    if DataVersion.objects.filter(user_id=user_id).update(version=F('version') + 1, updated_at=now):
+        return
+    try:
+        with transaction.atomic():
+            DataVersion.objects.create(user_id=user_id, updated_at=now)
+    except IntegrityError:
+        # Otra petición creó la fila entretanto
+        DataVersion.objects.filter(user_id=user_id).update(version=F('version') + 1, updated_at=now)
+
+
+def _state_queryset(user_id):
+    return DataVersion.objects.filter(user_id=user_id).values_list('version', 'updated_at')
+
+
+def current(user_id):
+    """(versión, última modificación) del usuario en una sola consulta."""
+    return _state_queryset(user_id).first() or INITIAL_STATE
+
+
+async def acurrent(user_id):
+    """Versión async de current."""
+    return await _state_queryset(user_id).afirst() or INITIAL_STATE
+
+
+def validators(user, state):
+    """
+    (ETag, Last-Modified) para la versión `state` del usuario. Incluyen el día
+    de hoy porque las vistas calculan períodos relativos a la fecha actual.
+    """
+    version, updated_at = state
+    today = timezone.localdate()
+    etag = quote_etag(f'{user.pk}-{version}-{today.isoformat()}')
+    start_of_today = timezone.make_aware(datetime.combine(today, time.min))
+    last_modified = max(updated_at, start_of_today) if updated_at else start_of_today
+    return f'W/{etag}', last_modified
+
+
+def _precondition(request, user, state):
+    etag, last_modified = validators(user, state)
+    not_modified = get_conditional_response(request, etag=etag, last_modified=int(last_modified.timestamp()))
+    return etag, last_modified, not_modified
+
+
+def _finish(response, etag, last_modified):
+    if response.status_code in (200, 304):
+        response.headers.setdefault('ETag', etag)
+        response.headers.setdefault('Last-Modified', http_date(last_modified.timestamp()))
+    # Respuestas por usuario: el navegador puede guardarlas pero debe revalidar siempre
+    patch_cache_control(response, private=True, no_cache=True)
+    patch_vary_headers(response, ['Cookie'])
+    return response
+
+
+def _applies(request, user):
+    return request.method in ('GET', 'HEAD') and user.is_authenticated
+
+
+def condition_on_data_version(view_func):
+    """
+    Decorador para vistas GET por usuario cuyo resultado depende solo de sus
+    datos y de la fecha. Va debajo de @login_required. Funciona con vistas
+    síncronas y async.
+    """
+    if iscoroutinefunction(view_func):
+        @wraps(view_func)
+        async def _view_wrapper(request, *args, **kwargs):
+            user = await request.auser()
+            if not _applies(request, user):
+                return await view_func(request, *args, **kwargs)
+            etag, last_modified, response = _precondition(request, user, await acurrent(user.pk))
+            if response is None:
+                response = await view_func(request, *args, **kwargs)
+            return _finish(response, etag, last_modified)
+    else:
+        @wraps(view_func)
+        def _view_wrapper(request, *args, **kwargs):
+            user = request.user
+            if not _applies(request, user):
+                return view_func(request, *args, **kwargs)
+            etag, last_modified, response = _precondition(request, user, current(user.pk))
+            if response is None:
+                response = view_func(request, *args, **kwargs)
+            return _finish(response, etag, last_modified)
+    return _view_wrapper
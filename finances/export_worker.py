@@ -0,0 +1,19 @@
+"""
+Puntos de entrada de los procesos del pool de run_export_worker.
+
+Los procesos arrancan con spawn y sin Django configurado: este módulo no debe
+importar modelos al cargarse, porque el pool lo importa antes de llamar a
+`init_process`.
+"""
+
+
+def init_process():
+    import django
+
+    django.setup()
+
+
+def run_job(job_id):
+    from .exports import run_job
+
+    return run_job(job_id)
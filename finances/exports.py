@@ -0,0 +1,259 @@
+"""
+Cola de exportaciones en segundo plano (ExportJob) sin broker externo.
+
+La vista `export_jobs` encola un trabajo con los filtros del listado y
+`manage.py run_export_worker` lo toma con SELECT ... FOR UPDATE SKIP LOCKED,
+así que varios workers pueden correr a la vez sin tomar el mismo trabajo.
+El archivo se escribe por lotes desde un cursor del servidor directamente en
+MEDIA_ROOT/exports/, actualizando el avance en la fila del trabajo; los
+trabajos que dejan de avanzar (worker caído) se vuelven a tomar.
+
+Formatos: CSV, XLSX (openpyxl) y Parquet (pyarrow). Ambos están en
+requirements.txt; si falta alguno en una instalación parcial, su formato no
+se ofrece.
+"""
+import csv
+import importlib.util
+import logging
+import os
+from datetime import timedelta
+from itertools import islice
+from pathlib import Path
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .filters import filter_transactions
+from .models import ExportJob, Transaction
+
+logger = logging.getLogger(__name__)
+
+# Filas por lote leídas del cursor y escritas en el archivo (también marca cada cuánto se informa el avance)
+CHUNK_SIZE = 5000
+
+# Un trabajo en proceso sin avances durante este tiempo se considera abandonado
+STALE_AFTER = timedelta(minutes=10)
+
+RETENTION = timedelta(days=getattr(settings, 'FINANCES_EXPORT_RETENTION_DAYS', 7))
+
+EXPORT_DIR = 'exports'
+
+EXPORT_HEADER = ['Fecha', 'Descripción', 'Categoría', 'Tipo', 'Monto', 'Usuario']
+
+# formato: (extensión, content type, módulo opcional que requiere)
+FORMATS = {
+    'csv': ('csv', 'text/csv', None),
+    'xlsx': ('xlsx', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', 'openpyxl'),
+    'parquet': ('parquet', 'application/vnd.apache.parquet', 'pyarrow'),
+}
+
+
+def available_formats():
+    """Formatos cuyas dependencias están instaladas."""
+    return [
+        code for code, (_, _, module) in FORMATS.items()
+        if module is None or importlib.util.find_spec(module) is not None
+    ]
+
+
+def export_queryset(user, params):
+    """Transacciones del usuario con los mismos filtros y orden que export_transactions."""
+    return filter_transactions(
+        Transaction.objects.filter(user=user), params
+    )[0].order_by('-date', '-created_at', '-id')
+
+
+def export_values(transactions, chunk_size=CHUNK_SIZE):
+    """(fecha, descripción, categoría, tipo legible, monto) leyendo con un cursor del servidor."""
+    type_labels = dict(Transaction.TRANSACTION_TYPES)
+    rows = transactions.values_list(
+        'date', 'description', 'category__name', 'transaction_type', 'amount'
+    ).iterator(chunk_size=chunk_size)
+    for date, description, category_name, transaction_type, amount in rows:
+        yield date, description or '', category_name, type_labels.get(transaction_type, transaction_type), amount
+
+
+async def aexport_values(transactions, chunk_size=CHUNK_SIZE):
+    """
+    Versión async de export_values: avanza el mismo generador de a `chunk_size`
+    filas con sync_to_async (siempre en el mismo hilo, así que el cursor del
+    servidor sigue abierto entre bloques). QuerySet.aiterator no sirve aquí:
+    con values_list ejecuta la consulta desde el hilo async.
+    """
+    rows = export_values(transactions, chunk_size)
+    next_chunk = sync_to_async(lambda: list(islice(rows, chunk_size)))
+    while True:
+        chunk = await next_chunk()
+        for row in chunk:
+            yield row
+        if len(chunk) < chunk_size:
+            return
+
+
+class CsvWriter:
+    def __init__(self, path, username):
+        self.username = username
+        self.file = open(path, 'w', newline='', encoding='utf-8')
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(EXPORT_HEADER)
+
+    def write(self, rows):
+        self.writer.writerows(
+            [date.strftime('%d/%m/%Y'), description, category, label, str(amount), self.username]
+            for date, description, category, label, amount in rows
+        )
+
+    def close(self):
+        self.file.close()
+
+
+class XlsxWriter:
+    """Libro en modo write_only: las filas se vuelcan a disco sin quedar en memoria."""
+
+    def __init__(self, path, username):
+        from openpyxl import Workbook
+
+        self.path = path
+        self.username = username
+        self.workbook = Workbook(write_only=True)
+        self.sheet = self.workbook.create_sheet('Transacciones')
+        self.sheet.append(EXPORT_HEADER)
+
+    def write(self, rows):
+        for date, description, category, label, amount in rows:
+            self.sheet.append([date, description, category, label, amount, self.username])
+
+    def close(self):
+        self.workbook.save(self.path)
+
+
+class ParquetWriter:
+    """Archivo columnar con tipos nativos (fecha y decimal); un row group por lote."""
+
+    def __init__(self, path, username):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self.pa = pa
+        self.username = username
+        self.schema = pa.schema([
+            ('fecha', pa.date32()),
+            ('descripcion', pa.string()),
+            ('categoria', pa.string()),
+            ('tipo', pa.string()),
+            ('monto', pa.decimal128(10, 2)),
+            ('usuario', pa.string()),
+        ])
+        self.writer = pq.ParquetWriter(path, self.schema, compression='zstd')
+
+    def write(self, rows):
+        columns = list(zip(*rows))
+        self.writer.write_batch(self.pa.record_batch(
+            [*(list(column) for column in columns), [self.username] * len(rows)], schema=self.schema,
+        ))
+
+    def close(self):
+        self.writer.close()
+
+
+WRITERS = {'csv': CsvWriter, 'xlsx': XlsxWriter, 'parquet': ParquetWriter}
+
+
+def create_job(user, file_format, params):
+    """Encola una exportación con los filtros válidos de `params`."""
+    if file_format not in available_formats():
+        raise ValueError(f"Formato de exportación no disponible: {file_format}")
+    filters = filter_transactions(Transaction.objects.none(), params)[1]
+    return ExportJob.objects.create(user=user, file_format=file_format, filters=filters)
+
+
+def claim_next():
+    """Marca como en proceso el trabajo pendiente más antiguo y devuelve su id (None si no hay)."""
+    now = timezone.now()
+    with transaction.atomic():
+        job = (
+            ExportJob.objects
+            .filter(Q(status='PENDING') | Q(status='RUNNING', updated_at__lt=now - STALE_AFTER))
+            .order_by('created_at')
+            .select_for_update(skip_locked=True)
+            .first()
+        )
+        if job is None:
+            return None
+        job.status = 'RUNNING'
+        job.started_at = now
+        job.processed_rows = 0
+        job.error = ''
+        job.save(update_fields=['status', 'started_at', 'processed_rows', 'error', 'updated_at'])
+    return job.pk
+
+
+def _chunks(rows, size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def run_job(job_id):
+    """Genera el archivo de un trabajo ya tomado. Devuelve el estado final."""
+    job = ExportJob.objects.select_related('user').get(pk=job_id)
+    extension = FORMATS[job.file_format][0]
+    name = f'{EXPORT_DIR}/{job.user_id}/{job.pk}-{timezone.now():%Y%m%d%H%M%S}.{extension}'
+    path = Path(settings.MEDIA_ROOT) / name
+    partial = path.with_name(path.name + '.part')
+    progress = ExportJob.objects.filter(pk=job.pk)
+    try:
+        transactions = export_queryset(job.user, job.filters)
+        progress.update(total_rows=transactions.count(), updated_at=timezone.now())
+        path.parent.mkdir(parents=True, exist_ok=True)
+        writer = WRITERS[job.file_format](partial, job.user.username)
+        processed = 0
+        try:
+            for chunk in _chunks(export_values(transactions), CHUNK_SIZE):
+                writer.write(chunk)
+                processed += len(chunk)
+                progress.update(processed_rows=processed, updated_at=timezone.now())
+        finally:
+            writer.close()
+        os.replace(partial, path)
+    except Exception as e:
+        logger.exception("La exportación %s falló", job.pk)
+        partial.unlink(missing_ok=True)
+        progress.update(status='FAILED', error=str(e) or type(e).__name__,
+                        finished_at=timezone.now(), updated_at=timezone.now())
+        return 'FAILED'
+    progress.update(status='DONE', file=name, processed_rows=processed,
+                    finished_at=timezone.now(), updated_at=timezone.now())
+    return 'DONE'
+
+
+def run_pending(limit=None):
+    """Procesa trabajos en este proceso hasta vaciar la cola (o hasta `limit`). Devuelve cuántos corrió."""
+    count = 0
+    while limit is None or count < limit:
+        job_id = claim_next()
+        if job_id is None:
+            break
+        run_job(job_id)
+        count += 1
+    return count
+
+
+def purge_expired(now=None):
+    """Borra los trabajos terminados hace más de RETENTION junto con sus archivos."""
+    cutoff = (now or timezone.now()) - RETENTION
+    expired = list(ExportJob.objects.filter(finished_at__lt=cutoff).exclude(status__in=['PENDING', 'RUNNING']))
+    for job in expired:
+        if job.file:
+            job.file.delete(save=False)
+    ExportJob.objects.filter(pk__in=[job.pk for job in expired]).delete()
+    return len(expired)
+
@@ -0,0 +1,35 @@
+"""
+Serialización JSON de los datos de gráficos.
+
+Usa orjson si está instalado (varias veces más rápido que json para listas
+largas de números) y json de la biblioteca estándar si no. Los datos ya
+llegan con tipos nativos (int, float, str); Decimal no se acepta para no
+esconder conversiones en el camino caliente.
+"""
+import json
+
+from django.http import HttpResponse
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def dumps_bytes(data):
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+def dumps(data):
+    """JSON compacto como str (para incrustar en plantillas)."""
+    return dumps_bytes(data).decode('utf-8')
+
+
+class FastJsonResponse(HttpResponse):
+    """Como JsonResponse (solo dicts) pero serializando con dumps_bytes."""
+
+    def __init__(self, data, **kwargs):
+        kwargs.setdefault('content_type', 'application/json')
+        super().__init__(content=dumps_bytes(data), **kwargs)
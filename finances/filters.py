@@ -0,0 +1,88 @@
+"""
+Filtros de transacciones compartidos por el listado, la exportación y la API.
+
+Reciben los parámetros GET (type, category, start_date, end_date, q) y
+devuelven el queryset filtrado junto con los filtros aplicados, para poder
+mostrarlos en el formulario y conservarlos entre páginas.
+"""
+from django.utils.dateparse import parse_date
+
+from .models import Transaction
+from .pagination import DEFAULT_ORDERING
+from .search import SEARCH_ORDERING, search_terms, search_transactions
+
+FILTER_PARAMS = ('type', 'category', 'start_date', 'end_date', 'q')
+
+VALID_TYPES = {code for code, _ in Transaction.TRANSACTION_TYPES}
+
+
+def _parse_date(value):
+    try:
+        return parse_date(value)
+    except ValueError:
+        return None
+
+
+def filter_transactions(queryset, params):
+    """
+    Aplica los filtros de `params` sobre `queryset`.
+
+    Devuelve (queryset, filters, errors): `filters` contiene solo los filtros
+    válidos que se aplicaron y `errors` los mensajes de los que se ignoraron.
+    """
+    filters = {}
+    errors = []
+
+    # Filtro por tipo de transacción
+    transaction_type = params.get('type', '')
+    if transaction_type:
+        if transaction_type in VALID_TYPES:
+            queryset = queryset.filter(transaction_type=transaction_type)
+            filters['type'] = transaction_type
+        else:
+            errors.append("Tipo de transacción no válido")
+
+    # Filtro por categoría
+    category_id = params.get('category', '')
+    if category_id:
+        if category_id.isdigit():
+            queryset = queryset.filter(category_id=category_id)
+            filters['category'] = category_id
+        else:
+            errors.append("Categoría no válida")
+
+    # Filtro por fecha de inicio
+    start_date = params.get('start_date', '')
+    if start_date:
+        parsed = _parse_date(start_date)
+        if parsed:
+            queryset = queryset.filter(date__gte=parsed)
+            filters['start_date'] = start_date
+        else:
+            errors.append("Fecha de inicio no válida")
+
+    # Filtro por fecha de fin
+    end_date = params.get('end_date', '')
+    if end_date:
+        parsed = _parse_date(end_date)
+        if parsed:
+            queryset = queryset.filter(date__lte=parsed)
+            filters['end_date'] = end_date
+        else:
+            errors.append("Fecha de fin no válida")
+
+    # Búsqueda de texto en descripción y categoría (anota `rank`)
+    query = params.get('q', '').strip()
+    if query:
+        if search_terms(query):
+            queryset = search_transactions(queryset, query)
+            filters['q'] = query
+        else:
+            errors.append("La búsqueda no contiene palabras")
+
+    return queryset, filters, errors
+
+
+def ordering_for(filters):
+    """Orden del listado: por relevancia si hay búsqueda, si no por fecha."""
+    return SEARCH_ORDERING if 'q' in filters else DEFAULT_ORDERING
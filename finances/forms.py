@@ -47,10 +47,58 @@ class UserRegistrationForm(UserCreationForm):
     from django import forms
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth.models import User
-from .models import Category, Transaction, Investment
+from .models import Budget, Category, Transaction, Investment
 from django.utils import timezone
 from decimal import Decimal, InvalidOperation
 
+
+def parse_amount(value):
+    """
+    Limpia y valida un monto escrito por el usuario (formulario o importación).
+    Devuelve un Decimal positivo o lanza forms.ValidationError.
+    """
+    amount_str = (value or '').strip()
+    
+    # Si está vacío, mostrar error
+    if not amount_str:
+        raise forms.ValidationError("El monto es requerido")
+    
+    # Limpiar el string: remover símbolos de moneda, espacios y comas
+    amount_str = amount_str.replace('$', '').replace(' ', '').replace(',', '')
+    
+    # Si después de limpiar está vacío, error
+    if not amount_str:
+        raise forms.ValidationError("Ingresa un monto válido")
+    
+    # Intentar convertir a Decimal
+    try:
+        # Si hay múltiples puntos, tomar solo el primero
+        parts = amount_str.split('.')
+        if len(parts) > 2:
+            amount_str = parts[0] + '.' + ''.join(parts[1:])
+        
+        amount = Decimal(amount_str)
+    except (InvalidOperation, ValueError):
+        raise forms.ValidationError(
+            "Ingresa un monto válido. Ejemplos: 450000, 450000.00, 4500.50"
+        )
+    
+    if not amount.is_finite():
+        raise forms.ValidationError(
+            "Ingresa un monto válido. Ejemplos: 450000, 450000.00, 4500.50"
+        )
+    
+    # Validar que sea positivo
+    if amount <= Decimal('0'):
+        raise forms.ValidationError("El monto debe ser mayor a 0")
+    
+    # Validar límites razonables
+    if amount > Decimal('1000000000'):  # 1 billón
+        raise forms.ValidationError("El monto es demasiado grande")
+    
+    return amount
+
+
 class TransactionForm(forms.ModelForm):
     def __init__(self, *args, **kwargs):
         # Extraer 'user' de kwargs antes de llamar al padre
@@ -90,54 +138,7 @@ class TransactionForm(forms.ModelForm):
     
     def clean_amount(self):
         """Limpia y valida el campo amount"""
-        amount_str = self.cleaned_data.get('amount', '').strip()
-        
-        # Si está vacío, mostrar error
-        if not amount_str:
-            raise forms.ValidationError("El monto es requerido")
-        
-        # DEBUG: Ver qué valor llega
-        print(f"DEBUG - Monto recibido: '{amount_str}'")
-        
-        # Limpiar el string: remover símbolos de moneda, espacios y comas
-        amount_str = amount_str.replace('$', '').replace(' ', '').replace(',', '')
-        
-        # Si después de limpiar está vacío, error
-        if not amount_str:
-            raise forms.ValidationError("Ingresa un monto válido")
-        
-        # Intentar convertir a Decimal
-        try:
-            # Reemplazar punto decimal si viene con coma (formato europeo)
-            if ',' in amount_str and '.' not in amount_str:
-                amount_str = amount_str.replace(',', '.')
-            
-            # Si hay múltiples puntos, tomar solo el primero
-            parts = amount_str.split('.')
-            if len(parts) > 2:
-                amount_str = parts[0] + '.' + ''.join(parts[1:])
-            
-            # Convertir a Decimal
-            amount = Decimal(amount_str)
-            
-            # DEBUG: Ver el decimal resultante
-            print(f"DEBUG - Monto convertido a Decimal: {amount}")
-            
-        except (InvalidOperation, ValueError) as e:
-            print(f"DEBUG - Error en conversión: {e}")
-            raise forms.ValidationError(
-                f"Ingresa un monto válido. Ejemplos: 450000, 450000.00, 4500.50"
-            )
-        
-        # Validar que sea positivo
-        if amount <= Decimal('0'):
-            raise forms.ValidationError("El monto debe ser mayor a 0")
-        
-        # Validar límites razonables
-        if amount > Decimal('1000000000'):  # 1 billón
-            raise forms.ValidationError("El monto es demasiado grande")
-        
-        return amount
+        return parse_amount(self.cleaned_data.get('amount', ''))
     
     class Meta:
         model = Transaction
@@ -408,10 +409,12 @@ class ContactForm(forms.Form):
 
 class BudgetForm(forms.Form):
     month = forms.DateField(
-        widget=forms.DateInput(attrs={
+        widget=forms.DateInput(format='%Y-%m', attrs={
             'type': 'month',
             'class': 'form-control'
         }),
+        # <input type="month"> envía AAAA-MM
+        input_formats=['%Y-%m', '%Y-%m-%d'],
         label="Mes"
     )
     
@@ -426,6 +429,7 @@ class BudgetForm(forms.Form):
     allocated_amount = forms.DecimalField(
         max_digits=10,
         decimal_places=2,
+        min_value=0,
         widget=forms.NumberInput(attrs={
             'class': 'form-control',
             'step': '0.01',
@@ -434,10 +438,42 @@ class BudgetForm(forms.Form):
         label="Monto Asignado"
     )
     
-    def __init__(self, user=None, *args, **kwargs):
+    def __init__(self, user=None, *args, budget=None, **kwargs):
+        # `budget`: presupuesto que se está editando (None al crear)
+        self.user = user
+        self.budget = budget
+        if budget is not None and 'initial' not in kwargs:
+            kwargs['initial'] = {
+                'month': budget.month,
+                'category': budget.category_id,
+                'allocated_amount': budget.allocated_amount,
+            }
         super(BudgetForm, self).__init__(*args, **kwargs)
         if user:
             self.fields['category'].queryset = Category.objects.filter(user=user)
+    
+    def clean_month(self):
+        return self.cleaned_data['month'].replace(day=1)
+    
+    def clean(self):
+        cleaned_data = super().clean()
+        month = cleaned_data.get('month')
+        category = cleaned_data.get('category')
+        if self.user and month and category:
+            duplicates = Budget.objects.filter(user=self.user, category=category, month=month)
+            if self.budget is not None:
+                duplicates = duplicates.exclude(pk=self.budget.pk)
+            if duplicates.exists():
+                raise forms.ValidationError("Ya existe un presupuesto para esta categoría en ese mes.")
+        return cleaned_data
+    
+    def save(self):
+        budget = self.budget or Budget(user=self.user)
+        budget.month = self.cleaned_data['month']
+        budget.category = self.cleaned_data['category']
+        budget.allocated_amount = self.cleaned_data['allocated_amount']
+        budget.save()
+        return budget
 
 class FilterForm(forms.Form):
     DATE_RANGES = [
@@ -569,4 +605,39 @@ class ProfileUpdateForm(forms.ModelForm):
             }),
         }
 
-        
\ No newline at end of file
+        
+
+class ImportTransactionsForm(forms.Form):
+    FORMATS = [
+        ('', 'Detectar por extensión'),
+        ('csv', 'CSV (mismo formato que la exportación)'),
+        ('ofx', 'OFX (estado de cuenta bancario)'),
+    ]
+    
+    file = forms.FileField(
+        widget=forms.ClearableFileInput(attrs={
+            'class': 'form-control',
+            'accept': '.csv,.ofx,.qfx'
+        }),
+        label="Archivo"
+    )
+    
+    file_format = forms.ChoiceField(
+        choices=FORMATS,
+        required=False,
+        widget=forms.Select(attrs={
+            'class': 'form-control'
+        }),
+        label="Formato"
+    )
+
+
+class ImportValuationsForm(forms.Form):
+    file = forms.FileField(
+        widget=forms.ClearableFileInput(attrs={
+            'class': 'form-control',
+            'accept': '.csv'
+        }),
+        label="Archivo CSV",
+        help_text="Columnas: Inversión, Fecha, Valor"
+    )
@@ -0,0 +1,249 @@
+"""
+Importación masiva de transacciones desde CSV y OFX.
+
+Los archivos se leen en streaming fila por fila. Las categorías se resuelven
+contra un diccionario en memoria (una sola consulta inicial; solo se crea una
+categoría cuando aparece un nombre nuevo), los montos se validan con las mismas
+reglas que TransactionForm y las filas válidas se insertan con bulk_create en
+lotes dentro de una única transacción de base de datos.
+"""
+import csv
+import io
+import re
+from datetime import datetime
+
+from django import forms
+from django.db import transaction as db_transaction
+
+from .forms import parse_amount
+from .models import Category, Transaction
+from .signals import transactions_bulk_created
+
+DEFAULT_BATCH_SIZE = 1000
+
+# Errores por fila que se guardan para mostrar (el resto solo se cuenta)
+MAX_REPORTED_ERRORS = 500
+
+# Mismo formato que produce export_transactions
+CSV_COLUMNS = ['Fecha', 'Descripción', 'Categoría', 'Tipo', 'Monto']
+
+# Categoría usada para movimientos bancarios (OFX), que no traen categoría
+OFX_CATEGORY_NAMES = {
+    'INCOME': 'Ingresos importados',
+    'EXPENSE': 'Gastos importados',
+}
+
+AMOUNT_FIELD = Transaction._meta.get_field('amount')
+
+TYPE_ALIASES = {}
+for code, label in Transaction.TRANSACTION_TYPES:
+    TYPE_ALIASES[code.lower()] = code
+    TYPE_ALIASES[label.lower()] = code
+
+
+class InvalidImportFile(Exception):
+    """Error que impide procesar el archivo completo (formato o encabezado)."""
+
+
+class ImportResult:
+    def __init__(self):
+        self.created = 0
+        self.errors = []
+        self.error_count = 0
+        self.categories_created = []
+
+    def add_error(self, line, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((line, message))
+
+    @property
+    def has_errors(self):
+        return self.error_count > 0
+
+
+def parse_date_value(value):
+    value = (value or '').strip()
+    for date_format in ('%d/%m/%Y', '%Y-%m-%d'):
+        try:
+            return datetime.strptime(value, date_format).date()
+        except ValueError:
+            continue
+    raise forms.ValidationError(f"Fecha no válida: '{value}'")
+
+
+def parse_type_value(value):
+    code = TYPE_ALIASES.get((value or '').strip().lower())
+    if code is None:
+        raise forms.ValidationError(f"Tipo de transacción no válido: '{value}'")
+    return code
+
+
+def _text_stream(fileobj):
+    if isinstance(fileobj, io.TextIOBase):
+        return fileobj
+    return io.TextIOWrapper(fileobj, encoding='utf-8-sig', newline='')
+
+
+def read_csv(fileobj):
+    """
+    Genera (línea, fila) desde un CSV con las columnas de la exportación.
+    La columna "Usuario" de la exportación se ignora.
+    """
+    reader = csv.reader(_text_stream(fileobj))
+    header = next(reader, None)
+    if header is None:
+        raise InvalidImportFile("El archivo está vacío")
+    header = [column.strip() for column in header]
+    missing = [column for column in CSV_COLUMNS if column not in header]
+    if missing:
+        raise InvalidImportFile(f"Faltan columnas en el encabezado: {', '.join(missing)}")
+    positions = {column: header.index(column) for column in CSV_COLUMNS}
+
+    for row in reader:
+        if not any(cell.strip() for cell in row):
+            continue
+        line = reader.line_num
+        if len(row) < len(header):
+            yield line, None
+            continue
+        yield line, {
+            'date': row[positions['Fecha']],
+            'description': row[positions['Descripción']],
+            'category': row[positions['Categoría']],
+            'type': row[positions['Tipo']],
+            'amount': row[positions['Monto']],
+        }
+
+
+OFX_TAG = re.compile(r'<(/?)([A-Z0-9.]+)>([^<\r\n]*)')
+
+
+def read_ofx(fileobj):
+    """
+    Genera (línea, fila) desde un estado de cuenta OFX (SGML 1.x o XML 2.x).
+    Los montos positivos son ingresos y los negativos gastos.
+    """
+    current = None
+    start_line = 0
+    for line_number, line in enumerate(_text_stream(fileobj), start=1):
+        for closing, tag, value in OFX_TAG.findall(line):
+            if tag == 'STMTTRN':
+                if closing:
+                    if current is not None:
+                        yield start_line, _ofx_row(current)
+                    current = None
+                else:
+                    current = {}
+                    start_line = line_number
+            elif current is not None and not closing and value.strip():
+                current[tag] = value.strip()
+    if current:
+        yield start_line, _ofx_row(current)
+
+
+def _ofx_row(fields):
+    amount = fields.get('TRNAMT', '').replace(',', '.')
+    negative = amount.startswith('-')
+    transaction_type = 'EXPENSE' if negative else 'INCOME'
+    posted = fields.get('DTPOSTED', '')[:8]
+    if re.fullmatch(r'\d{8}', posted):
+        posted = f'{posted[:4]}-{posted[4:6]}-{posted[6:]}'
+    description = ' - '.join(value for value in (fields.get('NAME'), fields.get('MEMO')) if value)
+    return {
+        'date': posted,
+        'description': description,
+        'category': OFX_CATEGORY_NAMES[transaction_type],
+        'type': transaction_type,
+        'amount': amount.lstrip('+-'),
+    }
+
+
+READERS = {
+    'csv': read_csv,
+    'ofx': read_ofx,
+}
+
+
+def detect_format(filename):
+    extension = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
+    return 'ofx' if extension in ('ofx', 'qfx') else 'csv'
+
+
+class TransactionImporter:
+    """Convierte filas crudas en transacciones del usuario y las inserta en lotes."""
+
+    def __init__(self, user, batch_size=DEFAULT_BATCH_SIZE):
+        self.user = user
+        self.batch_size = batch_size
+        self.result = ImportResult()
+        self._batch = []
+        # Una sola consulta: nombre (sin mayúsculas) -> categoría
+        self._categories = {}
+        for category in Category.objects.filter(user=user).order_by('created_at'):
+            self._categories.setdefault(category.name.strip().lower(), category)
+
+    def resolve_category(self, name, transaction_type):
+        name = (name or '').strip()
+        if not name:
+            raise forms.ValidationError("La categoría es requerida")
+        key = name.lower()
+        category = self._categories.get(key)
+        if category is None:
+            category = Category.objects.create(user=self.user, name=name[:100], category_type=transaction_type)
+            self._categories[key] = category
+            self.result.categories_created.append(category.name)
+        return category
+
+    def build(self, row):
+        if row is None:
+            raise forms.ValidationError("La fila no tiene todas las columnas")
+        transaction_type = parse_type_value(row['type'])
+        # Mismos límites que la columna (dígitos y decimales): bulk_create no valida y en
+        # PostgreSQL un monto fuera de rango abortaría toda la importación
+        amount = AMOUNT_FIELD.clean(parse_amount(row['amount']), None)
+        date = parse_date_value(row['date'])
+        # La categoría se resuelve al final para no crear categorías por filas inválidas
+        return Transaction(
+            user=self.user,
+            category=self.resolve_category(row['category'], transaction_type),
+            amount=amount,
+            description=(row['description'] or '').strip(),
+            transaction_type=transaction_type,
+            date=date,
+        )
+
+    def flush(self):
+        if not self._batch:
+            return
+        created = Transaction.objects.bulk_create(self._batch)
+        transactions_bulk_created.send(sender=Transaction, user=self.user, transactions=created)
+        self.result.created += len(created)
+        self._batch = []
+
+    def run(self, rows):
+        with db_transaction.atomic():
+            for line, row in rows:
+                try:
+                    self._batch.append(self.build(row))
+                except forms.ValidationError as e:
+                    self.result.add_error(line, '; '.join(e.messages))
+                    continue
+                if len(self._batch) >= self.batch_size:
+                    self.flush()
+            self.flush()
+        return self.result
+
+
+def import_transactions(user, fileobj, file_format='csv', batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Importa un archivo CSV u OFX para `user` y devuelve un ImportResult.
+    Lanza InvalidImportFile si el archivo no tiene el formato esperado.
+    """
+    reader = READERS.get(file_format)
+    if reader is None:
+        raise InvalidImportFile(f"Formato no soportado: {file_format}")
+    try:
+        return TransactionImporter(user, batch_size=batch_size).run(reader(fileobj))
+    except UnicodeDecodeError as e:
+        raise InvalidImportFile("El archivo debe estar codificado en UTF-8") from e
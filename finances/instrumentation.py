@@ -0,0 +1,202 @@
+"""
+Medición por petición: consultas SQL, tiempo en base de datos, consultas
+duplicadas (mismo SQL repetido, típico de un N+1), tiempo de render de
+plantillas y tiempo total por nombre de URL.
+
+La recolecta QueryInstrumentationMiddleware (finances/middleware.py). Este
+módulo no importa modelos para poder usarse desde la configuración de LOGGING.
+"""
+import logging.handlers
+import re
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+from pathlib import Path
+
+from django.template.base import Template
+
+# Métricas de la petición en curso (None fuera de una petición instrumentada)
+current_metrics = ContextVar('finances_request_metrics', default=None)
+
+_IN_LIST = re.compile(r'\bIN\s*\((?:\s*%s\s*,?)+\)', re.IGNORECASE)
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_WHITESPACE = re.compile(r'\s+')
+
+
+def fingerprint(sql):
+    """
+    Normaliza una consulta para agrupar las que solo cambian en sus parámetros:
+    literales y números pasan a `?` y las listas IN (...) se colapsan.
+    """
+    sql = _LITERALS.sub('?', sql)
+    sql = _IN_LIST.sub('IN (...)', sql)
+    return _WHITESPACE.sub(' ', sql).strip()
+
+
+class RequestMetrics:
+    """Contadores de una petición."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.total_ms = 0.0
+        self.sql_ms = 0.0
+        self.template_ms = 0.0
+        self.fingerprints = Counter()
+        self._template_depth = 0
+
+    @property
+    def query_count(self):
+        return sum(self.fingerprints.values())
+
+    def duplicates(self, threshold=2):
+        """[(fingerprint, veces)] de las consultas repetidas `threshold` veces o más."""
+        return [(sql, count) for sql, count in self.fingerprints.most_common() if count >= threshold]
+
+    def finish(self):
+        self.total_ms = (time.perf_counter() - self.started) * 1000
+
+    def __call__(self, execute, sql, params, many, context):
+        # Usado como connection.execute_wrapper
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_ms += (time.perf_counter() - started) * 1000
+            self.fingerprints[fingerprint(sql)] += 1
+
+    def server_timing(self, threshold=2):
+        """Valor del encabezado Server-Timing."""
+        entries = [
+            f'db;dur={self.sql_ms:.1f};desc="{self.query_count} consultas"',
+            f'tpl;dur={self.template_ms:.1f};desc="plantillas"',
+            f'total;dur={self.total_ms:.1f};desc="vista"',
+        ]
+        duplicated = self.duplicates(threshold)
+        if duplicated:
+            repeated = sum(count for _, count in duplicated)
+            entries.append(f'dup;desc="{len(duplicated)} consultas repetidas ({repeated} ejecuciones)"')
+        return ', '.join(entries)
+
+
+def record_query(execute, sql, params, many, context):
+    """
+    execute_wrapper permanente de cada conexión: mide la consulta en las
+    métricas de la petición en curso (si hay). Las métricas viajan en un
+    ContextVar, que asgiref copia al hilo de sync_to_async; así se cuentan
+    también las consultas de las vistas async, que bajo ASGI corren en otro
+    hilo (y con otra conexión) que el middleware.
+    """
+    metrics = current_metrics.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    return metrics(execute, sql, params, many, context)
+
+
+def install_query_hook(connection):
+    """Agrega record_query a la conexión una sola vez (queda instalado mientras viva el objeto)."""
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+_original_template_render = Template.render
+_patch_lock = threading.Lock()
+
+
+def _instrumented_template_render(self, context):
+    metrics = current_metrics.get()
+    if metrics is None:
+        return _original_template_render(self, context)
+    # Solo se mide la plantilla más externa: include/extends quedan dentro de su tiempo
+    metrics._template_depth += 1
+    started = time.perf_counter()
+    try:
+        return _original_template_render(self, context)
+    finally:
+        metrics._template_depth -= 1
+        if metrics._template_depth == 0:
+            metrics.template_ms += (time.perf_counter() - started) * 1000
+
+
+def install_template_timer():
+    """Envuelve Template.render una sola vez (sin costo fuera de peticiones instrumentadas)."""
+    with _patch_lock:
+        if Template.render is not _instrumented_template_render:
+            Template.render = _instrumented_template_render
+
+
+class MetricsRegistry:
+    """
+    Acumulado en memoria por nombre de URL, expuesto en la vista de métricas.
+    De las consultas duplicadas se guardan solo las `max_fingerprints` más
+    repetidas por vista, para que un worker de larga vida no crezca sin límite.
+    """
+
+    def __init__(self, max_fingerprints=20):
+        self.max_fingerprints = max_fingerprints
+        self._lock = threading.Lock()
+        self._views = {}
+
+    def record(self, view_name, metrics, threshold=2):
+        with self._lock:
+            entry = self._views.setdefault(view_name, {
+                'requests': 0,
+                'total_ms': 0.0,
+                'max_total_ms': 0.0,
+                'sql_ms': 0.0,
+                'template_ms': 0.0,
+                'queries': 0,
+                'max_queries': 0,
+                'duplicates': Counter(),
+            })
+            entry['requests'] += 1
+            entry['total_ms'] += metrics.total_ms
+            entry['max_total_ms'] = max(entry['max_total_ms'], metrics.total_ms)
+            entry['sql_ms'] += metrics.sql_ms
+            entry['template_ms'] += metrics.template_ms
+            entry['queries'] += metrics.query_count
+            entry['max_queries'] = max(entry['max_queries'], metrics.query_count)
+            duplicates = entry['duplicates']
+            for sql, count in metrics.duplicates(threshold):
+                duplicates[sql] = max(duplicates[sql], count)
+            if len(duplicates) > self.max_fingerprints:
+                entry['duplicates'] = Counter(dict(duplicates.most_common(self.max_fingerprints)))
+
+    def snapshot(self):
+        with self._lock:
+            views = {}
+            for name, entry in sorted(self._views.items()):
+                requests = entry['requests']
+                views[name] = {
+                    'requests': requests,
+                    'avg_total_ms': round(entry['total_ms'] / requests, 2),
+                    'max_total_ms': round(entry['max_total_ms'], 2),
+                    'avg_sql_ms': round(entry['sql_ms'] / requests, 2),
+                    'avg_template_ms': round(entry['template_ms'] / requests, 2),
+                    'avg_queries': round(entry['queries'] / requests, 2),
+                    'max_queries': entry['max_queries'],
+                    'duplicate_queries': [
+                        {'sql': sql, 'max_repeats': count}
+                        for sql, count in entry['duplicates'].most_common(self.max_fingerprints)
+                    ],
+                }
+            return views
+
+    def reset(self):
+        with self._lock:
+            self._views.clear()
+
+
+registry = MetricsRegistry()
+
+
+class RotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """RotatingFileHandler que crea el directorio del log al escribir por primera vez."""
+
+    def __init__(self, filename, *args, **kwargs):
+        kwargs['delay'] = True
+        super().__init__(filename, *args, **kwargs)
+
+    def _open(self):
+        Path(self.baseFilename).parent.mkdir(parents=True, exist_ok=True)
+        return super()._open()
@@ -0,0 +1,79 @@
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from finances.benchmark import (
+    DEFAULT_PREFIX, ENDPOINTS, BenchmarkError, build_report, compare, load_baseline, run_benchmark, save_report,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide latencia (p50/p95/p99) y número de consultas de las vistas principales con los "
+        "usuarios de seed_benchmark y falla si hay regresiones frente a la línea base."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--prefix', default=DEFAULT_PREFIX)
+        parser.add_argument('--users', type=int, default=10, help="Cuántos usuarios sembrados rotar.")
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument('--warmup', type=int, default=2)
+        parser.add_argument('--endpoint', action='append', dest='endpoints', metavar='NOMBRE',
+                            choices=[endpoint.name for endpoint in ENDPOINTS],
+                            help="Medir solo estos endpoints (se puede repetir).")
+        parser.add_argument('--warm-cache', action='store_true',
+                            help="No vaciar la caché entre peticiones.")
+        parser.add_argument('--baseline', type=Path,
+                            default=Path(settings.BASE_DIR) / 'benchmarks' / 'baseline.json')
+        parser.add_argument('--save-baseline', action='store_true',
+                            help="Guardar el resultado como nueva línea base en lugar de comparar.")
+        parser.add_argument('--threshold', type=float, default=0.2,
+                            help="Regresión tolerada en p95 como fracción (0.2 = 20%%).")
+        parser.add_argument('--output', type=Path, help="Guardar también el resultado en este archivo JSON.")
+
+    def handle(self, *args, **options):
+        if options['iterations'] < 1:
+            raise CommandError("--iterations debe ser mayor que cero")
+        users = list(
+            User.objects.filter(username__startswith=options['prefix']).order_by('username')[:options['users']]
+        )
+        endpoints = [
+            endpoint for endpoint in ENDPOINTS
+            if not options['endpoints'] or endpoint.name in options['endpoints']
+        ]
+        try:
+            results = run_benchmark(users, iterations=options['iterations'], warmup=options['warmup'],
+                                    warm_cache=options['warm_cache'], endpoints=endpoints)
+        except BenchmarkError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(f"{'endpoint':<22}{'p50':>10}{'p95':>10}{'p99':>10}{'max':>10}{'consultas':>11}")
+        for name, row in results.items():
+            self.stdout.write(
+                f"{name:<22}{row['p50_ms']:>10.1f}{row['p95_ms']:>10.1f}{row['p99_ms']:>10.1f}"
+                f"{row['max_ms']:>10.1f}{row['queries']:>11}"
+            )
+
+        report = build_report(results, options['iterations'], users, options['warm_cache'])
+        if options['output']:
+            save_report(report, options['output'])
+
+        baseline_path = options['baseline']
+        if options['save_baseline']:
+            save_report(report, baseline_path)
+            self.stdout.write(self.style.SUCCESS(f"Línea base guardada en {baseline_path}"))
+            return
+        if not baseline_path.exists():
+            self.stdout.write(self.style.WARNING(
+                f"No hay línea base en {baseline_path}; usa --save-baseline para crearla."
+            ))
+            return
+
+        regressions = compare(results, load_baseline(baseline_path), threshold=options['threshold'])
+        for message in regressions:
+            self.stderr.write(message)
+        if regressions:
+            raise CommandError(f"{len(regressions)} regresiones frente a {baseline_path}")
+        self.stdout.write(self.style.SUCCESS("Sin regresiones frente a la línea base."))
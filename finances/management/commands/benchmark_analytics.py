@@ -0,0 +1,49 @@
+from pathlib import Path
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from finances.analytics import DEFAULT_MONTHS
+from finances.benchmark import DEFAULT_PREFIX, BenchmarkError, benchmark_analytics, build_report, save_report
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara el análisis vectorizado (finances.analytics) con la versión de bucles sobre el ORM "
+        "usando los usuarios de seed_benchmark, y mide el cálculo solo con un historial sintético."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--prefix', default=DEFAULT_PREFIX)
+        parser.add_argument('--users', type=int, default=5, help="Cuántos usuarios sembrados rotar.")
+        parser.add_argument('--iterations', type=int, default=10)
+        parser.add_argument('--warmup', type=int, default=1)
+        parser.add_argument('--months', type=int, default=DEFAULT_MONTHS)
+        parser.add_argument('--synthetic-rows', type=int, default=100_000,
+                            help="Transacciones del historial sintético para medir solo el cálculo.")
+        parser.add_argument('--output', type=Path, help="Guardar el resultado en este archivo JSON.")
+
+    def handle(self, *args, **options):
+        if options['iterations'] < 1:
+            raise CommandError("--iterations debe ser mayor que cero")
+        if options['months'] < 2 or options['synthetic_rows'] < 1:
+            raise CommandError("--months debe ser al menos 2 y --synthetic-rows mayor que cero")
+        users = list(
+            User.objects.filter(username__startswith=options['prefix']).order_by('username')[:options['users']]
+        )
+        try:
+            results = benchmark_analytics(users, iterations=options['iterations'], warmup=options['warmup'],
+                                          months=options['months'], synthetic_rows=options['synthetic_rows'])
+        except BenchmarkError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(f"{'variante':<24}{'p50':>10}{'p95':>10}{'max':>10}{'consultas':>11}")
+        for name, row in results.items():
+            self.stdout.write(
+                f"{name:<24}{row['p50_ms']:>10.1f}{row['p95_ms']:>10.1f}{row['max_ms']:>10.1f}{row['queries']:>11}"
+            )
+        speedup = results['orm_loop']['p50_ms'] / max(results['numpy']['p50_ms'], 0.001)
+        self.stdout.write(self.style.SUCCESS(f"NumPy es {speedup:.1f}x más rápido que el bucle con el ORM (p50)."))
+
+        if options['output']:
+            save_report(build_report(results, options['iterations'], users, warm_cache=False), options['output'])
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from finances.benchmark import BenchmarkError, money_microbenchmarks
+
+
+class Command(BaseCommand):
+    help = (
+        "Microbenchmarks del manejo de montos: sumas con Decimal contra centavos enteros y "
+        "serialización de series largas con json/JsonResponse contra fastjson."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--points', type=int, default=50_000, help="Montos en la serie de prueba.")
+        parser.add_argument('--repeat', type=int, default=5, help="Repeticiones (se informa la mejor).")
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        if options['points'] < 1 or options['repeat'] < 1:
+            raise CommandError("--points y --repeat deben ser mayores que cero")
+        try:
+            result = money_microbenchmarks(options['points'], options['repeat'], options['seed'])
+        except BenchmarkError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(f"{result['points']} montos, JSON con {result['backend']}")
+        timings = result['timings_ms']
+        for name, ms in timings.items():
+            self.stdout.write(f"{name:<28}{ms:>10.2f} ms")
+        for label, before, after in [
+            ('sumas', 'sum_decimal', 'sum_cents'),
+            ('serialización', 'serialize_decimal_json', 'serialize_cents_fastjson'),
+            ('respuesta HTTP', 'jsonresponse_decimal', 'fastjsonresponse_cents'),
+        ]:
+            self.stdout.write(self.style.SUCCESS(
+                f"{label}: {timings[before] / max(timings[after], 0.001):.1f}x más rápido con centavos"
+            ))
+        self.stdout.write(f"Diferencia al sumar floats: {result['float_sum_drift']:.2e}")
@@ -0,0 +1,39 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from finances.recurring import DEFAULT_BATCH_SIZE, generate_all_due
+
+
+class Command(BaseCommand):
+    help = (
+        "Genera las ocurrencias vencidas de las transacciones recurrentes. "
+        "Con --loop se queda corriendo como worker y repite cada --interval segundos."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', help="Generar hasta esta fecha (AAAA-MM-DD) en lugar de hoy.")
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                            help="Plantillas por transacción de base de datos.")
+        parser.add_argument('--loop', action='store_true', help="Repetir indefinidamente.")
+        parser.add_argument('--interval', type=int, default=3600, help="Segundos entre corridas con --loop.")
+
+    def handle(self, *args, **options):
+        until = None
+        if options['date']:
+            until = parse_date(options['date'])
+            if until is None:
+                raise CommandError(f"Fecha no válida: {options['date']}")
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size debe ser mayor que cero")
+
+        while True:
+            templates, created = generate_all_due(until, options['batch_size'])
+            self.stdout.write(f"{created} ocurrencias generadas de {templates} plantillas vencidas.")
+            if not options['loop']:
+                break
+            try:
+                time.sleep(options['interval'])
+            except KeyboardInterrupt:
+                break
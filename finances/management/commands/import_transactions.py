@@ -0,0 +1,40 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from finances.importers import DEFAULT_BATCH_SIZE, InvalidImportFile, READERS, detect_format, import_transactions
+
+
+class Command(BaseCommand):
+    help = "Importa transacciones de un archivo CSV (formato de exportación) u OFX para un usuario."
+
+    def add_arguments(self, parser):
+        parser.add_argument('username')
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=sorted(READERS), dest='file_format',
+                            help="Formato del archivo (por defecto se detecta por la extensión).")
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(f"Usuario no encontrado: {options['username']}")
+
+        file_format = options['file_format'] or detect_format(options['path'])
+        try:
+            with open(options['path'], 'rb') as fileobj:
+                result = import_transactions(user, fileobj, file_format, batch_size=options['batch_size'])
+        except OSError as e:
+            raise CommandError(str(e))
+        except InvalidImportFile as e:
+            raise CommandError(str(e))
+
+        for line, message in result.errors:
+            self.stderr.write(f"Línea {line}: {message}")
+        if result.error_count > len(result.errors):
+            self.stderr.write(f"... y {result.error_count - len(result.errors)} errores más")
+        if result.categories_created:
+            self.stdout.write(f"Categorías nuevas: {', '.join(result.categories_created)}")
+        self.stdout.write(self.style.SUCCESS(
+            f"{result.created} transacciones importadas, {result.error_count} filas con errores."
+        ))
@@ -0,0 +1,39 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from finances.importers import DEFAULT_BATCH_SIZE, InvalidImportFile
+from finances.valuations import import_valuations
+
+
+class Command(BaseCommand):
+    help = (
+        "Importa valuaciones de inversiones desde un CSV (Inversión, Fecha, Valor) para un usuario. "
+        "Las fechas ya cargadas se actualizan."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('username')
+        parser.add_argument('path')
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(f"Usuario no encontrado: {options['username']}")
+
+        try:
+            with open(options['path'], 'rb') as fileobj:
+                result = import_valuations(user, fileobj, batch_size=options['batch_size'])
+        except OSError as e:
+            raise CommandError(str(e))
+        except InvalidImportFile as e:
+            raise CommandError(str(e))
+
+        for line, message in result.errors:
+            self.stderr.write(f"Línea {line}: {message}")
+        if result.error_count > len(result.errors):
+            self.stderr.write(f"... y {result.error_count - len(result.errors)} errores más")
+        self.stdout.write(self.style.SUCCESS(
+            f"{result.created} valuaciones importadas, {result.error_count} filas con errores."
+        ))
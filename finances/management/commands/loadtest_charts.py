@@ -0,0 +1,60 @@
+from pathlib import Path
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from finances.benchmark import CHART_ENDPOINTS, DEFAULT_PREFIX, load_test, save_report, session_cookie
+
+
+class Command(BaseCommand):
+    help = (
+        "Prueba de carga de las APIs de gráficos contra servidores ya levantados, para comparar "
+        "WSGI y ASGI con un solo worker. Por ejemplo:\n"
+        "  gunicorn home_finance.wsgi -w 1 -b 127.0.0.1:8000\n"
+        "  uvicorn home_finance.asgi:application --workers 1 --port 8001\n"
+        "  manage.py loadtest_charts --wsgi-url http://127.0.0.1:8000 --asgi-url http://127.0.0.1:8001"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--wsgi-url', help="URL base del servidor WSGI.")
+        parser.add_argument('--asgi-url', help="URL base del servidor ASGI.")
+        parser.add_argument('--username', help=f"Usuario con datos (por defecto el primero '{DEFAULT_PREFIX}*').")
+        parser.add_argument('--concurrency', type=int, default=20)
+        parser.add_argument('--requests', type=int, default=500, help="Peticiones por servidor.")
+        parser.add_argument('--timeout', type=float, default=10)
+        parser.add_argument('--output', type=Path, help="Guardar el resultado en este archivo JSON.")
+
+    def handle(self, *args, **options):
+        targets = [(name, options[f'{name}_url']) for name in ('wsgi', 'asgi') if options[f'{name}_url']]
+        if not targets:
+            raise CommandError("Indica --wsgi-url, --asgi-url o ambos")
+        if options['concurrency'] < 1 or options['requests'] < 1:
+            raise CommandError("--concurrency y --requests deben ser mayores que cero")
+
+        if options['username']:
+            user = User.objects.filter(username=options['username']).first()
+        else:
+            user = User.objects.filter(username__startswith=DEFAULT_PREFIX).order_by('username').first()
+        if user is None:
+            raise CommandError("Usuario no encontrado (ejecuta seed_benchmark o usa --username)")
+        cookie = session_cookie(user)
+
+        results = {}
+        for name, url in targets:
+            self.stdout.write(f"{name.upper()}: {options['requests']} peticiones a {url} "
+                              f"con concurrencia {options['concurrency']}...")
+            results[name] = load_test(url, cookie, CHART_ENDPOINTS, options['concurrency'],
+                                      options['requests'], options['timeout'])
+
+        self.stdout.write(f"{'servidor':<10}{'req/s':>10}{'p50':>10}{'p95':>10}{'p99':>10}{'errores':>10}")
+        for name, row in results.items():
+            self.stdout.write(
+                f"{name:<10}{row['requests_per_second']:>10.1f}{row.get('p50_ms', 0):>10.1f}"
+                f"{row.get('p95_ms', 0):>10.1f}{row.get('p99_ms', 0):>10.1f}{row['errors']:>10}"
+            )
+        if len(results) == 2 and results['wsgi']['requests_per_second']:
+            ratio = results['asgi']['requests_per_second'] / results['wsgi']['requests_per_second']
+            self.stdout.write(f"ASGI/WSGI throughput: {ratio:.2f}x")
+        if options['output']:
+            save_report({'endpoints': [endpoint.name for endpoint in CHART_ENDPOINTS], 'results': results},
+                        options['output'])
@@ -0,0 +1,33 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from finances import balances
+
+
+class Command(BaseCommand):
+    help = "Recalcula DailyBalance desde cero y lo verifica contra los agregados en vivo."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', action='append', dest='usernames', metavar='USERNAME',
+                            help="Limitar a uno o más usuarios (se puede repetir).")
+        parser.add_argument('--check', action='store_true',
+                            help="Solo verificar, sin reconstruir. Falla si hay diferencias.")
+
+    def handle(self, *args, **options):
+        users = None
+        if options['usernames']:
+            users = list(User.objects.filter(username__in=options['usernames']))
+            missing = set(options['usernames']) - {user.username for user in users}
+            if missing:
+                raise CommandError(f"Usuarios no encontrados: {', '.join(sorted(missing))}")
+
+        if not options['check']:
+            created = balances.rebuild(users)
+            self.stdout.write(f"{created} filas de saldo diario recalculadas.")
+
+        drift = balances.find_drift(users)
+        for key, stored, live in drift:
+            self.stderr.write(f"Diferencia en {key}: guardado={stored} en vivo={live}")
+        if drift:
+            raise CommandError(f"{len(drift)} filas no coinciden con los agregados en vivo.")
+        self.stdout.write(self.style.SUCCESS("Los saldos diarios coinciden con los agregados en vivo."))
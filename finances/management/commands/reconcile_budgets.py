@@ -0,0 +1,32 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from finances import budgets
+
+
+class Command(BaseCommand):
+    help = "Recalcula Budget.spent_amount desde las transacciones y corrige las diferencias en bloque."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', action='append', dest='usernames', metavar='USERNAME',
+                            help="Limitar a uno o más usuarios (se puede repetir).")
+        parser.add_argument('--check', action='store_true',
+                            help="Solo verificar, sin corregir. Falla si hay diferencias.")
+
+    def handle(self, *args, **options):
+        users = None
+        if options['usernames']:
+            users = list(User.objects.filter(username__in=options['usernames']))
+            missing = set(options['usernames']) - {user.username for user in users}
+            if missing:
+                raise CommandError(f"Usuarios no encontrados: {', '.join(sorted(missing))}")
+
+        drift = budgets.reconcile(users, fix=not options['check'])
+        for budget, stored, actual in drift:
+            self.stderr.write(f"Diferencia en {budget} ({budget.user_id}): guardado={stored} real={actual}")
+        if options['check']:
+            if drift:
+                raise CommandError(f"{len(drift)} presupuestos no coinciden con las transacciones.")
+            self.stdout.write(self.style.SUCCESS("Los presupuestos coinciden con las transacciones."))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"{len(drift)} presupuestos corregidos."))
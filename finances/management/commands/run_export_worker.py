@@ -0,0 +1,79 @@
+import multiprocessing
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+
+from finances import export_worker
+from finances.exports import claim_next, purge_expired, run_pending
+
+
+class Command(BaseCommand):
+    help = (
+        "Procesa la cola de exportaciones (ExportJob). Sin --once se queda corriendo y revisa "
+        "la cola cada --interval segundos. Con --processes N genera hasta N archivos a la vez "
+        "en un pool de procesos."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Vaciar la cola una vez y salir.")
+        parser.add_argument('--interval', type=float, default=2, help="Segundos entre revisiones de la cola.")
+        parser.add_argument('--processes', type=int, default=0,
+                            help="Procesos del pool (0: generar en este mismo proceso).")
+
+    def handle(self, *args, **options):
+        if options['processes'] < 0:
+            raise CommandError("--processes no puede ser negativo")
+        if options['processes']:
+            self.run_pool(options)
+        else:
+            self.run_inline(options)
+
+    def run_inline(self, options):
+        while True:
+            purge_expired()
+            processed = run_pending()
+            if processed:
+                self.stdout.write(f"{processed} exportaciones procesadas.")
+            if options['once']:
+                return
+            close_old_connections()
+            try:
+                time.sleep(options['interval'])
+            except KeyboardInterrupt:
+                return
+
+    def run_pool(self, options):
+        # spawn: los procesos hijos no heredan las conexiones abiertas de este proceso
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(options['processes'], mp_context=context, initializer=export_worker.init_process) as pool:
+            running = {}
+            try:
+                while True:
+                    purge_expired()
+                    while len(running) < options['processes']:
+                        job_id = claim_next()
+                        if job_id is None:
+                            break
+                        try:
+                            running[pool.submit(export_worker.run_job, job_id)] = job_id
+                        except BrokenProcessPool as e:
+                            raise CommandError(f"El pool de procesos dejó de funcionar: {e}")
+                    if not running:
+                        if options['once']:
+                            return
+                        close_old_connections()
+                        time.sleep(options['interval'])
+                        continue
+                    done, _ = wait(running, timeout=options['interval'], return_when=FIRST_COMPLETED)
+                    for future in done:
+                        job_id = running.pop(future)
+                        try:
+                            self.stdout.write(f"Exportación {job_id}: {future.result()}")
+                        except Exception as e:
+                            # El proceso murió: el trabajo se vuelve a tomar cuando pase STALE_AFTER
+                            self.stderr.write(f"Exportación {job_id}: el proceso falló ({e})")
+            except KeyboardInterrupt:
+                return
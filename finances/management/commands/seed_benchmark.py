@@ -0,0 +1,49 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from finances.benchmark import DEFAULT_BATCH_SIZE, DEFAULT_PASSWORD, DEFAULT_PREFIX, seed_users
+
+
+class Command(BaseCommand):
+    help = (
+        "Genera usuarios sintéticos con categorías, transacciones recurrentes y sueltas, "
+        "inversiones y presupuestos para medir rendimiento (p. ej. --users 1000 --transactions 50000)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10)
+        parser.add_argument('--transactions', type=int, default=2000, help="Transacciones por usuario.")
+        parser.add_argument('--months', type=int, default=24, help="Meses de historia hacia atrás.")
+        parser.add_argument('--prefix', default=DEFAULT_PREFIX, help="Prefijo de los nombres de usuario.")
+        parser.add_argument('--password', default=DEFAULT_PASSWORD)
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+        parser.add_argument('--seed', type=int, help="Semilla para obtener siempre los mismos datos.")
+        parser.add_argument('--clear', action='store_true',
+                            help="Borrar antes los usuarios existentes con el prefijo.")
+
+    def handle(self, *args, **options):
+        if options['users'] < 1 or options['months'] < 1 or options['batch_size'] < 1:
+            raise CommandError("--users, --months y --batch-size deben ser mayores que cero")
+
+        prefix = options['prefix']
+        if options['clear']:
+            deleted, _ = User.objects.filter(username__startswith=prefix).delete()
+            self.stdout.write(f"{deleted} registros borrados de usuarios '{prefix}*'.")
+
+        def progress(done, total, created):
+            if done == total or done % max(total // 20, 1) == 0:
+                self.stdout.write(f"  {done}/{total} usuarios, {created} transacciones")
+
+        users, created = seed_users(
+            options['users'],
+            transactions=options['transactions'],
+            months=options['months'],
+            prefix=prefix,
+            password=options['password'],
+            batch_size=options['batch_size'],
+            seed=options['seed'],
+            progress=progress,
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(users)} usuarios y {created} transacciones creados (contraseña: {options['password']})."
+        ))
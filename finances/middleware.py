@@ -0,0 +1,104 @@
+import json
+import logging
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from .instrumentation import (
+    RequestMetrics, current_metrics, install_query_hook, install_template_timer, registry,
+)
+
+logger = logging.getLogger('finances.instrumentation')
+
+# Nombre con que se registran las peticiones que no resolvieron ninguna URL
+UNRESOLVED_VIEW = '<sin ruta>'
+
+
+class QueryInstrumentationMiddleware:
+    """
+    Mide consultas, tiempo SQL, consultas duplicadas, render de plantillas y
+    tiempo total de cada petición. Agrega el encabezado Server-Timing, registra
+    una línea por petición en el logger `finances.instrumentation` (advertencia
+    si hay consultas repetidas) y acumula los datos para la vista de métricas.
+
+    Se activa con FINANCES_INSTRUMENTATION en settings. Funciona igual bajo
+    WSGI y ASGI (las vistas async no se fuerzan a correr en un hilo). Las
+    consultas se cuentan con un execute_wrapper permanente en cada conexión
+    (instrumentation.record_query), porque bajo ASGI el ORM corre en el hilo
+    de sync_to_async, con conexiones distintas a las del hilo del middleware.
+    No se cuentan consultas hechas desde otros hilos (sync_to_async con
+    thread_sensitive=False o hilos propios de la vista).
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'FINANCES_INSTRUMENTATION', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.threshold = getattr(settings, 'FINANCES_DUPLICATE_QUERY_THRESHOLD', 2)
+        install_template_timer()
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    @contextmanager
+    def measure(self):
+        metrics = RequestMetrics()
+        token = current_metrics.set(metrics)
+        try:
+            yield metrics
+        finally:
+            current_metrics.reset(token)
+            metrics.finish()
+
+    @staticmethod
+    def install_query_hooks():
+        # Las conexiones son por hilo: el hook queda en las del hilo que llama (una sola vez)
+        for connection in connections.all():
+            install_query_hook(connection)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        self.install_query_hooks()
+        with self.measure() as metrics:
+            response = self.get_response(request)
+        return self.process(request, response, metrics)
+
+    async def __acall__(self, request):
+        # Se instala en el hilo de sync_to_async de esta petición, donde corre el ORM de las vistas
+        await sync_to_async(self.install_query_hooks)()
+        with self.measure() as metrics:
+            response = await self.get_response(request)
+        return self.process(request, response, metrics)
+
+    def process(self, request, response, metrics):
+        match = getattr(request, 'resolver_match', None)
+        # Sin ruta (404): un solo nombre, no uno por path, para acotar el registro
+        view_name = match.view_name if match else UNRESOLVED_VIEW
+        response['Server-Timing'] = metrics.server_timing(self.threshold)
+        registry.record(view_name, metrics, self.threshold)
+        self.log(request, view_name, response, metrics)
+        return response
+
+    def log(self, request, view_name, response, metrics):
+        duplicates = metrics.duplicates(self.threshold)
+        record = {
+            'view': view_name,
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'total_ms': round(metrics.total_ms, 2),
+            'sql_ms': round(metrics.sql_ms, 2),
+            'template_ms': round(metrics.template_ms, 2),
+            'queries': metrics.query_count,
+        }
+        if duplicates:
+            record['duplicates'] = [{'sql': sql, 'count': count} for sql, count in duplicates]
+            logger.warning('Consultas repetidas en %s: %s', view_name, json.dumps(record, ensure_ascii=False))
+        else:
+            logger.info(json.dumps(record, ensure_ascii=False))
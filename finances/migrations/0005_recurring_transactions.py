@@ -0,0 +1,71 @@
+# Generated by Django 5.2.18 on 2026-10-17 20:43
+
+import calendar
+from datetime import timedelta
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+# Copia de la aritmética de finances.recurring al momento de esta migración:
+# las migraciones no deben depender del código actual de la app.
+def add_months(anchor, months):
+    month_index = anchor.month - 1 + months
+    year = anchor.year + month_index // 12
+    month = month_index % 12 + 1
+    day = min(anchor.day, calendar.monthrange(year, month)[1])
+    return anchor.replace(year=year, month=month, day=day)
+
+
+# Primera ocurrencia después de la plantilla, según el intervalo
+FIRST_OCCURRENCE = {
+    'DAILY': lambda anchor: anchor + timedelta(days=1),
+    'WEEKLY': lambda anchor: anchor + timedelta(weeks=1),
+    'MONTHLY': lambda anchor: add_months(anchor, 1),
+    'YEARLY': lambda anchor: add_months(anchor, 12),
+}
+
+
+def schedule_existing_templates(apps, schema_editor):
+    # Las transacciones marcadas como recurrentes hasta ahora nunca generaron
+    # ocurrencias: se vuelven plantillas y el generador completa lo pendiente.
+    Transaction = apps.get_model('finances', 'Transaction')
+    templates = list(
+        Transaction.objects
+        .filter(is_recurring=True, recurrence_parent__isnull=True, recurrence_interval__in=FIRST_OCCURRENCE)
+        .only('id', 'date', 'recurrence_interval')
+    )
+    for template in templates:
+        template.next_occurrence = FIRST_OCCURRENCE[template.recurrence_interval](template.date)
+    Transaction.objects.bulk_update(templates, ['next_occurrence'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finances', '0004_transaction_recent_index_id'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='transaction',
+            name='next_occurrence',
+            field=models.DateField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='transaction',
+            name='recurrence_parent',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='occurrences', to='finances.transaction'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(condition=models.Q(('next_occurrence__isnull', False)), fields=['next_occurrence'], name='txn_recurring_due_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='transaction',
+            constraint=models.UniqueConstraint(fields=('recurrence_parent', 'date'), name='txn_unique_occurrence'),
+        ),
+        migrations.RunPython(schedule_existing_templates, migrations.RunPython.noop),
+    ]
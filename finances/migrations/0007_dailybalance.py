@@ -0,0 +1,61 @@
+# Generated by Django 5.2.18 on 2026-10-17 20:57
+
+from decimal import Decimal
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Q, Sum
+
+
+def populate_balances(apps, schema_editor):
+    Transaction = apps.get_model('finances', 'Transaction')
+    DailyBalance = apps.get_model('finances', 'DailyBalance')
+    signs = {'INCOME': 1, 'EXPENSE': -1, 'INVESTMENT': -1}
+    rows = (
+        Transaction.objects
+        .values('user_id', 'date')
+        .annotate(**{
+            transaction_type: Sum('amount', filter=Q(transaction_type=transaction_type))
+            for transaction_type in signs
+        })
+        .order_by('user_id', 'date')
+    )
+    balances = []
+    user_id = None
+    for row in rows.iterator():
+        if row['user_id'] != user_id:
+            user_id = row['user_id']
+            balance = Decimal('0')
+        net = sum((sign * (row[transaction_type] or 0) for transaction_type, sign in signs.items()), Decimal('0'))
+        if not net:
+            continue
+        balance += net
+        balances.append(DailyBalance(user_id=user_id, date=row['date'], net=net, balance=balance))
+    DailyBalance.objects.bulk_create(balances, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finances', '0006_dataversion'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyBalance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('net', models.DecimalField(decimal_places=2, default=0, help_text='Ingresos − gastos − inversiones del día', max_digits=14)),
+                ('balance', models.DecimalField(decimal_places=2, default=0, help_text='Saldo al cierre del día', max_digits=14)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_balances', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['date'],
+                'constraints': [models.UniqueConstraint(fields=('user', 'date'), name='daily_balance_unique_day')],
+            },
+        ),
+        migrations.RunPython(populate_balances, migrations.RunPython.noop),
+    ]
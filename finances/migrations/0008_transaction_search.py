@@ -0,0 +1,54 @@
+# Generated by Django 5.2.18 on 2026-10-17 21:00
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.conf import settings
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+from django.db.models import OuterRef, Subquery
+
+SEARCH_INDEX = django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='txn_search_vector_idx')
+
+
+def add_search_index(apps, schema_editor):
+    # GIN y tsvector solo existen en PostgreSQL; en otros motores la búsqueda usa icontains
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    Transaction = apps.get_model('finances', 'Transaction')
+    Category = apps.get_model('finances', 'Category')
+    category_name = Subquery(Category.objects.filter(pk=OuterRef('category_id')).values('name'))
+    Transaction.objects.update(search_vector=(
+        SearchVector('description', weight='A', config='simple')
+        + SearchVector(category_name, weight='B', config='simple')
+    ))
+    schema_editor.add_index(Transaction, SEARCH_INDEX)
+
+
+def remove_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.remove_index(apps.get_model('finances', 'Transaction'), SEARCH_INDEX)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finances', '0007_dailybalance'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='transaction',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddIndex(model_name='transaction', index=SEARCH_INDEX),
+            ],
+            database_operations=[
+                migrations.RunPython(add_search_index, remove_search_index),
+            ],
+        ),
+    ]
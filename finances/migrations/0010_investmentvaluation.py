@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-17 21:22
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finances', '0009_exportjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InvestmentValuation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('value', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('investment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='valuations', to='finances.investment')),
+            ],
+            options={
+                'ordering': ['date'],
+                'constraints': [models.UniqueConstraint(fields=('investment', 'date'), name='investment_valuation_unique_day')],
+            },
+        ),
+    ]
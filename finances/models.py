@@ -1,3 +1,5 @@
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 from django.contrib.auth.models import User
 from django.utils import timezone
@@ -45,14 +47,99 @@ class Transaction(models.Model):
         ('MONTHLY', 'Mensual'),
         ('YEARLY', 'Anual'),
     ])
+    # Ocurrencias generadas por finances/recurring.py: apuntan a su plantilla
+    recurrence_parent = models.ForeignKey('self', on_delete=models.SET_NULL, null=True, blank=True,
+                                          related_name='occurrences')
+    # En plantillas recurrentes: próxima fecha pendiente de generar
+    next_occurrence = models.DateField(null=True, blank=True, editable=False)
+    # Descripción y categoría para la búsqueda de texto (solo PostgreSQL, ver search.py)
+    search_vector = SearchVectorField(null=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    # Campos que afectan los totales materializados (MonthlySummary)
+    TRACKED_FIELDS = ('user_id', 'category_id', 'transaction_type', 'date', 'amount')
+    
     class Meta:
         ordering = ['-date', '-created_at']
+        indexes = [
+            # Sumas por tipo en un rango de fechas (dashboard, reportes, APIs).
+            # En PostgreSQL `amount` va incluido para resolverlas solo con el índice.
+            models.Index(fields=['user', 'transaction_type', 'date'], include=['amount'],
+                         name='txn_user_type_date_idx'),
+            # Rollups y filtros por categoría en un rango de fechas
+            models.Index(fields=['user', 'category', 'date'], include=['amount'],
+                         name='txn_user_category_date_idx'),
+            # Listados ordenados por -date, -created_at (id desempata la paginación por cursor)
+            models.Index(fields=['user', '-date', '-created_at', '-id'], name='txn_user_recent_idx'),
+            # Plantillas recurrentes vencidas (solo indexa las que tienen marca de agua)
+            models.Index(fields=['next_occurrence'], condition=models.Q(next_occurrence__isnull=False),
+                         name='txn_recurring_due_idx'),
+            # Búsqueda de texto completo (la migración solo lo crea en PostgreSQL)
+            GinIndex(fields=['search_vector'], name='txn_search_vector_idx'),
+        ]
+        constraints = [
+            # Una ocurrencia por plantilla y fecha: generar dos veces no duplica
+            models.UniqueConstraint(fields=['recurrence_parent', 'date'], name='txn_unique_occurrence'),
+        ]
     
     def __str__(self):
         return f"{self.description}: ${self.amount}"
+    
+    def save(self, *args, **kwargs):
+        self.schedule_recurrence()
+        super().save(*args, **kwargs)
+        self._loaded_values = dict(getattr(self, '_loaded_values', None) or {}, **self.recurrence_state())
+    
+    def is_recurrence_template(self):
+        return bool(self.is_recurring and self.recurrence_interval and not self.recurrence_parent_id)
+    
+    def recurrence_state(self):
+        """Fecha de referencia e intervalo actuales de la plantilla."""
+        return {
+            'date': self._meta.get_field('date').to_python(self.date),
+            'recurrence_interval': self.recurrence_interval,
+        }
+    
+    def recurrence_changed(self):
+        """True si la fecha o el intervalo cambiaron desde que se leyó de la base de datos."""
+        loaded = getattr(self, '_loaded_values', None) or {}
+        return any(
+            field in loaded and loaded[field] != value
+            for field, value in self.recurrence_state().items()
+        )
+    
+    def schedule_recurrence(self):
+        """
+        Calcula la marca de agua de una plantilla recurrente (o la quita si dejó
+        de serlo). Si cambia la fecha o el intervalo se vuelve a anclar: sigue
+        después de la última ocurrencia ya generada con la nueva cadencia.
+        """
+        if not self.is_recurrence_template():
+            self.next_occurrence = None
+        elif self.next_occurrence is None or self.recurrence_changed():
+            from .recurring import first_pending
+            last = self.occurrences.aggregate(last=models.Max('date'))['last'] if self.pk else None
+            state = self.recurrence_state()
+            self.next_occurrence = first_pending(state['date'], self.recurrence_interval, last)
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Guardar los valores leídos para poder calcular deltas al editar
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+    
+    def tracked_state(self):
+        """Valores actuales de los campos que alimentan los resúmenes."""
+        return {field: getattr(self, field) for field in self.TRACKED_FIELDS}
+    
+    def loaded_state(self):
+        """Valores tal como se leyeron de la base de datos (None si no aplica)."""
+        loaded = getattr(self, '_loaded_values', None)
+        if not loaded or any(field not in loaded for field in self.TRACKED_FIELDS):
+            return None
+        return {field: loaded[field] for field in self.TRACKED_FIELDS}
 
 class Investment(models.Model):
     INVESTMENT_TYPES = [
@@ -88,6 +175,26 @@ class Investment(models.Model):
         """Return on Investment"""
         return ((self.current_value - self.initial_amount) / self.initial_amount) * 100
 
+class InvestmentValuation(models.Model):
+    """
+    Valor de mercado de una inversión al cierre de un día. Se cargan en lote
+    desde CSV (valuations.import_valuations) y alimentan el valor del
+    portafolio, el retorno ponderado por tiempo y la distribución por tipo.
+    """
+    investment = models.ForeignKey(Investment, on_delete=models.CASCADE, related_name='valuations')
+    date = models.DateField()
+    value = models.DecimalField(max_digits=12, decimal_places=2)
+    
+    class Meta:
+        ordering = ['date']
+        constraints = [
+            # También es el índice de las lecturas por inversión y rango de fechas
+            models.UniqueConstraint(fields=['investment', 'date'], name='investment_valuation_unique_day'),
+        ]
+    
+    def __str__(self):
+        return f"{self.investment_id} {self.date}: ${self.value}"
+
 class Budget(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='budgets')
     category = models.ForeignKey(Category, on_delete=models.CASCADE)
@@ -103,10 +210,129 @@ class Budget(models.Model):
     def __str__(self):
         return f"{self.category.name} - {self.month.strftime('%B %Y')}"
     
+    def save(self, *args, **kwargs):
+        # Un presupuesto cubre el mes completo: se guarda siempre con el día 1
+        self.month = self._meta.get_field('month').to_python(self.month).replace(day=1)
+        super().save(*args, **kwargs)
+    
     def remaining(self):
         return self.allocated_amount - self.spent_amount
     
     def spent_percentage(self):
         if self.allocated_amount == 0:
             return 0
-        return (self.spent_amount / self.allocated_amount) * 100
\ No newline at end of file
+        return (self.spent_amount / self.allocated_amount) * 100
+
+class MonthlySummary(models.Model):
+    """
+    Totales materializados por (usuario, mes, categoría, tipo).
+    Se actualiza de forma incremental desde las señales de Transaction
+    y se puede recalcular con `manage.py rebuild_summaries`.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='monthly_summaries')
+    month = models.DateField(help_text="Primer día del mes")
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='monthly_summaries')
+    transaction_type = models.CharField(max_length=20, choices=Transaction.TRANSACTION_TYPES)
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    count = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name_plural = "Monthly summaries"
+        unique_together = ['user', 'month', 'category', 'transaction_type']
+        ordering = ['month']
+    
+    def __str__(self):
+        return f"{self.month.strftime('%Y-%m')} {self.category_id} {self.transaction_type}: ${self.total}"
+
+class DailyBalance(models.Model):
+    """
+    Saldo acumulado por (usuario, día con movimientos). Se actualiza de forma
+    incremental desde las señales de Transaction (ver balances.py) y se puede
+    recalcular con `manage.py rebuild_balances`.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='daily_balances')
+    date = models.DateField()
+    net = models.DecimalField(max_digits=14, decimal_places=2, default=0,
+                              help_text="Ingresos − gastos − inversiones del día")
+    balance = models.DecimalField(max_digits=14, decimal_places=2, default=0, help_text="Saldo al cierre del día")
+    
+    class Meta:
+        ordering = ['date']
+        constraints = [
+            # También es el índice de las búsquedas "último día hasta la fecha"
+            models.UniqueConstraint(fields=['user', 'date'], name='daily_balance_unique_day'),
+        ]
+    
+    def __str__(self):
+        return f"{self.user_id} {self.date}: ${self.balance}"
+
+class DataVersion(models.Model):
+    """
+    Versión de los datos de un usuario: se incrementa cada vez que cambia una
+    Transaction, Category o Investment suya (ver signals.py). Las respuestas
+    condicionales (finances/conditional.py) la leen por clave primaria para
+    contestar 304 sin recalcular nada.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='data_version')
+    version = models.PositiveBigIntegerField(default=1)
+    updated_at = models.DateTimeField(default=timezone.now)
+    
+    def __str__(self):
+        return f"{self.user_id} v{self.version}"
+
+class ExportJob(models.Model):
+    """
+    Exportación en segundo plano. La crea la vista `export_jobs` con los filtros
+    del listado de transacciones y la procesa `manage.py run_export_worker`
+    (ver exports.py); el archivo queda en MEDIA_ROOT hasta que expira.
+    """
+    STATUS_CHOICES = [
+        ('PENDING', 'En cola'),
+        ('RUNNING', 'En proceso'),
+        ('DONE', 'Lista'),
+        ('FAILED', 'Con error'),
+    ]
+    FORMAT_CHOICES = [
+        ('csv', 'CSV'),
+        ('xlsx', 'Excel (XLSX)'),
+        ('parquet', 'Parquet'),
+    ]
+    
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='export_jobs')
+    file_format = models.CharField(max_length=10, choices=FORMAT_CHOICES)
+    filters = models.JSONField(default=dict, blank=True, help_text="Filtros del listado (type, category, fechas, q)")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='PENDING')
+    total_rows = models.PositiveIntegerField(null=True, blank=True)
+    processed_rows = models.PositiveIntegerField(default=0)
+    file = models.FileField(upload_to='exports/', blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    # También sirve de latido: el worker lo actualiza con cada avance
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            # Cola: el worker toma el trabajo pendiente más antiguo
+            models.Index(fields=['status', 'created_at'], name='export_job_queue_idx'),
+            models.Index(fields=['user', '-created_at'], name='export_job_user_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.user} {self.file_format} ({self.get_status_display()})"
+    
+    @property
+    def progress(self):
+        """Porcentaje procesado (0-100)."""
+        if self.status == 'DONE':
+            return 100
+        if not self.total_rows:
+            return 0
+        return min(100, int(self.processed_rows * 100 / self.total_rows))
+    
+    @property
+    def is_finished(self):
+        return self.status in ('DONE', 'FAILED')
@@ -0,0 +1,46 @@
+"""
+Montos de dinero como enteros en centavos.
+
+Las agregaciones suman en SQL y devuelven centavos (`cents_sum`), así que las
+series de gráficos y los totales se arman con aritmética de enteros en Python
+en lugar de Decimal. Los montos se convierten solo al salir: `to_float` para
+JSON y gráficos (una sola división, sin acumular error de redondeo) y
+`to_decimal` para las plantillas y formularios.
+"""
+from decimal import Decimal
+
+from django.db.models import BigIntegerField, Sum
+from django.db.models.functions import Cast, Coalesce, Round
+
+CENTS = 100
+
+
+def cents_sum(field, **extra):
+    """Suma de un campo de dinero en centavos, calculada en SQL (0 si no hay filas)."""
+    return Coalesce(
+        Cast(Round(Sum(field, **extra) * CENTS), BigIntegerField()),
+        0,
+        output_field=BigIntegerField(),
+    )
+
+
+def to_cents(amount):
+    """Decimal (o None) a centavos enteros."""
+    if amount is None:
+        return 0
+    return int(Decimal(amount).scaleb(2).to_integral_value())
+
+
+def to_float(cents):
+    """Centavos a pesos como float, para JSON y gráficos."""
+    return cents / CENTS
+
+
+def to_decimal(cents):
+    """Centavos a pesos como Decimal con dos decimales, para plantillas."""
+    return Decimal(cents).scaleb(-2)
+
+
+def percentage(part, whole):
+    """part / whole × 100 como float (0 si whole es 0)."""
+    return part * 100 / whole if whole else 0.0
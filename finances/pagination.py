@@ -0,0 +1,124 @@
+"""
+Paginación por cursor (keyset) para listados ordenados.
+
+En lugar de OFFSET, cada página pide las filas "después" de la última fila de
+la página anterior según la clave de ordenamiento, por defecto
+(date, created_at, id) descendente. El costo de una página no depende de qué
+tan atrás esté, y las inserciones nuevas no desplazan ni duplican filas entre
+páginas.
+"""
+import base64
+import json
+
+from datetime import date, datetime
+from decimal import Decimal
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+
+DEFAULT_ORDERING = ('-date', '-created_at', '-id')
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+class KeysetPage:
+    def __init__(self, items, next_cursor, page_size):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.page_size = page_size
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+
+def parse_page_size(value, default=DEFAULT_PAGE_SIZE):
+    """Tamaño de página pedido por el usuario, acotado a [1, MAX_PAGE_SIZE]."""
+    try:
+        size = int(value)
+    except (TypeError, ValueError):
+        return default
+    return max(1, min(size, MAX_PAGE_SIZE))
+
+
+def _field_names(ordering):
+    return [name.lstrip('-') for name in ordering]
+
+
+def _json_default(value):
+    # isoformat completo: el cursor necesita los microsegundos de created_at
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError(f"{type(value).__name__} no se puede serializar en un cursor")
+
+
+def encode_cursor(obj, ordering=DEFAULT_ORDERING):
+    values = [getattr(obj, name) for name in _field_names(ordering)]
+    raw = json.dumps(values, default=_json_default, separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, model, ordering=DEFAULT_ORDERING, annotations=None):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor("Cursor no válido") from e
+    names = _field_names(ordering)
+    if not isinstance(values, list) or len(values) != len(names):
+        raise InvalidCursor("Cursor no válido")
+    decoded = []
+    for name, value in zip(names, values):
+        try:
+            field = model._meta.get_field(name)
+        except FieldDoesNotExist:
+            # Anotaciones (p. ej. un ranking): se convierten con su output_field
+            annotation = (annotations or {}).get(name)
+            if annotation is None:
+                decoded.append(value)
+                continue
+            field = annotation.output_field
+        try:
+            decoded.append(field.to_python(value))
+        except ValidationError as e:
+            raise InvalidCursor("Cursor no válido") from e
+    return decoded
+
+
+def _after(ordering, values):
+    """Condición "fila posterior al cursor" para un ordenamiento compuesto."""
+    condition = Q()
+    equal = {}
+    for name, value in zip(ordering, values):
+        field = name.lstrip('-')
+        lookup = 'lt' if name.startswith('-') else 'gt'
+        condition |= Q(**equal, **{f'{field}__{lookup}': value})
+        equal[field] = value
+    return condition
+
+
+def paginate(queryset, cursor=None, page_size=DEFAULT_PAGE_SIZE, ordering=DEFAULT_ORDERING):
+    """
+    Devuelve la página que sigue a `cursor` (o la primera si es None).
+    Lanza InvalidCursor si el cursor no se puede decodificar.
+    """
+    queryset = queryset.order_by(*ordering)
+    if cursor:
+        values = decode_cursor(cursor, queryset.model, ordering, queryset.query.annotations)
+        queryset = queryset.filter(_after(ordering, values))
+    rows = list(queryset[:page_size + 1])
+    items = rows[:page_size]
+    next_cursor = encode_cursor(items[-1], ordering) if len(rows) > page_size else None
+    return KeysetPage(items, next_cursor, page_size)
@@ -0,0 +1,145 @@
+"""
+Generación de transacciones recurrentes.
+
+Una plantilla es una Transaction con `is_recurring=True`, un
+`recurrence_interval` y sin `recurrence_parent`; su fecha es la primera
+ocurrencia y fija el día de referencia. `next_occurrence` guarda la
+próxima fecha pendiente (la marca de agua), así que cada corrida solo lee
+las plantillas vencidas a través de un índice parcial.
+
+Las ocurrencias generadas apuntan a su plantilla con `recurrence_parent` y
+una restricción única (plantilla, fecha) impide duplicados. La marca de agua
+se avanza en la misma transacción que inserta las ocurrencias: si el proceso
+se interrumpe, la siguiente corrida retoma desde el mismo punto.
+"""
+import calendar
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import transaction as db_transaction
+from django.utils import timezone
+
+from .models import Transaction
+from .signals import transactions_bulk_created
+
+DEFAULT_BATCH_SIZE = 1000
+
+
+def add_months(anchor, months):
+    """Suma meses a `anchor` ajustando el día al último del mes si no existe (31 → 30, 28 o 29)."""
+    month_index = anchor.month - 1 + months
+    year = anchor.year + month_index // 12
+    month = month_index % 12 + 1
+    day = min(anchor.day, calendar.monthrange(year, month)[1])
+    return anchor.replace(year=year, month=month, day=day)
+
+
+def next_occurrence_after(anchor, interval, current):
+    """
+    Fecha de la ocurrencia que sigue a `current` para una plantilla con fecha
+    `anchor`. Los meses y años se cuentan desde `anchor`, no desde `current`,
+    para que un 31 ajustado a 28 de febrero vuelva a ser 31 en marzo y un
+    29 de febrero vuelva a serlo en el siguiente año bisiesto.
+    """
+    if interval == 'DAILY':
+        return current + timedelta(days=1)
+    if interval == 'WEEKLY':
+        return current + timedelta(weeks=1)
+    if interval == 'MONTHLY':
+        elapsed = (current.year - anchor.year) * 12 + current.month - anchor.month
+        return add_months(anchor, elapsed + 1)
+    if interval == 'YEARLY':
+        return add_months(anchor, (current.year - anchor.year + 1) * 12)
+    raise ValueError(f"Intervalo de recurrencia no válido: {interval!r}")
+
+
+def first_pending(anchor, interval, after=None):
+    """
+    Primera ocurrencia de una plantilla con fecha `anchor` posterior a la
+    plantilla misma y, si se indica, a la fecha `after` (la última ya generada).
+    """
+    current = next_occurrence_after(anchor, interval, anchor)
+    while after is not None and current <= after:
+        current = next_occurrence_after(anchor, interval, current)
+    return current
+
+
+def due_templates(today):
+    return (
+        Transaction.objects
+        .filter(
+            is_recurring=True,
+            recurrence_parent__isnull=True,
+            next_occurrence__isnull=False,
+            next_occurrence__lte=today,
+        )
+        .exclude(recurrence_interval='')
+        .order_by('next_occurrence', 'id')
+    )
+
+
+def occurrence_for(template, date):
+    return Transaction(
+        user_id=template.user_id,
+        category_id=template.category_id,
+        amount=template.amount,
+        description=template.description,
+        transaction_type=template.transaction_type,
+        date=date,
+        recurrence_parent=template,
+    )
+
+
+def generate_due(today=None, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Genera las ocurrencias vencidas hasta `today` (inclusive) de un lote de
+    hasta `batch_size` plantillas. Devuelve (plantillas procesadas, ocurrencias creadas).
+    """
+    today = today or timezone.localdate()
+    with db_transaction.atomic():
+        # skip_locked: dos workers simultáneos no toman la misma plantilla
+        templates = list(
+            due_templates(today)
+            .select_related('user')
+            .select_for_update(skip_locked=True, of=('self',))[:batch_size]
+        )
+        if not templates:
+            return 0, 0
+
+        first_due = min(template.next_occurrence for template in templates)
+        pending = []
+        for template in templates:
+            date = template.next_occurrence
+            while date <= today:
+                pending.append(occurrence_for(template, date))
+                date = next_occurrence_after(template.date, template.recurrence_interval, date)
+            template.next_occurrence = date
+
+        # Ocurrencias que ya existían (p. ej. creadas a mano con la plantilla asignada)
+        existing = set(
+            Transaction.objects
+            .filter(recurrence_parent__in=templates, date__gte=first_due)
+            .values_list('recurrence_parent_id', 'date')
+        )
+        new = [obj for obj in pending if (obj.recurrence_parent_id, obj.date) not in existing]
+        created = Transaction.objects.bulk_create(new, batch_size=DEFAULT_BATCH_SIZE)
+
+        by_user = defaultdict(list)
+        for obj in created:
+            by_user[obj.recurrence_parent.user].append(obj)
+        for user, transactions in by_user.items():
+            transactions_bulk_created.send(sender=Transaction, user=user, transactions=transactions)
+
+        Transaction.objects.bulk_update(templates, ['next_occurrence'])
+    return len(templates), len(created)
+
+
+def generate_all_due(today=None, batch_size=DEFAULT_BATCH_SIZE):
+    """Procesa lotes hasta que no queden plantillas vencidas."""
+    total_templates = total_created = 0
+    while True:
+        templates, created = generate_due(today, batch_size)
+        if not templates:
+            return total_templates, total_created
+        total_templates += templates
+        total_created += created
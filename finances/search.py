@@ -0,0 +1,81 @@
+"""
+Búsqueda de texto completo sobre la descripción y la categoría de las transacciones.
+
+En PostgreSQL cada transacción guarda su `search_vector` (descripción con
+peso A, nombre de la categoría con peso B) indexado con GIN; signals.py lo
+recalcula al guardar la transacción, al crearla en lote y al renombrar su
+categoría. La búsqueda usa coincidencia por prefijo ("super" encuentra
+"supermercado") y ordena por relevancia.
+
+En otros motores (SQLite en desarrollo y pruebas) no hay vector: cada término
+se busca con icontains sobre descripción y categoría.
+"""
+import re
+from decimal import Decimal
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db import connection
+from django.db.models import DecimalField, F, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Cast, Round
+
+from .models import Category
+
+# Configuración sin stemming: con prefijos "pago" ya encuentra "pagos" y no
+# depende del idioma en que el usuario escriba sus descripciones
+SEARCH_CONFIG = 'simple'
+
+MAX_TERMS = 10
+
+# Letras y dígitos (el guion bajo y los operadores de tsquery quedan fuera)
+_TERM = re.compile(r'[^\W_]+')
+
+# Orden de los resultados: relevancia y luego el orden habitual del listado
+SEARCH_ORDERING = ('-rank', '-date', '-created_at', '-id')
+
+# El ranking va en el cursor de paginación y se compara por igualdad: se redondea a
+# un numeric exacto, porque el real de ts_rank no sobrevive el viaje por JSON
+RANK_DECIMALS = 6
+RANK_FIELD = DecimalField(max_digits=12, decimal_places=RANK_DECIMALS)
+
+
+def supports_full_text():
+    return connection.vendor == 'postgresql'
+
+
+def search_terms(query):
+    return [term.lower() for term in _TERM.findall(query or '')][:MAX_TERMS]
+
+
+def vector_expression():
+    """Expresión SQL del vector de una transacción (para UPDATE sobre Transaction)."""
+    category_name = Subquery(Category.objects.filter(pk=OuterRef('category_id')).values('name'))
+    return (
+        SearchVector('description', weight='A', config=SEARCH_CONFIG)
+        + SearchVector(category_name, weight='B', config=SEARCH_CONFIG)
+    )
+
+
+def update_vectors(transactions):
+    """Recalcula `search_vector` de un queryset de transacciones en un solo UPDATE."""
+    if supports_full_text():
+        transactions.update(search_vector=vector_expression())
+
+
+def search_transactions(queryset, query):
+    """
+    Filtra `queryset` por los términos de `query` (todos deben aparecer) y
+    anota `rank`. Devuelve el queryset sin cambios si no hay términos.
+    """
+    terms = search_terms(query)
+    if not terms:
+        return queryset
+    if supports_full_text():
+        search_query = SearchQuery(
+            ' & '.join(f'{term}:*' for term in terms), search_type='raw', config=SEARCH_CONFIG,
+        )
+        return queryset.filter(search_vector=search_query).annotate(
+            rank=Cast(Round(SearchRank(F('search_vector'), search_query), RANK_DECIMALS), RANK_FIELD),
+        )
+    for term in terms:
+        queryset = queryset.filter(Q(description__icontains=term) | Q(category__name__icontains=term))
+    return queryset.annotate(rank=Value(Decimal('0'), output_field=RANK_FIELD))
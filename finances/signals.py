@@ -0,0 +1,176 @@
+"""
+Receptores de señales del módulo de finanzas.
+
+Mantienen los datos derivados (resúmenes mensuales, gasto de los
+presupuestos, saldo diario, vector de búsqueda, caché y versión de datos por
+usuario) al día sin importar si la transacción se guarda desde las vistas, el
+admin o el shell.
+"""
+from django.contrib.auth.models import User
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import Signal, receiver
+
+from . import balances, budgets, cache, conditional, search, summaries
+from .models import Budget, Category, Investment, InvestmentValuation, Transaction
+
+# bulk_create no dispara post_save: quien inserte en lote debe enviar esta señal
+# con `transactions` (la lista de instancias creadas) para mantener los datos derivados.
+transactions_bulk_created = Signal()
+
+# Igual para las valuaciones de inversiones: se envía con `user` e `investment_ids`
+# después de una carga en lote (valuations.import_valuations).
+valuations_bulk_created = Signal()
+
+
+@receiver(pre_save, sender=Transaction)
+def remember_previous_state(sender, instance, raw=False, **kwargs):
+    if raw or instance._state.adding:
+        instance._previous_state = None
+        return
+    previous = instance.loaded_state()
+    if previous is None:
+        # Instancia sin valores cargados (p. ej. con campos diferidos): leer de la BD
+        previous = (
+            Transaction.objects.filter(pk=instance.pk)
+            .values(*Transaction.TRACKED_FIELDS)
+            .first()
+        )
+    instance._previous_state = previous
+
+
+def _deleting_from(origin, *models):
+    """True si el borrado en cascada empezó en alguno de `models` (instancia o queryset)."""
+    return isinstance(origin, models) or getattr(origin, 'model', None) in models
+
+
+def _deleting_user(origin):
+    """True si el borrado en cascada empezó en un usuario (instancia o queryset)."""
+    return _deleting_from(origin, User)
+
+
+def _deleting_investment(origin):
+    """True si el borrado en cascada empezó en una inversión o en un usuario."""
+    return _deleting_from(origin, User, Investment)
+
+
+def apply_totals(deltas):
+    """Aplica los mismos deltas a los resúmenes mensuales y a los presupuestos."""
+    if deltas:
+        summaries.apply_deltas(deltas)
+        budgets.apply_deltas(deltas)
+
+
+@receiver(post_save, sender=Transaction)
+def update_totals_on_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    current = instance.tracked_state()
+    previous = getattr(instance, '_previous_state', None)
+    apply_totals(summaries.deltas_for_change(previous, current))
+    balances.apply_deltas(balances.deltas_for_change(previous, current))
+    instance._previous_state = None
+    instance._loaded_values = dict(getattr(instance, '_loaded_values', None) or {}, **current)
+
+
+@receiver(post_delete, sender=Transaction)
+def update_totals_on_delete(sender, instance, origin=None, **kwargs):
+    previous = instance.loaded_state() or instance.tracked_state()
+    # Los resúmenes y presupuestos del usuario o de la categoría se borran en la misma cascada
+    if not _deleting_from(origin, User, Category):
+        apply_totals(summaries.deltas_for_change(previous, None))
+    # Al borrar el usuario, sus saldos diarios se borran en la misma cascada
+    if not _deleting_user(origin):
+        balances.apply_deltas(balances.deltas_for_change(previous, None))
+
+
+@receiver(transactions_bulk_created)
+def update_totals_on_bulk_create(sender, transactions, **kwargs):
+    apply_totals(summaries.deltas_for_transactions(transactions))
+    balances.apply_deltas(balances.deltas_for_transactions(transactions))
+
+
+@receiver(pre_save, sender=Budget)
+def initialize_budget_spent(sender, instance, raw=False, **kwargs):
+    # Un presupuesto nuevo (o que cambió de categoría o mes) parte del gasto que
+    # ya existe en su mes; después lo mantienen los deltas de las transacciones.
+    if raw:
+        return
+    if not instance._state.adding:
+        previous = Budget.objects.filter(pk=instance.pk).values('category_id', 'month').first()
+        if previous == {'category_id': instance.category_id, 'month': instance.month}:
+            return
+    instance.spent_amount = budgets.spent_for(instance.user_id, instance.category_id, instance.month)
+
+
+@receiver(post_save, sender=Transaction)
+@receiver(post_delete, sender=Transaction)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=Investment)
+@receiver(post_delete, sender=Investment)
+def invalidate_user_cache(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    cache.invalidate_user(instance.user_id)
+
+
+@receiver(transactions_bulk_created)
+def invalidate_user_cache_on_bulk_create(sender, transactions, user=None, **kwargs):
+    for user_id in {obj.user_id for obj in transactions}:
+        cache.invalidate_user(user_id)
+
+
+@receiver(post_save, sender=Transaction)
+@receiver(post_delete, sender=Transaction)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=Investment)
+@receiver(post_delete, sender=Investment)
+def bump_data_version(sender, instance, raw=False, origin=None, **kwargs):
+    # Al borrar el usuario, su DataVersion se borra en la misma cascada
+    if raw or _deleting_user(origin):
+        return
+    conditional.bump(instance.user_id)
+
+
+@receiver(transactions_bulk_created)
+def bump_data_version_on_bulk_create(sender, transactions, user=None, **kwargs):
+    for user_id in {obj.user_id for obj in transactions}:
+        conditional.bump(user_id)
+
+
+@receiver(post_save, sender=InvestmentValuation)
+@receiver(post_delete, sender=InvestmentValuation)
+def invalidate_on_valuation_change(sender, instance, raw=False, origin=None, **kwargs):
+    # Al borrar la inversión (o el usuario) sus propios receptores ya invalidan
+    if raw or _deleting_investment(origin):
+        return
+    user_id = Investment.objects.filter(pk=instance.investment_id).values_list('user_id', flat=True).first()
+    cache.invalidate_user(user_id)
+    conditional.bump(user_id)
+
+
+@receiver(valuations_bulk_created)
+def invalidate_on_valuations_bulk_create(sender, user, **kwargs):
+    cache.invalidate_user(user.pk)
+    conditional.bump(user.pk)
+
+
+@receiver(post_save, sender=Transaction)
+def update_search_vector(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    search.update_vectors(Transaction.objects.filter(pk=instance.pk))
+
+
+@receiver(transactions_bulk_created)
+def update_search_vectors_on_bulk_create(sender, transactions, **kwargs):
+    search.update_vectors(Transaction.objects.filter(pk__in=[obj.pk for obj in transactions]))
+
+
+@receiver(post_save, sender=Category)
+def update_search_vectors_on_category_change(sender, instance, created=False, raw=False, **kwargs):
+    # El nombre de la categoría forma parte del vector de sus transacciones
+    if raw or created:
+        return
+    search.update_vectors(Transaction.objects.filter(category=instance))
@@ -0,0 +1,193 @@
+"""
+Mantenimiento incremental de la tabla MonthlySummary.
+
+Cada alta, edición o baja de una transacción se traduce en deltas
+(total, cantidad) sobre la fila (usuario, mes, categoría, tipo) que le
+corresponde. Una edición que cambia fecha, categoría o tipo resta en la
+fila vieja y suma en la nueva.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from .aggregations import month_start
+from .models import MonthlySummary, Transaction
+
+
+def _summary_key(state):
+    return (
+        state['user_id'],
+        month_start(state['date']),
+        state['category_id'],
+        state['transaction_type'],
+    )
+
+
+def deltas_for_change(old=None, new=None):
+    """
+    Calcula los deltas {clave: (monto, cantidad)} entre dos estados de una transacción.
+    `old` y `new` son diccionarios con Transaction.TRACKED_FIELDS (o None).
+    """
+    deltas = defaultdict(lambda: [Decimal('0'), 0])
+    if old is not None:
+        delta = deltas[_summary_key(old)]
+        delta[0] -= Decimal(str(old['amount']))
+        delta[1] -= 1
+    if new is not None:
+        delta = deltas[_summary_key(new)]
+        delta[0] += Decimal(str(new['amount']))
+        delta[1] += 1
+    return {key: tuple(value) for key, value in deltas.items() if value[0] or value[1]}
+
+
+def deltas_for_transactions(transactions, sign=1):
+    """Deltas acumulados para una lista de transacciones (altas con sign=1, bajas con sign=-1)."""
+    deltas = defaultdict(lambda: [Decimal('0'), 0])
+    for obj in transactions:
+        delta = deltas[_summary_key(obj.tracked_state())]
+        delta[0] += sign * Decimal(str(obj.amount))
+        delta[1] += sign
+    return {key: tuple(value) for key, value in deltas.items()}
+
+
+# A partir de cuántas claves conviene leer y escribir las filas en bloque
+BULK_DELTA_THRESHOLD = 20
+
+
+def apply_deltas(deltas):
+    """Aplica los deltas con expresiones F(), creando las filas que falten."""
+    if len(deltas) > BULK_DELTA_THRESHOLD:
+        _apply_deltas_in_bulk(deltas)
+        return
+    with transaction.atomic():
+        for (user_id, month, category_id, transaction_type), (amount, count) in deltas.items():
+            lookup = {
+                'user_id': user_id,
+                'month': month,
+                'category_id': category_id,
+                'transaction_type': transaction_type,
+            }
+            updated = MonthlySummary.objects.filter(**lookup).update(
+                total=F('total') + amount,
+                count=F('count') + count,
+            )
+            # Una baja sin fila previa no crea nada (p. ej. la categoría se está
+            # borrando en cascada junto con sus resúmenes).
+            if updated or count <= 0:
+                continue
+            try:
+                with transaction.atomic():
+                    MonthlySummary.objects.create(total=amount, count=count, **lookup)
+            except IntegrityError:
+                # Otra petición creó la fila entre el UPDATE y el INSERT
+                MonthlySummary.objects.filter(**lookup).update(
+                    total=F('total') + amount,
+                    count=F('count') + count,
+                )
+
+
+def _apply_deltas_in_bulk(deltas):
+    """
+    Variante para muchas claves (importaciones, generación en lote): bloquea las
+    filas existentes, las actualiza con un bulk_update y crea las faltantes con
+    un bulk_create, en lugar de un UPDATE por clave.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        existing = {
+            (row.user_id, row.month, row.category_id, row.transaction_type): row
+            for row in MonthlySummary.objects.select_for_update().filter(
+                user_id__in={key[0] for key in deltas},
+                month__in={key[1] for key in deltas},
+                category_id__in={key[2] for key in deltas},
+            )
+        }
+        to_update = []
+        to_create = []
+        for key, (amount, count) in deltas.items():
+            row = existing.get(key)
+            if row is not None:
+                row.total += amount
+                row.count += count
+                row.updated_at = now
+                to_update.append(row)
+            elif count > 0:
+                user_id, month, category_id, transaction_type = key
+                to_create.append(MonthlySummary(
+                    user_id=user_id, month=month, category_id=category_id,
+                    transaction_type=transaction_type, total=amount, count=count,
+                ))
+        MonthlySummary.objects.bulk_update(to_update, ['total', 'count', 'updated_at'], batch_size=500)
+        MonthlySummary.objects.bulk_create(to_create, batch_size=500)
+
+
+def record_change(old=None, new=None):
+    deltas = deltas_for_change(old, new)
+    if deltas:
+        apply_deltas(deltas)
+
+
+def live_summary_rows(users=None):
+    """Agregados calculados directamente sobre Transaction, con la misma forma que MonthlySummary."""
+    transactions = Transaction.objects.all()
+    if users is not None:
+        transactions = transactions.filter(user__in=users)
+    return (
+        transactions
+        .annotate(month=TruncMonth('date'))
+        .values('user_id', 'month', 'category_id', 'transaction_type')
+        .annotate(total=Sum('amount'), count=Count('id'))
+        .order_by()
+    )
+
+
+def rebuild(users=None, batch_size=1000):
+    """Borra y recalcula los resúmenes (de todos los usuarios o solo de `users`)."""
+    with transaction.atomic():
+        summaries = MonthlySummary.objects.all()
+        if users is not None:
+            summaries = summaries.filter(user__in=users)
+        summaries.delete()
+        rows = [
+            MonthlySummary(
+                user_id=row['user_id'],
+                month=month_start(row['month']),
+                category_id=row['category_id'],
+                transaction_type=row['transaction_type'],
+                total=row['total'],
+                count=row['count'],
+            )
+            for row in live_summary_rows(users).iterator()
+        ]
+        MonthlySummary.objects.bulk_create(rows, batch_size=batch_size)
+    return len(rows)
+
+
+def find_drift(users=None):
+    """
+    Compara MonthlySummary contra los agregados en vivo.
+    Devuelve una lista de (clave, (total, cantidad) materializado, (total, cantidad) en vivo).
+    """
+    stored = MonthlySummary.objects.all()
+    if users is not None:
+        stored = stored.filter(user__in=users)
+    stored_map = {
+        (row['user_id'], row['month'], row['category_id'], row['transaction_type']): (row['total'], row['count'])
+        for row in stored.values('user_id', 'month', 'category_id', 'transaction_type', 'total', 'count')
+        if row['total'] or row['count']
+    }
+    live_map = {
+        (row['user_id'], month_start(row['month']), row['category_id'], row['transaction_type']): (row['total'], row['count'])
+        for row in live_summary_rows(users)
+    }
+    drift = []
+    for key in sorted(set(stored_map) | set(live_map), key=str):
+        stored_value = stored_map.get(key, (Decimal('0'), 0))
+        live_value = live_map.get(key, (Decimal('0'), 0))
+        if stored_value != live_value:
+            drift.append((key, stored_value, live_value))
+    return drift
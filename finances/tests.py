@@ -1,3 +1,1854 @@
-from django.test import TestCase
+import csv
+import importlib.util
+import io
+import json
+import os
+import re
+import tempfile
+import unittest
+from datetime import date, timedelta
+from decimal import Decimal
 
-# Create your tests here.
+import numpy as np
+from django.contrib.auth.decorators import login_required
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection, models
+from django.db.models import Q
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.http import HttpResponse
+from django.urls import path, reverse
+from django.utils import timezone
+
+from . import (
+    aggregations, analytics, balances, benchmark, budgets, exports, fastjson, importers, money, pagination, recurring,
+    search, summaries, valuations,
+)
+from .instrumentation import MetricsRegistry, RequestMetrics, fingerprint, registry
+from .middleware import UNRESOLVED_VIEW
+from .signals import transactions_bulk_created
+from .models import (
+    Budget, Category, DailyBalance, DataVersion, ExportJob, Investment, InvestmentValuation, MonthlySummary,
+    Transaction,
+)
+
+
+def seed_transactions(user, categories, count, start=None):
+    """Crea `count` transacciones repartidas entre categorías, tipos y fechas con bulk_create."""
+    start = start or date.today()
+    types = ['INCOME', 'EXPENSE', 'EXPENSE', 'INVESTMENT']
+    Transaction.objects.bulk_create([
+        Transaction(
+            user=user,
+            category=categories[i % len(categories)],
+            amount=Decimal('10.00') + i % 50,
+            description=f'Movimiento {i}',
+            transaction_type=types[i % len(types)],
+            date=start - timedelta(days=i % 400),
+        )
+        for i in range(count)
+    ])
+
+
+class QueryPlanTests(TestCase):
+    """
+    Las consultas de las vistas más usadas deben resolverse con índices.
+    Falla si alguna termina en un recorrido secuencial de finances_transaction.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        for n in range(3):
+            user = User.objects.create_user(f'usuario{n}', password='clave-segura-123')
+            categories = [
+                Category.objects.create(user=user, name=f'Categoría {i}', category_type='EXPENSE')
+                for i in range(8)
+            ]
+            seed_transactions(user, categories, 600)
+        cls.user = User.objects.get(username='usuario0')
+        cls.category = cls.user.categories.first()
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def query_plan(self, sql, params=()):
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                cursor.execute('SET LOCAL enable_seqscan = off')
+                cursor.execute('EXPLAIN ' + sql, params)
+                return [row[0] for row in cursor.fetchall()]
+            if connection.vendor == 'sqlite':
+                cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+                return [row[-1] for row in cursor.fetchall()]
+        self.skipTest(f'EXPLAIN no soportado para {connection.vendor}')
+
+    def queryset_plan(self, queryset):
+        sql, params = queryset.query.sql_with_params()
+        return self.query_plan(sql, params)
+
+    def sequential_scans(self, sql):
+        pattern = r'Seq Scan on finances_transaction\b' if connection.vendor == 'postgresql' else r'SCAN finances_transaction\b'
+        return [line for line in self.query_plan(sql) if re.search(pattern, line)]
+
+    def assertNoSequentialScans(self, url, params=None):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url, params or {})
+            if response.streaming:
+                b''.join(response.streaming_content)
+        self.assertEqual(response.status_code, 200)
+        for query in ctx.captured_queries:
+            sql = query['sql']
+            if 'finances_transaction' not in sql or not sql.lstrip().upper().startswith('SELECT'):
+                continue
+            self.assertEqual(self.sequential_scans(sql), [], f'Recorrido secuencial en {url}: {sql}')
+
+    def test_dashboard(self):
+        self.assertNoSequentialScans(reverse('dashboard'))
+
+    def test_transactions(self):
+        self.assertNoSequentialScans(reverse('transactions'))
+
+    def test_transactions_filtered(self):
+        start = (date.today() - timedelta(days=90)).isoformat()
+        self.assertNoSequentialScans(reverse('transactions'), {'type': 'EXPENSE', 'start_date': start})
+        self.assertNoSequentialScans(reverse('transactions'), {'category': self.category.pk, 'start_date': start})
+
+    def test_reports(self):
+        self.assertNoSequentialScans(reverse('reports'))
+
+    def test_chart_apis(self):
+        self.assertNoSequentialScans(reverse('financial_data'))
+        self.assertNoSequentialScans(reverse('category_spending'))
+
+    def test_export(self):
+        self.assertNoSequentialScans(reverse('export_transactions'))
+
+    def test_date_range_filters_use_index_bounds(self):
+        start = date.today() - timedelta(days=30)
+        for lookup in ({'transaction_type': 'EXPENSE'}, {'category': self.category}):
+            queryset = Transaction.objects.filter(user=self.user, date__gte=start, **lookup).order_by()
+            plan = '\n'.join(self.queryset_plan(queryset))
+            # El rango de fechas debe acotar el índice, no filtrarse fila por fila
+            self.assertRegex(plan, r'(SEARCH|Index Cond).*date\s*>', plan)
+
+    def test_recent_list_is_ordered_by_index(self):
+        queryset = Transaction.objects.filter(user=self.user).order_by('-date', '-created_at')[:10]
+        plan = '\n'.join(self.queryset_plan(queryset))
+        self.assertNotIn('TEMP B-TREE FOR ORDER BY', plan)
+        self.assertNotRegex(plan, r'(?m)^\s*(->\s*)?Sort\b')
+
+
+class QueryCountTests(TestCase):
+    """
+    El número de consultas de las vistas con tablas de transacciones no debe
+    crecer con la cantidad de filas ni de categorías (sin consultas N+1).
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('usuario', password='clave-segura-123')
+        cls.add_data(categories=1, transactions=2)
+
+    @classmethod
+    def add_data(cls, categories, transactions):
+        offset = cls.user.categories.count()
+        new_categories = [
+            Category.objects.create(user=cls.user, name=f'Categoría {offset + i}', category_type='EXPENSE',
+                                    color='#FF6B6B', icon='fas fa-car')
+            for i in range(categories)
+        ]
+        for transaction in [
+            Transaction(user=cls.user, category=new_categories[i % categories], amount=Decimal('12.50'),
+                        description=f'Movimiento {i}', transaction_type='EXPENSE', date=date.today())
+            for i in range(transactions)
+        ]:
+            transaction.save()
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def count_queries(self, url, params=None):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url, params or {})
+            if response.streaming:
+                b''.join(response.streaming_content)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries)
+
+    def assertConstantQueries(self, url, params=None):
+        before = self.count_queries(url, params)
+        self.add_data(categories=5, transactions=40)
+        after = self.count_queries(url, params)
+        self.assertEqual(before, after, f'{url} pasó de {before} a {after} consultas con más datos')
+
+    def test_transactions(self):
+        self.assertConstantQueries(reverse('transactions'))
+
+    def test_transactions_page_api(self):
+        self.assertConstantQueries(reverse('transactions_page'))
+
+    def test_dashboard(self):
+        self.assertConstantQueries(reverse('dashboard'))
+
+    def test_reports(self):
+        self.assertConstantQueries(reverse('reports'))
+
+    def test_export(self):
+        self.assertConstantQueries(reverse('export_transactions'))
+
+    def test_budgets(self):
+        self.assertConstantQueries(reverse('budgets'))
+
+    # Sesión, usuario, MonthlySummary del mes, transacciones recientes e inversiones
+    DASHBOARD_QUERY_BUDGET = 5
+
+    def test_dashboard_query_budget(self):
+        Investment.objects.create(user=self.user, name='Fondo', investment_type='SAVINGS', initial_amount=100,
+                                  current_value=110, start_date=date.today(), expected_return=5, risk_level='LOW')
+        cache.clear()
+        with self.assertNumQueries(self.DASHBOARD_QUERY_BUDGET):
+            response = self.client.get(reverse('dashboard'))
+        self.assertEqual(response.context['investment_roi'], Decimal('10'))
+        self.assertEqual(response.context['monthly_expenses'], Decimal('25.00'))
+        # Con la caché llena solo quedan la sesión y el usuario
+        with self.assertNumQueries(2):
+            self.client.get(reverse('dashboard'))
+
+
+class AggregationTests(TestCase):
+    """Totales agrupados de aggregations.py: una consulta y los mismos números que sumar fila por fila."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('usuario', password='clave-segura-123')
+        cls.food = Category.objects.create(user=cls.user, name='Comida', category_type='EXPENSE', color='#FF6B6B')
+        cls.salary = Category.objects.create(user=cls.user, name='Sueldo', category_type='INCOME')
+        for category, amount, transaction_type, day in [
+            (cls.salary, '100.00', 'INCOME', date(2024, 1, 5)),
+            (cls.food, '30.25', 'EXPENSE', date(2024, 1, 31)),
+            (cls.food, '10.00', 'EXPENSE', date(2024, 3, 1)),
+            (cls.food, '7.50', 'INVESTMENT', date(2024, 3, 15)),
+            # Fuera del rango de las pruebas
+            (cls.food, '99.00', 'EXPENSE', date(2023, 11, 30)),
+        ]:
+            Transaction.objects.create(user=cls.user, category=category, amount=Decimal(amount),
+                                       description='Movimiento', transaction_type=transaction_type, date=day)
+        other = User.objects.create_user('otro', password='clave-segura-123')
+        Transaction.objects.create(
+            user=other, amount=Decimal('500.00'), description='Ajeno', transaction_type='EXPENSE',
+            date=date(2024, 1, 10),
+            category=Category.objects.create(user=other, name='Comida', category_type='EXPENSE'),
+        )
+
+    def test_monthly_grid_fills_empty_months(self):
+        with self.assertNumQueries(1):
+            grid = aggregations.monthly_totals(self.user, date(2023, 12, 10), date(2024, 4, 2))
+        self.assertEqual(list(grid), [date(2023, 12, 1), date(2024, 1, 1), date(2024, 2, 1), date(2024, 3, 1),
+                                      date(2024, 4, 1)])
+        zero = {'INCOME': 0, 'EXPENSE': 0, 'INVESTMENT': 0}
+        self.assertEqual(grid[date(2023, 12, 1)], zero)
+        self.assertEqual(grid[date(2024, 1, 1)], {'INCOME': 10000, 'EXPENSE': 3025, 'INVESTMENT': 0})
+        self.assertEqual(grid[date(2024, 2, 1)], zero)
+        self.assertEqual(grid[date(2024, 3, 1)], {'INCOME': 0, 'EXPENSE': 1000, 'INVESTMENT': 750})
+        self.assertEqual(grid[date(2024, 4, 1)], zero)
+
+    def test_monthly_grid_matches_live_totals(self):
+        start, end = date(2023, 11, 1), date(2024, 3, 31)
+        live = aggregations.build_monthly_grid(
+            aggregations.live_monthly_totals_queryset(self.user, start, end), start, end,
+        )
+        self.assertEqual(aggregations.monthly_totals(self.user, start, end), live)
+
+    def test_reports_monthly_data(self):
+        Transaction.objects.create(user=self.user, category=self.food, amount=Decimal('12.34'),
+                                   description='Hoy', transaction_type='EXPENSE', date=date.today())
+        self.client.force_login(self.user)
+        monthly = json.loads(self.client.get(reverse('reports')).context['monthly_data'])
+        # Un año completo de meses, con ceros donde no hubo movimientos
+        self.assertGreaterEqual(len(monthly), 12)
+        current = monthly.pop(date.today().strftime('%Y-%m'))
+        self.assertEqual((current['income'], current['expense'], current['balance']), (0.0, 12.34, -12.34))
+        self.assertEqual({row['expense'] for row in monthly.values()}, {0.0})
+
+
+    def test_category_rollup_totals(self):
+        transport = Category.objects.create(user=self.user, name='Auto', category_type='EXPENSE', icon='fas fa-car')
+        Transaction.objects.create(user=self.user, category=transport, amount=Decimal('0.10'),
+                                   description='Peaje', transaction_type='EXPENSE', date=date(2024, 2, 1))
+        # Sin movimientos: no aparece
+        Category.objects.create(user=self.user, name='Viajes', category_type='EXPENSE')
+        transactions = Transaction.objects.filter(user=self.user, date__gte=date(2024, 1, 1))
+        with self.assertNumQueries(1):
+            rollup = aggregations.category_rollup(transactions)
+        self.assertEqual(rollup, [
+            {'id': transport.pk, 'name': 'Auto', 'color': '#007bff', 'icon': 'fas fa-car', 'total': 10},
+            {'id': self.food.pk, 'name': 'Comida', 'color': '#FF6B6B', 'icon': 'fas fa-wallet', 'total': 4025},
+        ])
+        income = aggregations.category_rollup(transactions, transaction_type='INCOME')
+        self.assertEqual([(row['name'], row['total']) for row in income], [('Sueldo', 10000)])
+        # Filtro por tipo de categoría: ningún gasto está en una categoría de ingreso
+        self.assertEqual(aggregations.category_rollup(transactions, category_type='INCOME'), [])
+
+    def test_user_category_rollup_date_range(self):
+        rollup = aggregations.user_category_rollup(self.user, date(2024, 1, 1), date(2024, 1, 31))
+        self.assertEqual([(row['name'], row['total']) for row in rollup], [('Comida', 3025)])
+        # Sin rango suma todo el historial del usuario y nada de otros usuarios
+        rollup = aggregations.user_category_rollup(self.user)
+        self.assertEqual([(row['name'], row['total']) for row in rollup], [('Comida', 13925)])
+        self.assertEqual(
+            sum(row['total'] for row in rollup),
+            money.to_cents(Transaction.objects.filter(user=self.user, transaction_type='EXPENSE')
+                           .aggregate(total=models.Sum('amount'))['total']),
+        )
+
+class CsvExportTests(TestCase):
+    """El CSV de transacciones se genera en streaming con los mismos filtros que el listado."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('usuario', password='clave-segura-123')
+        food = Category.objects.create(user=cls.user, name='Comida', category_type='EXPENSE')
+        salary = Category.objects.create(user=cls.user, name='Sueldo', category_type='INCOME')
+        for category, amount, description, transaction_type, day in [
+            (salary, '1500.00', 'Sueldo de enero', 'INCOME', date(2024, 1, 31)),
+            (food, '12.50', 'Almuerzo, "menú" del día\ncon postre', 'EXPENSE', date(2024, 2, 3)),
+            (food, '8.00', 'Café', 'EXPENSE', date(2024, 2, 10)),
+        ]:
+            Transaction.objects.create(user=cls.user, category=category, amount=Decimal(amount),
+                                       description=description, transaction_type=transaction_type, date=day)
+        other = User.objects.create_user('otro', password='clave-segura-123')
+        Transaction.objects.create(
+            user=other, amount=Decimal('99.00'), description='Ajeno', transaction_type='EXPENSE',
+            date=date(2024, 2, 5),
+            category=Category.objects.create(user=other, name='Comida', category_type='EXPENSE'),
+        )
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def export(self, params=None):
+        response = self.client.get(reverse('export_transactions'), params or {})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        content = b''.join(response.streaming_content).decode('utf-8')
+        return response, list(csv.reader(io.StringIO(content)))
+
+    def test_headers_and_content(self):
+        response, rows = self.export()
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="transacciones.csv"')
+        self.assertEqual(rows, [
+            exports.EXPORT_HEADER,
+            ['10/02/2024', 'Café', 'Comida', 'Gasto', '8.00', 'usuario'],
+            ['03/02/2024', 'Almuerzo, "menú" del día\ncon postre', 'Comida', 'Gasto', '12.50', 'usuario'],
+            ['31/01/2024', 'Sueldo de enero', 'Sueldo', 'Ingreso', '1500.00', 'usuario'],
+        ])
+
+    def test_filters(self):
+        _, rows = self.export({'type': 'EXPENSE', 'start_date': '2024-02-05'})
+        self.assertEqual([row[1] for row in rows[1:]], ['Café'])
+        _, rows = self.export({'q': 'sueldo'})
+        self.assertEqual([row[1] for row in rows[1:]], ['Sueldo de enero'])
+        # Un filtro inválido se ignora, como en el listado
+        _, rows = self.export({'type': 'OTRO'})
+        self.assertEqual(len(rows), 4)
+
+    def test_rows_are_read_while_streaming(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('export_transactions'))
+        self.assertFalse(any('finances_transaction' in query['sql'] for query in ctx.captured_queries))
+        with CaptureQueriesContext(connection) as ctx:
+            lines = list(response.streaming_content)
+        # Encabezado + una línea por transacción, con una sola consulta de transacciones
+        self.assertEqual(len(lines), 4)
+        self.assertEqual(len([q for q in ctx.captured_queries if 'finances_transaction' in q['sql']]), 1)
+
+
+class KeysetPaginationTests(TestCase):
+    """Listado paginado por cursor: páginas estables, filtros en el cursor y cursores inválidos."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('usuario', password='clave-segura-123')
+        cls.category = Category.objects.create(user=cls.user, name='Hogar', category_type='EXPENSE')
+        for i in range(7):
+            Transaction.objects.create(user=cls.user, category=cls.category, amount=Decimal('10.00') + i,
+                                       description=f'Movimiento {i}',
+                                       transaction_type='INCOME' if i % 3 == 0 else 'EXPENSE',
+                                       date=date.today() - timedelta(days=i))
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def page(self, **params):
+        response = self.client.get(reverse('transactions_page'), params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def walk(self, **params):
+        """Descripciones de todas las páginas siguiendo next_cursor."""
+        seen = []
+        page = self.page(**params)
+        while True:
+            seen += [row['description'] for row in page['results']]
+            if not page['next_cursor']:
+                return seen
+            page = self.page(**params, cursor=page['next_cursor'])
+
+    def test_json_pages(self):
+        first = self.page(page_size=3)
+        self.assertTrue(first['success'])
+        self.assertEqual([row['description'] for row in first['results']],
+                         ['Movimiento 0', 'Movimiento 1', 'Movimiento 2'])
+        row = first['results'][0]
+        self.assertEqual(row['date'], date.today().strftime('%Y-%m-%d'))
+        self.assertEqual(row['amount'], 10.0)
+        self.assertEqual(row['transaction_type'], 'INCOME')
+        self.assertEqual(row['category']['name'], 'Hogar')
+        self.assertIn('cursor=', first['next_url'])
+        self.assertIn('page_size=3', first['next_url'])
+        self.assertEqual(self.walk(page_size=3), [f'Movimiento {i}' for i in range(7)])
+
+        last = self.page(page_size=7)
+        self.assertIsNone(last['next_cursor'])
+        self.assertIsNone(last['next_url'])
+
+    def test_pages_stable_while_rows_are_inserted(self):
+        first = self.page(page_size=3)
+        # Una fila más nueva y otra con la misma fecha que la última fila de la página
+        for description, day in [('Nueva', date.today()), ('Mismo día', date.today() - timedelta(days=2))]:
+            Transaction.objects.create(user=self.user, category=self.category, amount=Decimal('1.00'),
+                                       description=description, transaction_type='EXPENSE', date=day)
+        second = self.page(page_size=3, cursor=first['next_cursor'])
+        # Las inserciones no desplazan filas: la página sigue justo donde terminó la anterior
+        self.assertEqual([row['description'] for row in second['results']],
+                         ['Movimiento 3', 'Movimiento 4', 'Movimiento 5'])
+
+    def test_filters_and_search_survive_in_cursor(self):
+        self.assertEqual(self.walk(type='EXPENSE', page_size=2),
+                         ['Movimiento 1', 'Movimiento 2', 'Movimiento 4', 'Movimiento 5'])
+        first = self.page(type='EXPENSE', q='movimiento', page_size=2)
+        self.assertIn('type=EXPENSE', first['next_url'])
+        self.assertIn('q=movimiento', first['next_url'])
+        response = self.client.get(first['next_url'])
+        self.assertEqual([row['description'] for row in response.json()['results']],
+                         ['Movimiento 4', 'Movimiento 5'])
+
+        # La vista HTML arma los enlaces con los mismos filtros
+        response = self.client.get(reverse('transactions'), {'type': 'INCOME', 'page_size': 1})
+        self.assertEqual([t.description for t in response.context['transactions']], ['Movimiento 0'])
+        next_url = response.context['next_page_url']
+        self.assertIn('type=INCOME', next_url)
+        response = self.client.get(next_url)
+        self.assertEqual([t.description for t in response.context['transactions']], ['Movimiento 3'])
+        self.assertIn('type=INCOME', response.context['first_page_url'])
+
+    def test_invalid_cursor_is_rejected(self):
+        valid = self.page(page_size=3)['next_cursor']
+        for cursor in ['no-es-un-cursor', valid[:-4], pagination.encode_cursor(self.category, ('name',))]:
+            response = self.client.get(reverse('transactions_page'), {'cursor': cursor})
+            self.assertEqual(response.status_code, 400, cursor)
+            self.assertFalse(response.json()['success'])
+
+        # La vista HTML avisa y vuelve a la primera página
+        response = self.client.get(reverse('transactions'), {'cursor': 'no-es-un-cursor', 'page_size': 3})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([t.description for t in response.context['transactions']],
+                         ['Movimiento 0', 'Movimiento 1', 'Movimiento 2'])
+        self.assertIn('no es válida', ' '.join(str(m) for m in response.context['messages']))
+
+
+class MonthlySummaryTests(TestCase):
+    """MonthlySummary se mantiene con cada escritura y rebuild_summaries corrige las diferencias."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('usuario', password='clave-segura-123')
+        cls.food = Category.objects.create(user=cls.user, name='Comida', category_type='EXPENSE')
+        cls.transport = Category.objects.create(user=cls.user, name='Transporte', category_type='EXPENSE')
+
+    def summary(self, category, month, transaction_type='EXPENSE'):
+        row = MonthlySummary.objects.filter(user=self.user, category=category, month=month,
+                                            transaction_type=transaction_type).first()
+        return (row.total, row.count) if row else (Decimal('0'), 0)
+
+    def create(self, amount, when, category=None):
+        return Transaction.objects.create(user=self.user, category=category or self.food, amount=Decimal(amount),
+                                          description='Gasto', transaction_type='EXPENSE', date=when)
+
+    def test_create_edit_delete(self):
+        march, april = date(2024, 3, 1), date(2024, 4, 1)
+        transaction = self.create('30.00', date(2024, 3, 5))
+        self.create('20.00', date(2024, 3, 9))
+        self.assertEqual(self.summary(self.food, march), (Decimal('50.00'), 2))
+
+        transaction.date = date(2024, 4, 2)
+        transaction.save()
+        self.assertEqual(self.summary(self.food, march), (Decimal('20.00'), 1))
+        self.assertEqual(self.summary(self.food, april), (Decimal('30.00'), 1))
+
+        transaction.category = self.transport
+        transaction.save()
+        self.assertEqual(self.summary(self.food, april), (Decimal('0'), 0))
+        self.assertEqual(self.summary(self.transport, april), (Decimal('30.00'), 1))
+
+        transaction.transaction_type = 'INCOME'
+        transaction.amount = Decimal('35.00')
+        transaction.save()
+        self.assertEqual(self.summary(self.transport, april), (Decimal('0'), 0))
+        self.assertEqual(self.summary(self.transport, april, 'INCOME'), (Decimal('35.00'), 1))
+
+        transaction.delete()
+        self.assertEqual(self.summary(self.transport, april, 'INCOME'), (Decimal('0'), 0))
+        self.assertEqual(summaries.find_drift([self.user]), [])
+
+    def test_admin_edit(self):
+        admin = User.objects.create_superuser('admin', 'admin@example.com', 'clave-segura-123')
+        self.client.force_login(admin)
+        transaction = self.create('30.00', date(2024, 3, 5))
+        response = self.client.post(reverse('admin:finances_transaction_change', args=[transaction.pk]), {
+            'user': self.user.pk, 'category': self.transport.pk, 'amount': '42.00', 'description': 'Editada',
+            'transaction_type': 'EXPENSE', 'date': '2024-05-10', 'recurrence_interval': '',
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(self.summary(self.food, date(2024, 3, 1)), (Decimal('0'), 0))
+        self.assertEqual(self.summary(self.transport, date(2024, 5, 1)), (Decimal('42.00'), 1))
+        self.assertEqual(summaries.find_drift([self.user]), [])
+
+    def test_cascade_deletes_skip_summary_updates(self):
+        for day in range(1, 6):
+            self.create('10.00', date(2024, 3, day))
+            self.create('5.00', date(2024, 3, day), category=self.transport)
+        Budget.objects.create(user=self.user, category=self.food, month=date(2024, 3, 1),
+                              allocated_amount=Decimal('100'))
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.food.delete()
+        touched = [query['sql'] for query in ctx.captured_queries
+                   if re.search(r'^(UPDATE|INSERT).*finances_(monthlysummary|budget)', query['sql'])]
+        self.assertEqual(touched, [])
+        self.assertEqual(self.summary(self.transport, date(2024, 3, 1)), (Decimal('25.00'), 5))
+        self.assertEqual(summaries.find_drift([self.user]), [])
+        self.assertEqual(balances.find_drift([self.user]), [])
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.user.delete()
+        touched = [query['sql'] for query in ctx.captured_queries
+                   if re.search(r'^(UPDATE|INSERT).*finances_(monthlysummary|budget|dailybalance)', query['sql'])]
+        self.assertEqual(touched, [])
+        self.assertFalse(MonthlySummary.objects.exists())
+
+    def test_rebuild_fixes_drift(self):
+        seed_transactions(self.user, [self.food, self.transport], 60, start=date(2024, 3, 31))
+        # bulk_create sin la señal: los resúmenes quedan desfasados
+        self.assertNotEqual(summaries.find_drift([self.user]), [])
+        err = io.StringIO()
+        with self.assertRaises(CommandError):
+            call_command('rebuild_summaries', '--check', stdout=io.StringIO(), stderr=err)
+        self.assertIn('Diferencia en', err.getvalue())
+
+        out = io.StringIO()
+        call_command('rebuild_summaries', '--user', self.user.username, stdout=out)
+        self.assertIn('coinciden', out.getvalue())
+        self.assertEqual(summaries.find_drift([self.user]), [])
+        self.assertEqual(
+            MonthlySummary.objects.filter(user=self.user).aggregate(count=models.Sum('count'))['count'], 60,
+        )
+
+
+class TransactionImportTests(TestCase):
+    """Importación masiva desde CSV y OFX: errores por fila y datos derivados al día."""
+
+    CSV = (
+        'Fecha,Descripción,Categoría,Tipo,Monto,Usuario\n'
+        '05/03/2024,Mercado,comida,Gasto,45.50,otro\n'
+        '2024-03-10,Sueldo,Salario,Ingreso,"$1,000.00",otro\n'
+        '11/03/2024,Sin monto,Comida,Gasto,,otro\n'
+        '12/03/2024,Fecha mala,Comida,Gasto,10,otro\n'
+        '99/99/2024,Fecha mala,Comida,Gasto,10,otro\n'
+        '13/03/2024,Enorme,Comida,Gasto,100000000,otro\n'
+        '14/03/2024,Decimales,Comida,Gasto,1.234,otro\n'
+        '15/03/2024,Tipo raro,Comida,Regalo,10,otro\n'
+        '16/03/2024,Corta\n'
+    )
+
+    OFX = (
+        'OFXHEADER:100\n<OFX><BANKMSGSRSV1><STMTTRNRS><STMTRS><BANKTRANLIST>\n'
+        '<STMTTRN>\n<TRNTYPE>DEBIT\n<DTPOSTED>20240305120000\n<TRNAMT>-45.50\n'
+        '<NAME>Supermercado\n<MEMO>Tarjeta\n</STMTTRN>\n'
+        '<STMTTRN>\n<TRNTYPE>CREDIT\n<DTPOSTED>20240310\n<TRNAMT>1000.00\n<NAME>Nomina\n</STMTTRN>\n'
+        '</BANKTRANLIST></STMTRS></STMTTRNRS></BANKMSGSRSV1></OFX>\n'
+    )
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('usuario', password='clave-segura-123')
+        cls.food = Category.objects.create(user=cls.user, name='Comida', category_type='EXPENSE')
+
+    def run_import(self, content, file_format='csv', **kwargs):
+        return importers.import_transactions(self.user, io.BytesIO(content.encode('utf-8')), file_format, **kwargs)
+
+    def test_csv_rows_and_errors(self):
+        result = self.run_import(self.CSV)
+        self.assertEqual(result.created, 3)
+        self.assertEqual([line for line, _ in result.errors], [4, 6, 7, 8, 9, 10])
+        self.assertIn('monto', result.errors[0][1].lower())
+        self.assertEqual(result.categories_created, ['Salario'])
+        rows = list(Transaction.objects.filter(user=self.user).order_by('date')
+                    .values_list('date', 'description', 'category__name', 'transaction_type', 'amount'))
+        self.assertEqual(rows, [
+            (date(2024, 3, 5), 'Mercado', 'Comida', 'EXPENSE', Decimal('45.50')),
+            (date(2024, 3, 10), 'Sueldo', 'Salario', 'INCOME', Decimal('1000.00')),
+            (date(2024, 3, 12), 'Fecha mala', 'Comida', 'EXPENSE', Decimal('10.00')),
+        ])
+        # Las filas inválidas no crean categorías
+        self.assertFalse(Category.objects.filter(user=self.user, name__iexact='regalo').exists())
+
+    def test_invalid_header(self):
+        with self.assertRaises(importers.InvalidImportFile):
+            self.run_import('Fecha,Monto\n05/03/2024,10\n')
+        with self.assertRaises(importers.InvalidImportFile):
+            self.run_import('')
+
+    def test_ofx(self):
+        result = self.run_import(self.OFX, 'ofx')
+        self.assertEqual((result.created, result.error_count), (2, 0))
+        rows = list(Transaction.objects.filter(user=self.user).order_by('date')
+                    .values_list('date', 'description', 'category__name', 'transaction_type', 'amount'))
+        self.assertEqual(rows, [
+            (date(2024, 3, 5), 'Supermercado - Tarjeta', importers.OFX_CATEGORY_NAMES['EXPENSE'], 'EXPENSE',
+             Decimal('45.50')),
+            (date(2024, 3, 10), 'Nomina', importers.OFX_CATEGORY_NAMES['INCOME'], 'INCOME', Decimal('1000.00')),
+        ])
+        self.assertEqual(importers.detect_format('extracto.QFX'), 'ofx')
+        self.assertEqual(importers.detect_format('datos.csv'), 'csv')
+
+    def test_derived_data_after_bulk_create(self):
+        budget = Budget.objects.create(user=self.user, category=self.food, month=date(2024, 3, 1),
+                                       allocated_amount=Decimal('100'))
+        # Lotes pequeños para pasar por varios bulk_create
+        self.run_import(self.CSV, batch_size=2)
+        self.assertEqual(summaries.find_drift([self.user]), [])
+        self.assertEqual(MonthlySummary.objects.get(user=self.user, category=self.food, month=date(2024, 3, 1),
+                                                    transaction_type='EXPENSE').total, Decimal('55.50'))
+        budget.refresh_from_db()
+        self.assertEqual(budget.spent_amount, Decimal('55.50'))
+        self.assertEqual(balances.balance_at(self.user, date(2024, 3, 31)), Decimal('944.50'))
+        self.assertEqual(balances.find_drift([self.user]), [])
+
+    def test_upload_view(self):
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(reverse('import_transactions')).status_code, 200)
+        upload = io.BytesIO(self.CSV.encode('utf-8'))
+        upload.name = 'movimientos.csv'
+        response = self.client.post(reverse('import_transactions'), {'file': upload, 'file_format': ''})
+        self.assertEqual(response.context['result'].created, 3)
+        self.assertContains(response, 'Salario')
+
+        upload = io.BytesIO('Fecha\n'.encode('utf-8'))
+        upload.name = 'vacio.csv'
+        response = self.client.post(reverse('import_transactions'), {'file': upload, 'file_format': 'csv'})
+        self.assertIsNone(response.context['result'])
+        self.assertEqual(Transaction.objects.filter(user=self.user).count(), 3)
+
+    def test_command(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.ofx', encoding='utf-8', delete=False) as handle:
+            handle.write(self.OFX)
+        self.addCleanup(os.remove, handle.name)
+        out, err = io.StringIO(), io.StringIO()
+        call_command('import_transactions', self.user.username, handle.name, stdout=out, stderr=err)
+        self.assertIn('2 transacciones importadas, 0 filas con errores', out.getvalue())
+        with self.assertRaises(CommandError):
+            call_command('import_transactions', 'nadie', handle.name, stdout=out, stderr=err)
+
+
+class DashboardCacheTests(TestCase):
+    """El dashboard se sirve desde la caché hasta que cambian los datos del usuario."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('usuario', password='clave-segura-123')
+        cls.other = User.objects.create_user('otro', password='clave-segura-123')
+        cls.category = Category.objects.create(user=cls.user, name='Comida', category_type='EXPENSE')
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def finance_queries(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('dashboard'))
+        self.assertEqual(response.status_code, 200)
+        return response, [q['sql'] for q in ctx.captured_queries if 'finances_' in q['sql']]
+
+    def add_expense(self, amount):
+        return Transaction.objects.create(user=self.user, category=self.category, amount=Decimal(amount),
+                                          description='Súper', transaction_type='EXPENSE', date=date.today())
+
+    def test_repeat_load_skips_database(self):
+        self.add_expense('30.00')
+        _, first = self.finance_queries()
+        self.assertTrue(first)
+        response, second = self.finance_queries()
+        self.assertEqual(second, [])
+        self.assertEqual(response.context['monthly_expenses'], Decimal('30.00'))
+
+    def test_writes_invalidate(self):
+        self.finance_queries()
+        transaction = self.add_expense('30.00')
+        response, queries = self.finance_queries()
+        self.assertTrue(queries)
+        self.assertEqual(response.context['monthly_expenses'], Decimal('30.00'))
+
+        transaction.delete()
+        response, _ = self.finance_queries()
+        self.assertEqual(response.context['monthly_expenses'], Decimal('0'))
+
+        Investment.objects.create(user=self.user, name='Fondo', investment_type='SAVINGS', initial_amount=100,
+                                  current_value=110, start_date=date.today(), expected_return=5, risk_level='LOW')
+        response, _ = self.finance_queries()
+        self.assertEqual(response.context['total_investment_value'], Decimal('110'))
+
+        self.category.name = 'Despensa'
+        self.category.save()
+        _, queries = self.finance_queries()
+        self.assertTrue(queries)
+
+    def test_other_users_writes_keep_cache(self):
+        self.finance_queries()
+        Category.objects.create(user=self.other, name='Otra', category_type='EXPENSE')
+        _, queries = self.finance_queries()
+        self.assertEqual(queries, [])
+
+
+class BenchmarkTests(TestCase):
+    """Generador de datos sintéticos y arnés de rendimiento a escala mínima."""
+
+    def test_seed_users(self):
+        users, created = benchmark.seed_users(2, transactions=150, months=6, seed=1, batch_size=40)
+        self.assertEqual(len(users), 2)
+        self.assertEqual(created, 300)
+        self.assertEqual(Transaction.objects.filter(user__in=users).count(), 300)
+        self.assertTrue(Transaction.objects.filter(user=users[0], is_recurring=True).exists())
+        self.assertTrue(Investment.objects.filter(user=users[0]).exists())
+        self.assertTrue(Budget.objects.filter(user=users[0]).exists())
+        # Los lotes mantienen los resúmenes materializados y el saldo diario
+        self.assertEqual(summaries.find_drift(users), [])
+        self.assertEqual(balances.find_drift(users), [])
+
+    def test_run_and_compare(self):
+        users, _ = benchmark.seed_users(1, transactions=50, months=3, seed=1)
+        results = benchmark.run_benchmark(users, iterations=2, warmup=0)
+        self.assertEqual(set(results), {endpoint.name for endpoint in benchmark.ENDPOINTS})
+        for row in results.values():
+            self.assertEqual(row['samples'], 2)
+            self.assertLessEqual(row['p50_ms'], row['p95_ms'])
+
+        baseline = {'endpoints': results}
+        self.assertEqual(benchmark.compare(results, baseline), [])
+        slower = {name: dict(row, p95_ms=row['p95_ms'] * 2 + 10) for name, row in results.items()}
+        self.assertEqual(len(benchmark.compare(slower, baseline)), len(results))
+        more_queries = {'dashboard': dict(results['dashboard'], queries=results['dashboard']['queries'] + 1)}
+        self.assertEqual(len(benchmark.compare(more_queries, baseline)), 1)
+
+    def test_percentile(self):
+        self.assertEqual(benchmark.percentile([1, 2, 3, 4, 5], 50), 3)
+        self.assertEqual(benchmark.percentile([10], 95), 10)
+        self.assertAlmostEqual(benchmark.percentile([0, 10], 95), 9.5)
+
+
+@override_settings(FINANCES_INSTRUMENTATION=True)
+class InstrumentationMiddlewareTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('usuario', password='clave-segura-123', is_staff=True)
+        category = Category.objects.create(user=cls.user, name='Comida', category_type='EXPENSE')
+        seed_transactions(cls.user, [category], 20)
+
+    def setUp(self):
+        cache.clear()
+        registry.reset()
+        self.client.force_login(self.user)
+
+    def test_fingerprint_groups_parameters(self):
+        self.assertEqual(
+            fingerprint("SELECT * FROM t WHERE id IN (%s, %s, %s) AND name = 'x' LIMIT 21"),
+            fingerprint("SELECT *  FROM t WHERE id IN (%s) AND name = 'y' LIMIT 5"),
+        )
+
+    def test_server_timing_and_metrics(self):
+        with self.assertLogs('finances.instrumentation', level='INFO') as logs:
+            response = self.client.get(reverse('dashboard'))
+        timing = response['Server-Timing']
+        self.assertRegex(timing, r'db;dur=[\d.]+;desc="\d+ consultas"')
+        self.assertIn('tpl;dur=', timing)
+        self.assertIn('total;dur=', timing)
+        # Sin consultas N+1 en el dashboard
+        self.assertNotIn('dup;', timing)
+        self.assertIn('"view": "dashboard"', logs.output[0])
+
+        with self.assertLogs('finances.instrumentation', level='INFO'):
+            metrics = self.client.get(reverse('instrumentation_metrics')).json()
+        self.assertEqual(metrics['views']['dashboard']['requests'], 1)
+        self.assertGreater(metrics['views']['dashboard']['avg_template_ms'], 0)
+
+    @override_settings(ROOT_URLCONF='finances.tests')
+    def test_duplicate_queries_are_reported(self):
+        with self.assertLogs('finances.instrumentation', level='WARNING') as logs:
+            response = self.client.get('/n-plus-one/')
+        self.assertIn('dup;desc="1 consultas repetidas (20 ejecuciones)"', response['Server-Timing'])
+        self.assertIn('Consultas repetidas en n_plus_one', logs.output[0])
+
+
+    def test_registry_keeps_top_duplicates(self):
+        metrics_registry = MetricsRegistry(max_fingerprints=3)
+        for repeats in range(2, 12):
+            metrics = RequestMetrics()
+            metrics.fingerprints[f'SELECT {repeats}'] = repeats
+            metrics_registry.record('vista', metrics)
+        duplicates = metrics_registry.snapshot()['vista']['duplicate_queries']
+        self.assertEqual([row['max_repeats'] for row in duplicates], [11, 10, 9])
+        self.assertEqual(len(metrics_registry._views['vista']['duplicates']), 3)
+
+    def test_unresolved_paths_share_one_entry(self):
+        for path in ['/no-existe/1/', '/no-existe/2/']:
+            with self.assertLogs('finances.instrumentation', level='INFO'):
+                self.client.get(path)
+        self.assertEqual(registry.snapshot()[UNRESOLVED_VIEW]['requests'], 2)
+
+    async def test_async_views_are_measured(self):
+        await self.async_client.aforce_login(self.user)
+        with self.assertLogs('finances.instrumentation', level='INFO'):
+            response = await self.async_client.get(reverse('category_spending'))
+        queries = int(re.search(r'desc="(\d+) consultas"', response['Server-Timing']).group(1))
+        # Sesión, usuario, versión de datos y gasto por categoría
+        self.assertGreaterEqual(queries, 3)
+
+
+class AsyncChartViewTests(TestCase):
+    """Las APIs de gráficos son vistas async y responden igual por el cliente async (ASGI)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('usuario', password='clave-segura-123')
+        category = Category.objects.create(user=cls.user, name='Comida', category_type='EXPENSE')
+        Transaction.objects.create(user=cls.user, category=category, amount=Decimal('100.00'),
+                                   description='Sueldo', transaction_type='INCOME', date=date.today())
+        Transaction.objects.create(user=cls.user, category=category, amount=Decimal('30.00'),
+                                   description='Mercado', transaction_type='EXPENSE', date=date.today())
+
+    async def test_chart_apis(self):
+        await self.async_client.aforce_login(self.user)
+
+        data = (await self.async_client.get(reverse('financial_data'))).json()
+        self.assertEqual((data['income'][-1], data['expense'][-1]), (100.0, 30.0))
+
+        response = await self.async_client.get(reverse('transaction_stats'), headers={'X-Requested-With': 'XMLHttpRequest'})
+        stats = response.json()['stats']
+        self.assertEqual((stats['total_income'], stats['total_expenses'], stats['transaction_count']), (100.0, 30.0, 2))
+
+        categories = (await self.async_client.get(reverse('category_spending'))).json()['categories']
+        self.assertEqual((categories['name'], categories['total']), (['Comida'], [30.0]))
+
+    async def test_csv_export_streams_asynchronously(self):
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get(reverse('export_transactions'))
+        # Un iterador sync se cargaría completo en memoria bajo ASGI
+        self.assertTrue(response.is_async)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        content = b''.join([chunk async for chunk in response.streaming_content]).decode('utf-8')
+        rows = list(csv.reader(io.StringIO(content)))
+        self.assertEqual(rows[0], exports.EXPORT_HEADER)
+        # Más recientes primero, igual que el export sync
+        self.assertEqual([row[1] for row in rows[1:]], ['Mercado', 'Sueldo'])
+
+    async def test_login_required(self):
+        response = await self.async_client.get(reverse('financial_data'))
+        self.assertEqual(response.status_code, 302)
+
+
+class ChartDataTests(TestCase):
+    """El API por lotes devuelve lo mismo que las APIs individuales con una consulta de transacciones."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('usuario', password='clave-segura-123')
+        categories = [
+            Category.objects.create(user=cls.user, name=name, category_type='EXPENSE', color=color)
+            for name, color in [('Comida', '#FF6B6B'), ('Transporte', '#4ECDC4')]
+        ]
+        seed_transactions(cls.user, categories, 120)
+        summaries.rebuild([cls.user])
+        Investment.objects.create(user=cls.user, name='Fondo', investment_type='SAVINGS', initial_amount=200,
+                                  current_value=250, start_date=date.today(), expected_return=5, risk_level='LOW')
+        # Las inversiones cerradas no cuentan, igual que en el dashboard
+        Investment.objects.create(user=cls.user, name='Cerrada', investment_type='SAVINGS', initial_amount=1000,
+                                  current_value=900, start_date=date.today(), expected_return=5, risk_level='LOW',
+                                  is_active=False)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def test_matches_individual_apis(self):
+        series = self.client.get(reverse('chart_data')).json()['series']
+        self.assertEqual(series['trend'], self.client.get(reverse('financial_data')).json())
+        self.assertEqual(series['categories'], self.client.get(reverse('category_spending')).json())
+        for period in ['week', 'month', 'year']:
+            stats = self.client.get(reverse('transaction_stats'), {'period': period},
+                                    headers={'X-Requested-With': 'XMLHttpRequest'}).json()['stats']
+            self.assertEqual(series[f'stats_{period}'], stats)
+        self.assertEqual(series['investments'], {'count': 1, 'total_invested': 200.0, 'current_value': 250.0,
+                                                 'roi': 25.0})
+        dashboard = self.client.get(reverse('dashboard')).context
+        self.assertEqual(series['investments']['current_value'], float(dashboard['total_investment_value']))
+
+    def test_single_transaction_scan(self):
+        # Sesión, usuario, DataVersion, transacciones e inversiones
+        with self.assertNumQueries(5):
+            response = self.client.get(reverse('chart_data'))
+        self.assertEqual(len(response.json()['series']), len(aggregations.CHART_SERIES))
+
+    def test_series_selection(self):
+        response = self.client.get(reverse('chart_data'), {'series': 'stats_month,categories'})
+        self.assertEqual(set(response.json()['series']), {'stats_month', 'categories'})
+        response = self.client.get(reverse('chart_data'), {'series': 'trend,balance'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_etag(self):
+        response = self.client.get(reverse('chart_data'))
+        etag = response['ETag']
+        response = self.client.get(reverse('chart_data'), headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+
+        Transaction.objects.create(user=self.user, category=self.user.categories.first(), amount=Decimal('5.00'),
+                                   description='Café', transaction_type='EXPENSE', date=date.today())
+        response = self.client.get(reverse('chart_data'), headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+
+class CategorySpendingTests(TestCase):
+    """Gasto por categoría en columnas, por período y con top N más "Otros"."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('usuario', password='clave-segura-123')
+        amounts = {'Comida': ['50', '70'], 'Transporte': ['30'], 'Cine': ['10'], 'Libros': ['5']}
+        days = [date(2025, 1, 6), date(2025, 2, 12)]
+        for name, values in amounts.items():
+            category = Category.objects.create(user=cls.user, name=name, category_type='EXPENSE')
+            for day, amount in zip(days, values):
+                Transaction.objects.create(user=cls.user, category=category, amount=Decimal(amount),
+                                           description=name, transaction_type='EXPENSE', date=day)
+        income = Category.objects.create(user=cls.user, name='Sueldo', category_type='INCOME')
+        Transaction.objects.create(user=cls.user, category=income, amount=Decimal('999'),
+                                   description='Sueldo', transaction_type='INCOME', date=days[0])
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def get(self, **params):
+        return self.client.get(reverse('category_spending'), {'start_date': '2025-01-01', 'end_date': '2025-03-15', **params})
+
+    def test_totals_in_columns(self):
+        data = self.get().json()
+        self.assertIsNone(data['granularity'])
+        self.assertEqual(data['categories']['name'], ['Comida', 'Transporte', 'Cine', 'Libros'])
+        self.assertEqual(data['categories']['total'], [120.0, 30.0, 10.0, 5.0])
+        self.assertNotIn('series', data)
+
+    def test_monthly_series_with_top(self):
+        data = self.get(granularity='month', top=2).json()
+        self.assertEqual(data['periods'], ['2025-01-01', '2025-02-01', '2025-03-01'])
+        self.assertEqual(data['categories']['name'], ['Comida', 'Transporte', 'Otros'])
+        self.assertEqual(data['categories']['id'][-1], None)
+        self.assertEqual(data['categories']['total'], [120.0, 30.0, 15.0])
+        self.assertEqual(data['series'], [[50.0, 70.0, 0.0], [30.0, 0.0, 0.0], [15.0, 0.0, 0.0]])
+
+    def test_daily_and_weekly_periods(self):
+        weekly = self.get(granularity='week').json()
+        # Semanas desde el lunes: la primera empieza antes del rango
+        self.assertEqual(weekly['periods'][:2], ['2024-12-30', '2025-01-06'])
+        self.assertEqual(weekly['series'][0][1], 50.0)
+        daily = self.get(granularity='day', start_date='2025-02-10', end_date='2025-02-16').json()
+        self.assertEqual(len(daily['periods']), 7)
+        self.assertEqual(daily['series'], [[0.0, 0.0, 70.0, 0.0, 0.0, 0.0, 0.0]])
+
+    def test_single_grouped_query(self):
+        with self.assertNumQueries(1):
+            rows = list(aggregations.category_spending_queryset(self.user, date(2025, 1, 1), date(2025, 3, 15), 'week'))
+        self.assertEqual(len(rows), 5)
+
+    def test_invalid_parameters(self):
+        for params in [{'granularity': 'hour'}, {'top': '0'}, {'top': 'x'},
+                       {'start_date': '2025-03-01', 'end_date': '2025-01-01'},
+                       {'granularity': 'day', 'start_date': '2000-01-01'}]:
+            self.assertEqual(self.get(**params).status_code, 400, params)
+
+
+class ConditionalResponseTests(TestCase):
+    """Con la versión de datos sin cambios, las APIs responden 304 sin agregar nada."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('usuario', password='clave-segura-123')
+        cls.category = Category.objects.create(user=cls.user, name='Comida', category_type='EXPENSE')
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def add_transaction(self, user=None):
+        user = user or self.user
+        Transaction.objects.create(user=user, category=user.categories.first(), amount=Decimal('5.00'),
+                                   description='Café', transaction_type='EXPENSE', date=date.today())
+
+    def test_api_not_modified(self):
+        response = self.client.get(reverse('financial_data'))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('no-cache', response['Cache-Control'])
+        # Sesión, usuario y DataVersion: ninguna agregación
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('financial_data'), headers={'If-None-Match': response['ETag']})
+        self.assertEqual(response.status_code, 304)
+
+    def test_reports_page_is_always_rendered(self):
+        # Página HTML: un 304 reutilizaría el token CSRF, los mensajes y la plantilla anteriores
+        response = self.client.get(reverse('reports'))
+        self.assertFalse(response.has_header('ETag'))
+        self.assertFalse(response.has_header('Last-Modified'))
+        response = self.client.get(reverse('reports'), headers={'If-None-Match': '*'})
+        self.assertEqual(response.status_code, 200)
+
+    def test_change_invalidates(self):
+        etag = self.client.get(reverse('financial_data'))['ETag']
+        self.add_transaction()
+        response = self.client.get(reverse('financial_data'), headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_if_modified_since(self):
+        self.add_transaction()
+        last_modified = self.client.get(reverse('category_spending'))['Last-Modified']
+        response = self.client.get(reverse('category_spending'), headers={'If-Modified-Since': last_modified})
+        self.assertEqual(response.status_code, 304)
+
+    def test_etag_is_per_user(self):
+        other = User.objects.create_user('otro', password='clave-segura-123')
+        Category.objects.create(user=other, name='Comida', category_type='EXPENSE')
+        etag = self.client.get(reverse('category_spending'))['ETag']
+        self.client.force_login(other)
+        response = self.client.get(reverse('category_spending'), headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+
+    async def test_async_view(self):
+        await self.async_client.aforce_login(self.user)
+        headers = {'X-Requested-With': 'XMLHttpRequest'}
+        response = await self.async_client.get(reverse('transaction_stats'), headers=headers)
+        response = await self.async_client.get(reverse('transaction_stats'),
+                                               headers={**headers, 'If-None-Match': response['ETag']})
+        self.assertEqual(response.status_code, 304)
+
+    def test_delete_user(self):
+        self.add_transaction()
+        self.user.delete()
+        self.assertFalse(DataVersion.objects.exists())
+
+
+class DailyBalanceTests(TestCase):
+    """El saldo diario se mantiene con desplazamientos del sufijo y coincide con el recálculo en vivo."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('usuario', password='clave-segura-123')
+        cls.category = Category.objects.create(user=cls.user, name='Varios', category_type='EXPENSE')
+        cls.start = date.today() - timedelta(days=30)
+
+    def setUp(self):
+        cache.clear()
+
+    def add(self, days, amount, transaction_type='EXPENSE'):
+        return Transaction.objects.create(user=self.user, category=self.category, amount=Decimal(amount),
+                                          description='Movimiento', transaction_type=transaction_type,
+                                          date=self.start + timedelta(days=days))
+
+    def stored(self):
+        return [(row.date - self.start).days for row in DailyBalance.objects.filter(user=self.user)], [
+            row.balance for row in DailyBalance.objects.filter(user=self.user)
+        ]
+
+    def test_incremental_changes(self):
+        self.add(0, '1000.00', 'INCOME')
+        self.add(10, '200.00')
+        expense = self.add(5, '50.00')
+        self.add(10, '100.00', 'INVESTMENT')
+        self.assertEqual(self.stored(), ([0, 5, 10], [Decimal('1000'), Decimal('950'), Decimal('650')]))
+
+        # Mover el gasto después del día 10 desplaza solo los días afectados
+        expense.date = self.start + timedelta(days=20)
+        expense.amount = Decimal('80.00')
+        expense.save()
+        self.assertEqual(self.stored(), ([0, 10, 20], [Decimal('1000'), Decimal('700'), Decimal('620')]))
+
+        expense.delete()
+        self.assertEqual(self.stored(), ([0, 10], [Decimal('1000'), Decimal('700')]))
+        self.assertEqual(balances.find_drift([self.user]), [])
+
+    def test_suffix_update_only(self):
+        self.add(0, '10.00', 'INCOME')
+        self.add(10, '10.00', 'INCOME')
+        with CaptureQueriesContext(connection) as ctx:
+            self.add(5, '3.00')
+        updates = [query['sql'] for query in ctx.captured_queries
+                   if query['sql'].startswith('UPDATE "finances_dailybalance"')]
+        self.assertEqual(len(updates), 1)
+        self.assertIn('"finances_dailybalance"."date" >=', updates[0])
+
+    def test_bulk_create(self):
+        self.add(0, '500.00', 'INCOME')
+        created = Transaction.objects.bulk_create([
+            Transaction(user=self.user, category=self.category, amount=Decimal('5.00'), description=f'Café {i}',
+                        transaction_type='EXPENSE', date=self.start + timedelta(days=i % 30))
+            for i in range(60)
+        ])
+        transactions_bulk_created.send(sender=Transaction, user=self.user, transactions=created)
+        self.assertEqual(balances.find_drift([self.user]), [])
+        self.assertEqual(balances.balance_at(self.user, date.today()), Decimal('200.00'))
+
+    def test_balance_lookups(self):
+        self.add(0, '100.00', 'INCOME')
+        self.add(3, '30.00')
+        with self.assertNumQueries(1):
+            self.assertEqual(balances.balance_at(self.user, self.start + timedelta(days=2)), Decimal('100'))
+        self.assertEqual(balances.balance_at(self.user, self.start - timedelta(days=1)), Decimal('0'))
+        series = balances.balance_series(self.user, self.start + timedelta(days=1), self.start + timedelta(days=4))
+        self.assertEqual(list(series.values()), [Decimal('100'), Decimal('100'), Decimal('70'), Decimal('70')])
+
+    def test_api(self):
+        self.add(0, '100.00', 'INCOME')
+        self.add(3, '30.00')
+        self.client.force_login(self.user)
+        day = self.start + timedelta(days=3)
+        response = self.client.get(reverse('balance'), {'date': day.isoformat()})
+        self.assertEqual(response.json()['balance'], 70.0)
+        response = self.client.get(reverse('balance'), {'start_date': self.start.isoformat(), 'end_date': day.isoformat()})
+        self.assertEqual(response.json()['balances'], [100.0, 100.0, 100.0, 70.0])
+        response = self.client.get(reverse('balance'), {'date': 'ayer'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_rebuild(self):
+        self.add(0, '100.00', 'INCOME')
+        self.add(3, '30.00')
+        DailyBalance.objects.filter(user=self.user).update(balance=0)
+        self.assertEqual(len(balances.find_drift([self.user])), 2)
+        balances.rebuild([self.user])
+        self.assertEqual(balances.find_drift([self.user]), [])
+
+
+class TransactionSearchTests(TestCase):
+    """Búsqueda por descripción y categoría combinada con filtros y paginación (respaldo icontains en SQLite)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('usuario', password='clave-segura-123')
+        food = Category.objects.create(user=cls.user, name='Supermercado', category_type='EXPENSE')
+        home = Category.objects.create(user=cls.user, name='Hogar', category_type='EXPENSE')
+        for i, (category, description, transaction_type) in enumerate([
+            (food, 'Compra semanal', 'EXPENSE'),
+            (home, 'Pago alquiler', 'EXPENSE'),
+            (home, 'Pago luz', 'EXPENSE'),
+            (home, 'Reembolso pago luz', 'INCOME'),
+        ]):
+            Transaction.objects.create(user=cls.user, category=category, amount=Decimal('10.00') + i,
+                                       description=description, transaction_type=transaction_type,
+                                       date=date.today() - timedelta(days=i))
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def search(self, **params):
+        response = self.client.get(reverse('transactions_page'), params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_description_and_category(self):
+        self.assertEqual([row['description'] for row in self.search(q='alqui')['results']], ['Pago alquiler'])
+        self.assertEqual([row['description'] for row in self.search(q='super')['results']], ['Compra semanal'])
+        # Todos los términos deben aparecer
+        self.assertEqual(len(self.search(q='pago luz')['results']), 2)
+
+    def test_combines_with_filters_and_pagination(self):
+        self.assertEqual([row['description'] for row in self.search(q='pago', type='EXPENSE')['results']],
+                         ['Pago alquiler', 'Pago luz'])
+        first = self.search(q='pago', page_size=2)
+        self.assertIn('q=pago', first['next_url'])
+        second = self.search(q='pago', page_size=2, cursor=first['next_cursor'])
+        descriptions = [row['description'] for row in first['results'] + second['results']]
+        self.assertEqual(sorted(descriptions), ['Pago alquiler', 'Pago luz', 'Reembolso pago luz'])
+
+    def test_pages_across_equal_ranks(self):
+        # Mismo texto y misma fecha: todas empatan en ranking y solo las separa el id
+        category = Category.objects.get(user=self.user, name='Hogar')
+        ids = {
+            Transaction.objects.create(user=self.user, category=category, amount=Decimal('5.00'),
+                                       description='Cuota gimnasio', transaction_type='EXPENSE',
+                                       date=date.today()).pk
+            for _ in range(7)
+        }
+        seen = []
+        page = self.search(q='gimnasio', page_size=3)
+        while True:
+            seen += [row['id'] for row in page['results']]
+            if not page['next_cursor']:
+                break
+            page = self.search(q='gimnasio', page_size=3, cursor=page['next_cursor'])
+        self.assertEqual(len(seen), len(ids))
+        self.assertEqual(set(seen), ids)
+
+        # El ranking del cursor vuelve como Decimal exacto
+        ranked = search.search_transactions(Transaction.objects.filter(user=self.user), 'gimnasio')
+        first = ranked.order_by(*search.SEARCH_ORDERING).first()
+        values = pagination.decode_cursor(
+            pagination.encode_cursor(first, search.SEARCH_ORDERING), Transaction, search.SEARCH_ORDERING,
+            ranked.query.annotations,
+        )
+        self.assertEqual(values[0], first.rank)
+        self.assertIsInstance(values[0], Decimal)
+
+    def test_transactions_view(self):
+        response = self.client.get(reverse('transactions'), {'q': 'luz'})
+        self.assertEqual(response.context['transaction_count'], 2)
+        self.assertEqual(response.context['filters']['q'], 'luz')
+        self.assertIn('q=luz', response.context['export_url'])
+        response = self.client.get(reverse('transactions'), {'q': '¿?'})
+        self.assertEqual(response.context['transaction_count'], 4)
+
+
+class ExportJobTests(TestCase):
+    """Exportaciones en segundo plano: cola, worker, formatos y descarga."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('usuario', password='clave-segura-123')
+        category = Category.objects.create(user=cls.user, name='Hogar', category_type='EXPENSE')
+        for i in range(7):
+            Transaction.objects.create(user=cls.user, category=category, amount=Decimal('10.50') + i,
+                                       description=f'Pago {i}', transaction_type='EXPENSE',
+                                       date=date.today() - timedelta(days=i))
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        settings_override = override_settings(MEDIA_ROOT=media.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.client.force_login(self.user)
+
+    def enqueue(self, file_format, **filters):
+        response = self.client.post(reverse('export_jobs'), {'file_format': file_format, **filters})
+        self.assertRedirects(response, reverse('export_jobs'))
+        return ExportJob.objects.filter(user=self.user).latest('created_at')
+
+    def run_and_download(self, job, chunk_size=3):
+        original = exports.CHUNK_SIZE
+        exports.CHUNK_SIZE = chunk_size
+        self.addCleanup(setattr, exports, 'CHUNK_SIZE', original)
+        self.assertEqual(exports.run_pending(), 1)
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'DONE', job.error)
+        response = self.client.get(reverse('download_export', args=[job.id]))
+        self.assertEqual(response.status_code, 200)
+        return job, b''.join(response.streaming_content)
+
+    def test_csv_matches_streaming_export(self):
+        job = self.enqueue('csv', type='EXPENSE', start_date=(date.today() - timedelta(days=4)).isoformat())
+        self.assertEqual(job.status, 'PENDING')
+        self.assertEqual(job.filters['type'], 'EXPENSE')
+        job, content = self.run_and_download(job)
+        self.assertEqual((job.processed_rows, job.total_rows, job.progress), (5, 5, 100))
+        streamed = self.client.get(reverse('export_transactions'), {
+            'type': 'EXPENSE', 'start_date': job.filters['start_date'],
+        })
+        self.assertEqual(content.decode('utf-8').splitlines(),
+                         b''.join(streamed.streaming_content).decode('utf-8').splitlines())
+
+    @unittest.skipUnless(importlib.util.find_spec('openpyxl'), 'openpyxl no está instalado')
+    def test_xlsx(self):
+        from openpyxl import load_workbook
+
+        _, content = self.run_and_download(self.enqueue('xlsx'))
+        rows = list(load_workbook(io.BytesIO(content), read_only=True).active.iter_rows(values_only=True))
+        self.assertEqual(list(rows[0]), exports.EXPORT_HEADER)
+        self.assertEqual(len(rows), 8)
+        self.assertEqual(rows[1][1], 'Pago 0')
+
+    @unittest.skipUnless(importlib.util.find_spec('pyarrow'), 'pyarrow no está instalado')
+    def test_parquet(self):
+        import pyarrow.parquet as pq
+
+        _, content = self.run_and_download(self.enqueue('parquet'))
+        table = pq.read_table(io.BytesIO(content))
+        self.assertEqual(table.num_rows, 7)
+        self.assertEqual(table.column('monto')[0].as_py(), Decimal('10.50'))
+        self.assertEqual(table.column('fecha')[0].as_py(), date.today())
+
+    def test_status_api_and_ownership(self):
+        job = self.enqueue('csv')
+        status = self.client.get(reverse('export_job_status', args=[job.id])).json()['job']
+        self.assertEqual((status['status'], status['download_url']), ('PENDING', None))
+        self.assertEqual(self.client.get(reverse('download_export', args=[job.id])).status_code, 404)
+        self.run_and_download(job)
+        status = self.client.get(reverse('export_job_status', args=[job.id])).json()['job']
+        self.assertEqual(status['download_url'], reverse('download_export', args=[job.id]))
+
+        other = User.objects.create_user('otro', password='clave-segura-123')
+        self.client.force_login(other)
+        self.assertEqual(self.client.get(reverse('download_export', args=[job.id])).status_code, 404)
+        self.assertEqual(self.client.get(reverse('export_job_status', args=[job.id])).status_code, 404)
+
+    def test_invalid_format(self):
+        self.client.post(reverse('export_jobs'), {'file_format': 'pdf'})
+        self.assertFalse(ExportJob.objects.exists())
+
+    def test_stale_job_is_reclaimed_and_worker_command(self):
+        job = self.enqueue('csv')
+        ExportJob.objects.filter(pk=job.pk).update(
+            status='RUNNING', updated_at=timezone.now() - exports.STALE_AFTER - timedelta(minutes=1))
+        call_command('run_export_worker', '--once', stdout=io.StringIO())
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'DONE')
+        rows = list(csv.reader(io.StringIO(job.file.open('rb').read().decode('utf-8'))))
+        job.file.close()
+        self.assertEqual(len(rows), 8)
+
+    def test_purge_expired(self):
+        job, _ = self.run_and_download(self.enqueue('csv'))
+        path = job.file.path
+        self.assertEqual(exports.purge_expired(timezone.now()), 0)
+        self.assertEqual(exports.purge_expired(timezone.now() + exports.RETENTION + timedelta(days=1)), 1)
+        self.assertFalse(ExportJob.objects.exists())
+        self.assertFalse(os.path.exists(path))
+
+
+class AnalyticsTests(TestCase):
+    """El análisis con NumPy coincide con la referencia de bucles sobre el ORM."""
+
+    @classmethod
+    def setUpTestData(cls):
+        users, _ = benchmark.seed_users(1, transactions=600, months=18, seed=3)
+        cls.user = users[0]
+        cls.outlier = Transaction.objects.create(
+            user=cls.user, category=Category.objects.get(user=cls.user, name='Supermercado'),
+            amount=Decimal('95000.00'), description='Compra extraordinaria', transaction_type='EXPENSE',
+            date=date.today() - timedelta(days=3),
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def test_matches_orm_reference(self):
+        today, months = date.today(), 18
+        arrays = analytics.load(self.user, analytics.first_month_of(today, months).astype('datetime64[D]').item(), today)
+        result = analytics.compute(arrays, today, months)
+        reference = benchmark.orm_analysis(self.user, today, months)
+
+        def as_floats(values):
+            return np.array([np.nan if value is None else value for value in values], dtype=float)
+
+        for name in ('income', 'expense', 'net'):
+            self.assertEqual(result['series'][name].tolist(), reference['series'][name])
+            np.testing.assert_allclose(result['rolling'][name], as_floats(reference['rolling'][name]))
+            for computed, expected in zip(result['month_over_month'][name], reference['month_over_month'][name]):
+                np.testing.assert_allclose(computed, as_floats(expected))
+        forecast = dict(zip(arrays.category_ids.tolist(), result['forecast']))
+        self.assertEqual(set(forecast), set(reference['forecast']))
+        for category_id, amount in reference['forecast'].items():
+            self.assertAlmostEqual(forecast[category_id], amount, places=4)
+        self.assertTrue(result['seasonal'])
+        self.assertEqual(arrays.ids[result['anomalies']].tolist(), reference['anomalies'])
+        self.assertEqual(reference['anomalies'][0], self.outlier.id)
+
+    def test_api_and_reports(self):
+        with self.assertNumQueries(3):
+            data = analytics.analyze(self.user)
+        self.assertEqual(data['anomalies'][0]['description'], 'Compra extraordinaria')
+        self.assertEqual(data['anomalies'][0]['amount'], 95000.0)
+        self.assertEqual(len(data['months']), analytics.DEFAULT_MONTHS)
+
+        response = self.client.get(reverse('analytics'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['forecast'], data['forecast'])
+        self.assertEqual(len(self.client.get(reverse('analytics'), {'months': 6}).json()['months']), 6)
+        for months in ['1', '500', 'x']:
+            self.assertEqual(self.client.get(reverse('analytics'), {'months': months}).status_code, 400)
+
+        response = self.client.get(reverse('reports'))
+        self.assertEqual(response.context['analysis']['anomalies'][0]['id'], self.outlier.id)
+        self.assertContains(response, 'Compra extraordinaria')
+
+    def test_benchmark(self):
+        results = benchmark.benchmark_analytics([self.user], iterations=1, warmup=0, synthetic_rows=5000)
+        self.assertEqual(set(results), {'numpy', 'orm_loop', 'numpy_compute_5000'})
+        self.assertEqual(results['numpy_compute_5000']['queries'], 0)
+        self.assertLess(results['numpy']['queries'], results['orm_loop']['queries'])
+
+
+class MoneyTests(TestCase):
+    """Sumas en centavos enteros y serialización rápida de los datos de gráficos."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('usuario', password='clave-segura-123')
+        cls.category = Category.objects.create(user=cls.user, name='Comida', category_type='EXPENSE')
+        # 0.1 + 0.2 acumulado en float no da 0.3: en centavos la suma es exacta
+        for amount in ['0.10', '0.20', '1234.56', '0.01']:
+            Transaction.objects.create(user=cls.user, category=cls.category, amount=Decimal(amount),
+                                       description='Gasto', transaction_type='EXPENSE', date=date.today())
+
+    def test_conversions(self):
+        self.assertEqual(money.to_cents(Decimal('12.34')), 1234)
+        self.assertEqual(money.to_cents(None), 0)
+        self.assertEqual(money.to_decimal(1234), Decimal('12.34'))
+        self.assertEqual(money.to_float(30), 0.3)
+        self.assertEqual(money.percentage(25, 200), 12.5)
+        self.assertEqual(money.percentage(25, 0), 0.0)
+
+    def test_cents_sum(self):
+        totals = Transaction.objects.filter(user=self.user).aggregate(
+            expense=money.cents_sum('amount', filter=Q(transaction_type='EXPENSE')),
+            income=money.cents_sum('amount', filter=Q(transaction_type='INCOME')),
+        )
+        self.assertEqual(totals, {'expense': 123487, 'income': 0})
+        totals, _ = aggregations.period_stats(self.user, date.today(), date.today())
+        self.assertEqual(totals['EXPENSE'], 123487)
+
+    def test_views_convert_at_the_edges(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('transactions'))
+        self.assertEqual(response.context['total_expenses'], Decimal('1234.87'))
+        self.assertEqual(response.context['avg_transaction'], Decimal('308.72'))
+
+        response = self.client.get(reverse('transaction_stats'), {'period': 'week'},
+                                   headers={'X-Requested-With': 'XMLHttpRequest'})
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertEqual(response.json()['stats']['total_expenses'], 1234.87)
+        categories = self.client.get(reverse('category_spending')).json()['categories']
+        self.assertEqual(categories['total'], [1234.87])
+
+    def test_fastjson(self):
+        data = {'meses': ['Ene', 'Feb'], 'montos': [0.3, 1234.87], 'conteo': 2, 'vacío': None}
+        self.assertEqual(json.loads(fastjson.dumps(data)), data)
+        response = fastjson.FastJsonResponse(data, status=201)
+        self.assertEqual((response.status_code, response['Content-Type']), (201, 'application/json'))
+        self.assertEqual(json.loads(response.content), data)
+
+    def test_microbenchmarks(self):
+        result = benchmark.money_microbenchmarks(points=500, repeat=1)
+        self.assertEqual(set(result['timings_ms']), {
+            'sum_decimal', 'sum_cents', 'serialize_decimal_json', 'serialize_cents_fastjson',
+            'jsonresponse_decimal', 'fastjsonresponse_cents',
+        })
+
+
+class ValuationTests(TestCase):
+    """Carga de valuaciones, valor y retorno del portafolio, y ROI calculado en SQL."""
+
+    CSV = (
+        'Inversión,Fecha,Valor\n'
+        'acciones,15/02/2025,1100\n'
+        'Acciones,2025-04-01,1200\n'
+        'Acciones,2025-04-01,1210\n'
+        'Bonos,2025-09-01,550\n'
+        'Acciones,2025-09-01,1331\n'
+        'Cripto,2025-09-01,10\n'
+        'Bonos,2025-10-01,-5\n'
+    )
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('inversionista', password='clave-segura-123')
+        cls.stocks = Investment.objects.create(
+            user=cls.user, name='Acciones', investment_type='STOCK', initial_amount=Decimal('1000'),
+            current_value=Decimal('1000'), start_date=date(2025, 1, 1), expected_return=5, risk_level='LOW',
+        )
+        cls.bonds = Investment.objects.create(
+            user=cls.user, name='Bonos', investment_type='BOND', initial_amount=Decimal('500'),
+            current_value=Decimal('500'), start_date=date(2025, 6, 1), expected_return=5, risk_level='LOW',
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def load_csv(self, content=None):
+        return valuations.import_valuations(self.user, io.BytesIO((content or self.CSV).encode('utf-8')))
+
+    def test_import_upserts_and_updates_current_value(self):
+        version = DataVersion.objects.filter(user=self.user).values_list('version', flat=True).first() or 0
+        result = self.load_csv()
+        self.assertEqual(result.created, 4)
+        self.assertEqual([line for line, _ in result.errors], [7, 8])
+        self.assertEqual(
+            InvestmentValuation.objects.get(investment=self.stocks, date=date(2025, 4, 1)).value, Decimal('1210'),
+        )
+        self.stocks.refresh_from_db()
+        self.bonds.refresh_from_db()
+        self.assertEqual((self.stocks.current_value, self.bonds.current_value), (Decimal('1331'), Decimal('550')))
+        self.assertGreater(DataVersion.objects.get(user=self.user).version, version)
+
+        # Volver a cargar el mismo día actualiza en vez de duplicar
+        self.load_csv('Inversión,Fecha,Valor\nAcciones,2025-09-01,1400\n')
+        self.assertEqual(InvestmentValuation.objects.filter(investment=self.stocks).count(), 3)
+        self.stocks.refresh_from_db()
+        self.assertEqual(self.stocks.current_value, Decimal('1400'))
+
+        with self.assertRaises(valuations.InvalidImportFile):
+            self.load_csv('Nombre,Fecha\nAcciones,2025-09-01\n')
+
+    def test_import_rejects_values_over_column_limits(self):
+        result = self.load_csv(
+            'Inversión,Fecha,Valor\n'
+            'Acciones,2025-03-01,100000000\n'
+            'Acciones,2025-03-02,1200.005\n'
+            'Acciones,2025-03-03,1250\n'
+        )
+        self.assertEqual(result.created, 1)
+        self.assertEqual([line for line, _ in result.errors], [2, 3])
+        self.stocks.refresh_from_db()
+        self.assertEqual(self.stocks.current_value, Decimal('1250'))
+
+        upload = io.BytesIO('Inversión,Fecha,Valor\nBonos,2025-07-01,999999999\n'.encode('utf-8'))
+        upload.name = 'valuaciones.csv'
+        response = self.client.post(reverse('import_valuations'), {'file': upload}, follow=True)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Línea 2', ' '.join(str(m) for m in response.context['messages']))
+        self.assertFalse(InvestmentValuation.objects.filter(investment=self.bonds).exists())
+
+    def test_portfolio_value_twr_and_allocation(self):
+        self.load_csv()
+        with self.assertNumQueries(2):
+            data = valuations.portfolio(self.user, date(2025, 3, 1), date(2025, 12, 31))
+        self.assertEqual(data['dates'], ['2025-03-01', '2025-04-01', '2025-06-01', '2025-09-01', '2025-12-31'])
+        self.assertEqual(data['values'], [1100.0, 1210.0, 1710.0, 1881.0, 1881.0])
+        self.assertEqual((data['start_value'], data['contributions'], data['gain']), (1100.0, 500.0, 281.0))
+        # El aporte de los bonos no cuenta como rendimiento: 1.1 × 1.0 × 1.1
+        self.assertEqual(data['twr_pct'], 21.0)
+        self.assertEqual(
+            [(row['type'], row['value'], row['pct']) for row in data['allocation']],
+            [('STOCK', 1331.0, 70.8), ('BOND', 550.0, 29.2)],
+        )
+
+    def test_investment_without_valuations_uses_current_value(self):
+        Investment.objects.create(
+            user=self.user, name='Ahorro', investment_type='SAVINGS', initial_amount=Decimal('200'),
+            current_value=Decimal('250'), start_date=date(2024, 1, 1), expected_return=5, risk_level='LOW',
+        )
+        today = timezone.localdate()
+        data = valuations.portfolio(self.user, today - timedelta(days=30), today)
+        self.assertEqual(data['end_value'], 1000.0 + 500.0 + 250.0)
+        self.assertEqual(data['contributions'], 0.0)
+
+    def test_portfolio_skips_inactive_investments(self):
+        self.load_csv()
+        closed = Investment.objects.create(
+            user=self.user, name='Cerrada', investment_type='CRYPTO', initial_amount=Decimal('300'),
+            current_value=Decimal('100'), start_date=date(2025, 5, 1), expected_return=5, risk_level='HIGH',
+            is_active=False,
+        )
+        InvestmentValuation.objects.create(investment=closed, date=date(2025, 8, 1), value=Decimal('50'))
+        data = valuations.portfolio(self.user, date(2025, 3, 1), date(2025, 12, 31))
+        self.assertEqual(data['investments'], 2)
+        self.assertEqual((data['end_value'], data['twr_pct']), (1881.0, 21.0))
+        self.assertNotIn('CRYPTO', [row['type'] for row in data['allocation']])
+
+    def test_investments_view_annotates_roi(self):
+        self.load_csv()
+        Investment.objects.create(
+            user=self.user, name='Regalo', investment_type='OTHER', initial_amount=Decimal('0'),
+            current_value=Decimal('0'), start_date=date(2025, 1, 1), expected_return=5, risk_level='LOW', is_active=False,
+        )
+        response = self.client.get(reverse('investments'))
+        roi = {investment.name: investment.roi_pct for investment in response.context['investments']}
+        self.assertEqual(roi['Acciones'], Decimal('33.10'))
+        self.assertEqual(roi['Bonos'], Decimal('10.00'))
+        self.assertIsNone(roi['Regalo'])
+        self.assertEqual(response.context['total_value'], Decimal('1881.00'))
+        self.assertEqual(response.context['total_initial'], Decimal('1500.00'))
+        self.assertEqual(response.context['total_roi'], 25.4)
+        self.assertEqual(response.context['active_count'], 2)
+        self.assertContains(response, '33,10%')
+
+    def test_api_and_import_view(self):
+        url = reverse('portfolio')
+        params = {'start_date': '2025-03-01', 'end_date': '2025-12-31'}
+        self.assertEqual(self.client.get(url, params).json()['end_value'], 1500.0)
+        upload = io.BytesIO(self.CSV.encode('utf-8'))
+        upload.name = 'valuaciones.csv'
+        response = self.client.post(reverse('import_valuations'), {'file': upload})
+        self.assertRedirects(response, reverse('investments'))
+        # La carga invalida la caché de la API
+        self.assertEqual(self.client.get(url, params).json()['twr_pct'], 21.0)
+        self.assertEqual(self.client.get(url, {'start_date': '2025-12-31', 'end_date': '2025-01-01'}).status_code, 400)
+
+        # Borrar una valuación también invalida
+        InvestmentValuation.objects.filter(investment=self.bonds).delete()
+        self.assertEqual(self.client.get(url, params).json()['end_value'], 1831.0)
+
+    def test_command(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', encoding='utf-8', delete=False) as handle:
+            handle.write(self.CSV)
+        self.addCleanup(os.remove, handle.name)
+        out, err = io.StringIO(), io.StringIO()
+        call_command('import_valuations', self.user.username, handle.name, stdout=out, stderr=err)
+        self.assertIn('4 valuaciones importadas, 2 filas con errores', out.getvalue())
+        self.assertIn('Inversión no encontrada', err.getvalue())
+
+
+class RecurringTransactionTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('usuario', password='clave-segura-123')
+        cls.category = Category.objects.create(user=cls.user, name='Renta', category_type='EXPENSE')
+
+    def template(self, when, interval='MONTHLY'):
+        return Transaction.objects.create(user=self.user, category=self.category, amount=Decimal('100.00'),
+                                          description='Renta', transaction_type='EXPENSE', date=when,
+                                          is_recurring=True, recurrence_interval=interval)
+
+    def test_month_end_and_leap_years(self):
+        after = recurring.next_occurrence_after
+        jan31 = date(2023, 1, 31)
+        self.assertEqual(after(jan31, 'MONTHLY', jan31), date(2023, 2, 28))
+        self.assertEqual(after(jan31, 'MONTHLY', date(2023, 2, 28)), date(2023, 3, 31))
+        self.assertEqual(after(jan31, 'MONTHLY', date(2023, 12, 31)), date(2024, 1, 31))
+        self.assertEqual(after(jan31, 'MONTHLY', date(2024, 1, 31)), date(2024, 2, 29))
+        leap_day = date(2024, 2, 29)
+        self.assertEqual(after(leap_day, 'YEARLY', leap_day), date(2025, 2, 28))
+        self.assertEqual(after(leap_day, 'YEARLY', date(2027, 2, 28)), date(2028, 2, 29))
+        self.assertEqual(after(leap_day, 'WEEKLY', leap_day), date(2024, 3, 7))
+        self.assertEqual(after(date(2024, 12, 31), 'DAILY', date(2024, 12, 31)), date(2025, 1, 1))
+
+    def test_generation_is_idempotent(self):
+        template = self.template(date(2024, 1, 31))
+        self.assertEqual(template.next_occurrence, date(2024, 2, 29))
+        # Una plantilla no vencida no se toca
+        self.template(date(2024, 5, 20))
+
+        self.assertEqual(recurring.generate_all_due(date(2024, 5, 15)), (1, 3))
+        self.assertEqual(
+            list(template.occurrences.order_by('date').values_list('date', flat=True)),
+            [date(2024, 2, 29), date(2024, 3, 31), date(2024, 4, 30)],
+        )
+        template.refresh_from_db()
+        self.assertEqual(template.next_occurrence, date(2024, 5, 31))
+        self.assertEqual(recurring.generate_all_due(date(2024, 5, 15)), (0, 0))
+        self.assertEqual(summaries.find_drift([self.user]), [])
+
+    def test_restart_with_stale_watermark_does_not_duplicate(self):
+        template = self.template(date(2024, 1, 15), interval='WEEKLY')
+        recurring.generate_all_due(date(2024, 2, 20))
+        self.assertEqual(template.occurrences.count(), 5)
+        # Como si el proceso hubiera caído antes de guardar la marca de agua
+        Transaction.objects.filter(pk=template.pk).update(next_occurrence=date(2024, 1, 22))
+        self.assertEqual(recurring.generate_all_due(date(2024, 3, 1)), (1, 1))
+        self.assertEqual(template.occurrences.count(), 6)
+        self.assertEqual(summaries.find_drift([self.user]), [])
+
+    def test_disabling_recurrence_clears_watermark(self):
+        template = self.template(date(2024, 1, 1))
+        template.is_recurring = False
+        template.save()
+        self.assertIsNone(template.next_occurrence)
+
+    def test_editing_schedule_reanchors_watermark(self):
+        template = self.template(date(2024, 1, 15))
+        recurring.generate_all_due(date(2024, 3, 20))
+
+        # Otro campo no mueve la marca de agua
+        template = Transaction.objects.get(pk=template.pk)
+        template.amount = Decimal('120.00')
+        template.save()
+        self.assertEqual(template.next_occurrence, date(2024, 4, 15))
+
+        # Con otro intervalo sigue después de la última ocurrencia generada (15 de marzo)
+        template.recurrence_interval = 'WEEKLY'
+        template.save()
+        self.assertEqual(template.next_occurrence, date(2024, 3, 18))
+        recurring.generate_all_due(date(2024, 4, 8))
+        self.assertEqual(
+            list(template.occurrences.order_by('date').values_list('date', flat=True)),
+            [date(2024, 2, 15), date(2024, 3, 15), date(2024, 3, 18), date(2024, 3, 25), date(2024, 4, 1),
+             date(2024, 4, 8)],
+        )
+
+        # Una plantilla sin ocurrencias se ancla en su nueva fecha
+        other = self.template(date(2024, 1, 10))
+        other = Transaction.objects.get(pk=other.pk)
+        other.date = date(2024, 6, 5)
+        other.save()
+        self.assertEqual(Transaction.objects.get(pk=other.pk).next_occurrence, date(2024, 7, 5))
+        self.assertEqual(summaries.find_drift([self.user]), [])
+
+
+class BudgetTrackingTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('usuario', password='clave-segura-123')
+        cls.food = Category.objects.create(user=cls.user, name='Comida', category_type='EXPENSE')
+        cls.transport = Category.objects.create(user=cls.user, name='Transporte', category_type='EXPENSE')
+
+    def expense(self, amount, when, category=None, transaction_type='EXPENSE'):
+        return Transaction.objects.create(user=self.user, category=category or self.food, amount=Decimal(amount),
+                                          description='Gasto', transaction_type=transaction_type, date=when)
+
+    def spent(self, budget):
+        budget.refresh_from_db()
+        return budget.spent_amount
+
+    def test_new_budget_starts_from_existing_spending(self):
+        self.expense('40.00', date(2024, 3, 10))
+        self.expense('15.00', date(2024, 4, 1))
+        budget = Budget.objects.create(user=self.user, category=self.food, month=date(2024, 3, 18),
+                                       allocated_amount=Decimal('100'))
+        self.assertEqual(budget.month, date(2024, 3, 1))
+        self.assertEqual(self.spent(budget), Decimal('40.00'))
+
+    def test_create_edit_delete(self):
+        march = Budget.objects.create(user=self.user, category=self.food, month=date(2024, 3, 1),
+                                      allocated_amount=Decimal('100'))
+        april = Budget.objects.create(user=self.user, category=self.food, month=date(2024, 4, 1),
+                                      allocated_amount=Decimal('100'))
+        transport = Budget.objects.create(user=self.user, category=self.transport, month=date(2024, 3, 1),
+                                          allocated_amount=Decimal('100'))
+
+        transaction = self.expense('30.00', date(2024, 3, 5))
+        self.expense('99.00', date(2024, 3, 6), transaction_type='INCOME')
+        self.assertEqual(self.spent(march), Decimal('30.00'))
+
+        transaction.amount = Decimal('45.50')
+        transaction.save()
+        self.assertEqual(self.spent(march), Decimal('45.50'))
+
+        transaction.date = date(2024, 4, 2)
+        transaction.save()
+        self.assertEqual(self.spent(march), Decimal('0'))
+        self.assertEqual(self.spent(april), Decimal('45.50'))
+
+        transaction.category = self.transport
+        transaction.date = date(2024, 3, 20)
+        transaction.save()
+        self.assertEqual(self.spent(april), Decimal('0'))
+        self.assertEqual(self.spent(transport), Decimal('45.50'))
+
+        transaction.transaction_type = 'INVESTMENT'
+        transaction.save()
+        self.assertEqual(self.spent(transport), Decimal('0'))
+
+        transaction.transaction_type = 'EXPENSE'
+        transaction.save()
+        transaction.delete()
+        self.assertEqual(self.spent(transport), Decimal('0'))
+        self.assertEqual(budgets.reconcile([self.user], fix=False), [])
+
+    def test_bulk_import_and_reconcile(self):
+        budget = Budget.objects.create(user=self.user, category=self.food, month=date(2024, 3, 1),
+                                       allocated_amount=Decimal('100'))
+        seed_transactions(self.user, [self.food, self.transport], 200, start=date(2024, 3, 31))
+        created = list(Transaction.objects.filter(user=self.user))
+        transactions_bulk_created.send(sender=Transaction, user=self.user, transactions=created)
+        self.assertEqual(self.spent(budget), budgets.spent_for(self.user.pk, self.food.pk, date(2024, 3, 1)))
+        self.assertEqual(budgets.reconcile([self.user], fix=False), [])
+
+        Budget.objects.filter(pk=budget.pk).update(spent_amount=Decimal('1'))
+        drift = budgets.reconcile([self.user])
+        self.assertEqual(len(drift), 1)
+        self.assertEqual(budgets.reconcile([self.user], fix=False), [])
+
+
+class BudgetViewTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('usuario', password='clave-segura-123')
+        cls.food = Category.objects.create(user=cls.user, name='Comida', category_type='EXPENSE',
+                                           budget_limit=Decimal('100'))
+        cls.transport = Category.objects.create(user=cls.user, name='Transporte', category_type='EXPENSE')
+        cls.salary = Category.objects.create(user=cls.user, name='Salario', category_type='INCOME')
+        for when, category, amount in [
+            (date(2024, 1, 10), cls.food, '80.00'),
+            (date(2024, 2, 10), cls.food, '150.00'),
+            (date(2024, 2, 11), cls.transport, '30.00'),
+            (date(2024, 3, 1), cls.food, '999.00'),
+        ]:
+            Transaction.objects.create(user=cls.user, category=category, amount=Decimal(amount),
+                                       description='Gasto', transaction_type='EXPENSE', date=when)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def test_overview(self):
+        Budget.objects.create(user=self.user, category=self.food, month=date(2024, 1, 1), allocated_amount=200)
+        Budget.objects.create(user=self.user, category=self.food, month=date(2024, 2, 1), allocated_amount=100)
+        response = self.client.get(reverse('budgets'), {'start_month': '2024-01', 'end_month': '2024-02'})
+        self.assertEqual(response.status_code, 200)
+        rows = {row['name']: row for row in response.context['overview']}
+        self.assertEqual(set(rows), {'Comida', 'Transporte'})
+        self.assertEqual(rows['Comida']['allocated'], Decimal('300'))
+        self.assertEqual(rows['Comida']['spent'], Decimal('230.00'))
+        self.assertEqual(rows['Comida']['remaining'], Decimal('70.00'))
+        self.assertEqual(rows['Comida']['limit'], Decimal('200'))
+        self.assertTrue(rows['Comida']['over_limit'])
+        self.assertFalse(rows['Comida']['over_budget'])
+        self.assertEqual(rows['Transporte']['allocated'], Decimal('0'))
+        self.assertIsNone(rows['Transporte']['percentage'])
+        self.assertEqual([row['name'] for row in response.context['alerts']], ['Comida'])
+        self.assertEqual(len(response.context['budgets']), 2)
+
+    def test_create_edit_delete(self):
+        response = self.client.post(reverse('budgets'), {
+            'month': '2024-02', 'category': self.food.pk, 'allocated_amount': '120.00',
+        })
+        self.assertEqual(response.status_code, 302)
+        budget = Budget.objects.get(user=self.user)
+        self.assertEqual(budget.month, date(2024, 2, 1))
+        self.assertEqual(budget.spent_amount, Decimal('150.00'))
+
+        # Duplicado en el mismo mes y categoría
+        response = self.client.post(reverse('budgets'), {
+            'month': '2024-02', 'category': self.food.pk, 'allocated_amount': '50',
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context['form'].non_field_errors())
+
+        response = self.client.get(reverse('edit_budget', args=[budget.pk]))
+        self.assertContains(response, 'value="2024-02"')
+        self.client.post(reverse('edit_budget', args=[budget.pk]), {
+            'month': '2024-02', 'category': self.transport.pk, 'allocated_amount': '40',
+        })
+        budget.refresh_from_db()
+        self.assertEqual(budget.category, self.transport)
+        self.assertEqual(budget.spent_amount, Decimal('30.00'))
+
+        self.client.post(reverse('delete_budget', args=[budget.pk]))
+        self.assertFalse(Budget.objects.exists())
+
+
+@login_required
+def n_plus_one_view(request):
+    """Vista con un N+1 deliberado para probar la detección de consultas repetidas."""
+    transactions = Transaction.objects.filter(user=request.user).only('id', 'category')
+    return HttpResponse(', '.join(transaction.category.name for transaction in transactions))
+
+
+urlpatterns = [
+    path('n-plus-one/', n_plus_one_view, name='n_plus_one'),
+]
@@ -13,6 +13,7 @@ urlpatterns = [
     path('transactions/', views.transactions, name='transactions'),
     path('categories/', views.categories, name='categories'),
     path('investments/', views.investments, name='investments'),
+    path('budgets/', views.budgets, name='budgets'),
     path('reports/', views.reports, name='reports'),
     path('contact/', views.contact, name='contact'),
     
@@ -21,12 +22,27 @@ urlpatterns = [
     path('transactions/edit/<int:transaction_id>/', views.edit_transaction, name='edit_transaction'),
     path('categories/delete/<int:category_id>/', views.delete_category, name='delete_category'),
     path('investments/delete/<int:investment_id>/', views.delete_investment, name='delete_investment'),
+    path('investments/valuations/import/', views.import_valuations, name='import_valuations'),
+    path('budgets/edit/<int:budget_id>/', views.edit_budget, name='edit_budget'),
+    path('budgets/delete/<int:budget_id>/', views.delete_budget, name='delete_budget'),
     
     # API para gráficos
     path('api/financial-data/', views.get_financial_data, name='financial_data'),
     path('api/category-spending/', views.get_category_spending, name='category_spending'),
     path('api/transaction-stats/', views.get_transaction_stats, name='transaction_stats'),
+    path('api/chart-data/', views.get_chart_data, name='chart_data'),
+    path('api/balance/', views.get_balance, name='balance'),
+    path('api/analytics/', views.get_analytics, name='analytics'),
+    path('api/portfolio/', views.get_portfolio, name='portfolio'),
+    path('api/transactions/', views.get_transactions_page, name='transactions_page'),
+    path('api/metrics/', views.instrumentation_metrics, name='instrumentation_metrics'),
     
      # Exportar
     path('transactions/export/', views.export_transactions, name='export_transactions'),
+    path('exports/', views.export_jobs, name='export_jobs'),
+    path('exports/<int:job_id>/download/', views.download_export, name='download_export'),
+    path('api/exports/<int:job_id>/', views.export_job_status, name='export_job_status'),
+    
+    # Importar
+    path('transactions/import/', views.import_transactions, name='import_transactions'),
 ]
\ No newline at end of file
@@ -0,0 +1,303 @@
+"""
+Historial de valor de las inversiones.
+
+`import_valuations` carga en lote precios de cierre desde CSV (Inversión,
+Fecha, Valor): las inversiones se resuelven con una sola consulta, las filas se
+insertan o actualizan con bulk_create en lotes y al final el valor actual de
+cada inversión tocada se toma de su valuación más reciente con un solo UPDATE.
+
+`portfolio` calcula para cualquier rango de fechas el valor del portafolio,
+el retorno ponderado por tiempo y la distribución por tipo recorriendo una sola
+vez las valuaciones ordenadas por fecha. Los montos van en centavos enteros y
+solo se pasan a pesos al armar el resultado.
+
+Solo cuentan las inversiones activas, igual que en el dashboard y en la
+página de inversiones. Una inversión entra al portafolio en su fecha de
+inicio con su monto inicial (un aporte, que no cuenta como rendimiento) y
+desde ahí vale lo que diga su última valuación. Si nunca se le cargaron
+valuaciones, su valor actual rige desde la última vez que se modificó.
+"""
+import csv
+import heapq
+from collections import namedtuple
+
+from django import forms
+from django.db import transaction as db_transaction
+from django.db.models import BigIntegerField, Exists, F, OuterRef, Subquery
+from django.db.models.functions import Cast, Round
+from django.utils import timezone
+
+from .forms import parse_amount
+from .importers import DEFAULT_BATCH_SIZE, ImportResult, InvalidImportFile, _text_stream, parse_date_value
+from .models import Investment, InvestmentValuation
+from .money import CENTS, percentage, to_cents, to_float
+from .signals import valuations_bulk_created
+
+CSV_COLUMNS = ['Inversión', 'Fecha', 'Valor']
+
+INVESTMENT_TYPES = dict(Investment.INVESTMENT_TYPES)
+
+# Límites de las columnas: la valuación y el valor actual que se copia de ella
+VALUE_FIELD = InvestmentValuation._meta.get_field('value')
+CURRENT_VALUE_FIELD = Investment._meta.get_field('current_value')
+
+# Tipos de evento del recorrido; en un mismo día el aporte va antes que la valuación
+PURCHASE = 0
+VALUATION = 1
+
+
+def read_csv(fileobj):
+    """Genera (línea, fila) desde un CSV con las columnas Inversión, Fecha y Valor."""
+    reader = csv.reader(_text_stream(fileobj))
+    header = next(reader, None)
+    if header is None:
+        raise InvalidImportFile("El archivo está vacío")
+    header = [column.strip() for column in header]
+    missing = [column for column in CSV_COLUMNS if column not in header]
+    if missing:
+        raise InvalidImportFile(f"Faltan columnas en el encabezado: {', '.join(missing)}")
+    positions = [header.index(column) for column in CSV_COLUMNS]
+
+    for row in reader:
+        if not any(cell.strip() for cell in row):
+            continue
+        line = reader.line_num
+        if len(row) < len(header):
+            yield line, None
+            continue
+        investment, day, value = (row[position] for position in positions)
+        yield line, {'investment': investment, 'date': day, 'value': value}
+
+
+class ValuationImporter:
+    """Convierte filas crudas en valuaciones de las inversiones del usuario y las guarda en lotes."""
+
+    def __init__(self, user, batch_size=DEFAULT_BATCH_SIZE):
+        self.user = user
+        self.batch_size = batch_size
+        self.result = ImportResult()
+        # (inversión, fecha) -> valuación; si el archivo repite el día, gana la última fila
+        self._batch = {}
+        self._touched = set()
+        # Una sola consulta: nombre (sin mayúsculas) -> id de la inversión
+        self._investments = {}
+        for investment_id, name in Investment.objects.filter(user=user).order_by('created_at').values_list('id', 'name'):
+            self._investments.setdefault(name.strip().lower(), investment_id)
+
+    def build(self, row):
+        if row is None:
+            raise forms.ValidationError("La fila no tiene todas las columnas")
+        name = (row['investment'] or '').strip()
+        investment_id = self._investments.get(name.lower())
+        if investment_id is None:
+            raise forms.ValidationError(f"Inversión no encontrada: '{name}'")
+        # bulk_create no valida: un valor fuera de rango abortaría toda la importación en
+        # PostgreSQL, al insertarlo o al copiarlo a current_value (que admite menos dígitos)
+        value = VALUE_FIELD.clean(parse_amount(row['value']), None)
+        CURRENT_VALUE_FIELD.clean(value, None)
+        return InvestmentValuation(
+            investment_id=investment_id,
+            date=parse_date_value(row['date']),
+            value=value,
+        )
+
+    def flush(self):
+        if not self._batch:
+            return
+        # Un solo INSERT ... ON CONFLICT por lote: las fechas ya cargadas se actualizan
+        saved = InvestmentValuation.objects.bulk_create(
+            list(self._batch.values()),
+            update_conflicts=True,
+            unique_fields=['investment', 'date'],
+            update_fields=['value'],
+        )
+        self._touched.update(valuation.investment_id for valuation in saved)
+        self.result.created += len(saved)
+        self._batch = {}
+
+    def sync_current_values(self):
+        """Valor actual de cada inversión tocada = su valuación más reciente (un solo UPDATE)."""
+        if not self._touched:
+            return
+        latest = InvestmentValuation.objects.filter(investment=OuterRef('pk')).order_by('-date').values('value')[:1]
+        Investment.objects.filter(pk__in=self._touched).update(
+            current_value=Subquery(latest), updated_at=timezone.now(),
+        )
+
+    def run(self, rows):
+        with db_transaction.atomic():
+            for line, row in rows:
+                try:
+                    valuation = self.build(row)
+                except forms.ValidationError as e:
+                    self.result.add_error(line, '; '.join(e.messages))
+                    continue
+                self._batch[valuation.investment_id, valuation.date] = valuation
+                if len(self._batch) >= self.batch_size:
+                    self.flush()
+            self.flush()
+            self.sync_current_values()
+            if self._touched:
+                valuations_bulk_created.send(
+                    sender=InvestmentValuation, user=self.user, investment_ids=sorted(self._touched),
+                )
+        return self.result
+
+
+def import_valuations(user, fileobj, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Importa un CSV de valuaciones para las inversiones de `user` y devuelve un
+    ImportResult (`created` cuenta filas insertadas o actualizadas). Lanza
+    InvalidImportFile si el archivo no tiene el formato esperado.
+    """
+    try:
+        return ValuationImporter(user, batch_size=batch_size).run(read_csv(fileobj))
+    except UnicodeDecodeError as e:
+        raise InvalidImportFile("El archivo debe estar codificado en UTF-8") from e
+
+
+Holding = namedtuple('Holding', 'id investment_type start_date initial opening')
+
+
+def load(user, start, end):
+    """
+    (inversiones, eventos) del portafolio de `user` entre `start` y `end` en
+    dos consultas, solo con las inversiones activas. `opening` es el valor de
+    cada inversión al empezar el rango (None si empieza dentro de él) y los
+    eventos (fecha, tipo, inversión, centavos) vienen ordenados por fecha.
+    """
+    before_start = InvestmentValuation.objects.filter(investment=OuterRef('pk'), date__lt=start).order_by('-date')
+    rows = (
+        Investment.objects.filter(user=user, is_active=True, start_date__lte=end)
+        .annotate(
+            opening_cents=Cast(Round(Subquery(before_start.values('value')[:1]) * CENTS), BigIntegerField()),
+            has_valuations=Exists(InvestmentValuation.objects.filter(investment=OuterRef('pk'))),
+        )
+        .values_list(
+            'id', 'investment_type', 'start_date', 'initial_amount', 'current_value', 'updated_at',
+            'opening_cents', 'has_valuations',
+        )
+    )
+
+    holdings = []
+    purchases = []
+    for investment_id, investment_type, start_date, initial, current, updated_at, opening, has_valuations in rows:
+        initial = to_cents(initial)
+        if start_date < start:
+            opening = initial if opening is None else opening
+        else:
+            opening = None
+            purchases.append((start_date, PURCHASE, investment_id, initial))
+        if not has_valuations:
+            # Sin historial: el valor actual rige desde la última modificación
+            since = max(timezone.localdate(updated_at), start_date)
+            if since < start:
+                opening = to_cents(current)
+            elif since <= end:
+                purchases.append((since, VALUATION, investment_id, to_cents(current)))
+        holdings.append(Holding(investment_id, investment_type, start_date, initial, opening))
+
+    snapshots = (
+        (day, VALUATION, investment_id, cents)
+        for day, investment_id, cents in InvestmentValuation.objects.filter(
+            investment_id__in=[holding.id for holding in holdings], date__range=(start, end),
+        )
+        .annotate(cents=Cast(Round(F('value') * CENTS), BigIntegerField()))
+        .order_by('date')
+        .values_list('date', 'investment_id', 'cents')
+        .iterator()
+    ) if holdings else iter(())
+    return holdings, heapq.merge(sorted(purchases), snapshots, key=lambda event: event[:2])
+
+
+def compute(holdings, events, start, end):
+    """
+    Recorre una vez `events` (ordenados por fecha) manteniendo el valor de cada
+    inversión, el total y el total por tipo. Cada día con movimientos cierra un
+    subperíodo cuyo rendimiento es (valor al cierre - aportes del día) / valor
+    anterior; el retorno ponderado por tiempo es el producto de esos factores.
+    Montos en centavos.
+    """
+    types = {holding.id: holding.investment_type for holding in holdings}
+    values = {}
+    by_type = dict.fromkeys(INVESTMENT_TYPES, 0)
+    for holding in holdings:
+        if holding.opening is not None:
+            values[holding.id] = holding.opening
+            by_type[holding.investment_type] += holding.opening
+    total = start_value = sum(values.values())
+
+    dates, series = [start], [total]
+    growth = 1.0
+    contributions = 0
+    day, previous_total, day_flows = None, total, 0
+
+    def close_day():
+        nonlocal growth
+        if previous_total > 0:
+            growth *= (total - day_flows) / previous_total
+        if day == dates[-1]:
+            series[-1] = total
+        else:
+            dates.append(day)
+            series.append(total)
+
+    for event_day, kind, investment_id, cents in events:
+        if event_day != day:
+            if day is not None:
+                close_day()
+            day, previous_total, day_flows = event_day, total, 0
+        old = values.get(investment_id)
+        if kind == PURCHASE or old is None:
+            # Lo que entra al portafolio es aporte, no rendimiento
+            day_flows += cents
+            contributions += cents
+            old = 0
+        values[investment_id] = cents
+        total += cents - old
+        by_type[types[investment_id]] += cents - old
+    if day is not None:
+        close_day()
+    if dates[-1] != end:
+        dates.append(end)
+        series.append(total)
+
+    return {
+        'dates': dates,
+        'values': series,
+        'start_value': start_value,
+        'end_value': total,
+        'contributions': contributions,
+        'twr': growth - 1,
+        'by_type': by_type,
+    }
+
+
+def portfolio(user, start, end):
+    """Valor, retorno ponderado por tiempo y distribución por tipo del portafolio de `user`, listo para JSON."""
+    holdings, events = load(user, start, end)
+    result = compute(holdings, events, start, end)
+    end_value = result['end_value']
+    gain = end_value - result['start_value'] - result['contributions']
+    return {
+        'start_date': start.strftime('%Y-%m-%d'),
+        'end_date': end.strftime('%Y-%m-%d'),
+        'investments': len(holdings),
+        'dates': [day.strftime('%Y-%m-%d') for day in result['dates']],
+        'values': [to_float(cents) for cents in result['values']],
+        'start_value': to_float(result['start_value']),
+        'end_value': to_float(end_value),
+        'contributions': to_float(result['contributions']),
+        'gain': to_float(gain),
+        'twr_pct': round(result['twr'] * 100, 2),
+        'allocation': [
+            {
+                'type': code,
+                'label': INVESTMENT_TYPES[code],
+                'value': to_float(cents),
+                'pct': round(percentage(cents, end_value), 1),
+            }
+            for code, cents in sorted(result['by_type'].items(), key=lambda item: -item[1])
+            if cents
+        ],
+    }
@@ -1,99 +1,144 @@
+from asgiref.sync import sync_to_async
 from django.shortcuts import render, redirect, get_object_or_404
+from django.conf import settings
+from django.urls import reverse
 from django.contrib.auth.decorators import login_required
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth import login, authenticate
 from django.contrib import messages
-from django.db.models import Sum, Count
-from django.http import JsonResponse
+from django.db.models import Count
+from django.core.handlers.asgi import ASGIRequest
+from django.http import FileResponse, Http404, StreamingHttpResponse
 from django.utils import timezone
+from django.utils.dateparse import parse_date
 from datetime import datetime, timedelta
+from urllib.parse import urlencode
 from decimal import Decimal
-import json
+import csv
 from django.http import JsonResponse
 from django.db import models
+from django.db.models.functions import Cast, NullIf, Round
 
-from .models import Category, Transaction, Investment, Budget
+from .models import Category, Transaction, Investment, Budget, ExportJob
+from . import cache as finances_cache
+from .fastjson import FastJsonResponse, dumps as fast_dumps
+from .money import cents_sum, percentage, to_decimal, to_float
+from .analytics import (
+    DEFAULT_MONTHS as DEFAULT_ANALYSIS_MONTHS,
+    MAX_MONTHS as MAX_ANALYSIS_MONTHS,
+    analyze,
+)
+from .balances import abalance_at, abalance_series, balance_series
+from .conditional import condition_on_data_version
+from .instrumentation import registry as instrumentation_registry
+from .exports import (
+    EXPORT_HEADER,
+    aexport_values,
+    FORMATS as EXPORT_FORMATS,
+    available_formats as available_export_formats,
+    create_job as create_export_job,
+    export_queryset,
+    export_values,
+)
+from .filters import filter_transactions, ordering_for
+from .pagination import InvalidCursor, paginate, parse_page_size
+from .aggregations import (
+    amonthly_totals,
+    aperiod_stats,
+    chart_series,
+    CHART_SERIES,
+    acategory_spending,
+    SPENDING_GRANULARITIES,
+    budget_overview,
+    month_start,
+    month_overview,
+    monthly_totals,
+    monthly_category_rollup,
+    category_rollup,
+)
 from .forms import (
     UserRegistrationForm, 
     TransactionForm, 
     CategoryForm, 
     InvestmentForm,
-    ContactForm
+    ContactForm,
+    ImportTransactionsForm,
+    ImportValuationsForm,
+    BudgetForm
+)
+from .importers import InvalidImportFile, detect_format, import_transactions as run_import
+from .valuations import import_valuations as run_valuation_import, portfolio
+
+# Columnas que usan las tablas de transacciones; la categoría llega en el mismo JOIN
+TRANSACTION_LIST_FIELDS = (
+    'id', 'date', 'created_at', 'description', 'transaction_type', 'amount',
+    'category__name', 'category__color', 'category__icon',
 )
 
+def with_list_columns(queryset):
+    """Carga la categoría con select_related y solo las columnas que muestran los listados."""
+    return queryset.select_related('category').only(*TRANSACTION_LIST_FIELDS)
+
 @login_required
 def dashboard(request):
     # Get current month data
     today = timezone.now()
-    first_day = today.replace(day=1)
-    last_day = (first_day + timedelta(days=32)).replace(day=1) - timedelta(days=1)
-    
-    # Monthly totals
-    monthly_income = Transaction.objects.filter(
-        user=request.user,
-        transaction_type='INCOME',
-        date__range=[first_day, last_day]
-    ).aggregate(Sum('amount'))['amount__sum'] or Decimal('0')
-    
-    monthly_expenses = Transaction.objects.filter(
-        user=request.user,
-        transaction_type='EXPENSE',
-        date__range=[first_day, last_day]
-    ).aggregate(Sum('amount'))['amount__sum'] or Decimal('0')
-    
-    monthly_investments = Transaction.objects.filter(
-        user=request.user,
-        transaction_type='INVESTMENT',
-        date__range=[first_day, last_day]
-    ).aggregate(Sum('amount'))['amount__sum'] or Decimal('0')
     
-    # Category breakdown
-    expense_categories = Category.objects.filter(
-        user=request.user,
-        category_type='EXPENSE'
+    # Los agregados se cachean por usuario y mes; signals.py invalida la caché
+    # cuando cambian sus transacciones, categorías o inversiones.
+    context = finances_cache.get_or_build(
+        request.user.pk, 'dashboard', [month_start(today).isoformat()],
+        lambda: _dashboard_data(request.user, today),
     )
+    context = dict(context, current_month=today.strftime('%B %Y'))
     
-    category_data = []
-    for category in expense_categories:
-        total = Transaction.objects.filter(
-            user=request.user,
-            category=category,
-            transaction_type='EXPENSE',
-            date__range=[first_day, last_day]
-        ).aggregate(Sum('amount'))['amount__sum'] or Decimal('0')
-        
-        if total > 0:
-            category_data.append({
-                'name': category.name,
-                'total': float(total),
-                'color': category.color
-            })
-    
-    # Recent transactions
-    recent_transactions = Transaction.objects.filter(
-        user=request.user
-    ).order_by('-date', '-created_at')[:10]
-    
-    # Investment summary
-    investments = Investment.objects.filter(user=request.user, is_active=True)
-    total_investment_value = investments.aggregate(Sum('current_value'))['current_value__sum'] or Decimal('0')
-    total_investment_initial = investments.aggregate(Sum('initial_amount'))['initial_amount__sum'] or Decimal('0')
+    return render(request, 'finances/dashboard.html', context)
+
+def _dashboard_data(user, today):
+    # Totales del mes y desglose por categoría: una consulta sobre MonthlySummary
+    # (en centavos; se pasan a Decimal solo al armar el contexto)
+    totals, categories = month_overview(user, today)
+    monthly_income = totals['INCOME']
+    monthly_expenses = totals['EXPENSE']
+    monthly_investments = totals['INVESTMENT']
     
-    context = {
-        'monthly_income': monthly_income,
-        'monthly_expenses': monthly_expenses,
-        'monthly_investments': monthly_investments,
-        'monthly_balance': monthly_income - monthly_expenses - monthly_investments,
-        'category_data': json.dumps(category_data),
+    # Category breakdown
+    category_data = [
+        {'name': row['name'], 'total': to_float(row['total']), 'color': row['color']}
+        for row in categories
+    ]
+    
+    # Recent transactions (evaluadas para poder guardarlas en la caché)
+    recent_transactions = list(with_list_columns(Transaction.objects.filter(
+        user=user
+    )).order_by('-date', '-created_at')[:10])
+    
+    # Investment summary: valor actual e inicial en un solo aggregate
+    investment_totals = Investment.objects.filter(user=user, is_active=True).aggregate(
+        current=cents_sum('current_value'),
+        initial=cents_sum('initial_amount'),
+    )
+    total_investment_value = investment_totals['current']
+    total_investment_initial = investment_totals['initial']
+    
+    return {
+        'monthly_income': to_decimal(monthly_income),
+        'monthly_expenses': to_decimal(monthly_expenses),
+        'monthly_investments': to_decimal(monthly_investments),
+        'monthly_balance': to_decimal(monthly_income - monthly_expenses - monthly_investments),
+        'category_data': fast_dumps(category_data),
         'recent_transactions': recent_transactions,
-        'investments': investments,
-        'total_investment_value': total_investment_value,
-        'total_investment_initial': total_investment_initial,
-        'investment_roi': ((total_investment_value - total_investment_initial) / total_investment_initial * 100 
-                          if total_investment_initial > 0 else 0),
-        'current_month': today.strftime('%B %Y')
+        'total_investment_value': to_decimal(total_investment_value),
+        'total_investment_initial': to_decimal(total_investment_initial),
+        'investment_roi': percentage(total_investment_value - total_investment_initial, total_investment_initial),
     }
-    
-    return render(request, 'finances/dashboard.html', context)
+
+def _page_url(request, filters, page_size, cursor=None):
+    """URL del listado conservando filtros y tamaño de página."""
+    params = dict(filters, page_size=page_size)
+    if cursor:
+        params['cursor'] = cursor
+    return f"{request.path}?{urlencode(params)}"
 
 @login_required
 def transactions(request):
@@ -109,50 +154,19 @@ def transactions(request):
     # 1. OBTENER Y FILTRAR TRANSACCIONES
     # ============================================
     
-    # Obtener todas las transacciones del usuario ordenadas por fecha (más reciente primero)
-    transactions_list = Transaction.objects.filter(
-        user=request.user
-    ).order_by('-date', '-created_at')
+    # Obtener todas las transacciones del usuario
+    transactions_list = Transaction.objects.filter(user=request.user)
     
     # Obtener todas las categorías del usuario para el filtro y formulario
     categories = Category.objects.filter(user=request.user).order_by('name')
     
-    # Inicializar diccionario para filtros
-    filters = {}
-    
     # ============================================
     # 2. APLICAR FILTROS DESDE GET PARAMETERS
     # ============================================
     
-    # Filtro por tipo de transacción
-    transaction_type = request.GET.get('type', '')
-    if transaction_type:
-        transactions_list = transactions_list.filter(transaction_type=transaction_type)
-        filters['type'] = transaction_type
-    
-    # Filtro por categoría
-    category_id = request.GET.get('category', '')
-    if category_id:
-        transactions_list = transactions_list.filter(category_id=category_id)
-        filters['category'] = category_id
-    
-    # Filtro por fecha de inicio
-    start_date = request.GET.get('start_date', '')
-    if start_date:
-        try:
-            transactions_list = transactions_list.filter(date__gte=start_date)
-            filters['start_date'] = start_date
-        except:
-            messages.warning(request, "Fecha de inicio no válida")
-    
-    # Filtro por fecha de fin
-    end_date = request.GET.get('end_date', '')
-    if end_date:
-        try:
-            transactions_list = transactions_list.filter(date__lte=end_date)
-            filters['end_date'] = end_date
-        except:
-            messages.warning(request, "Fecha de fin no válida")
+    transactions_list, filters, filter_errors = filter_transactions(transactions_list, request.GET)
+    for error in filter_errors:
+        messages.warning(request, error)
     
     # ============================================
     # 3. MANEJAR FORMULARIO DE NUEVA TRANSACCIÓN
@@ -187,29 +201,39 @@ def transactions(request):
     # 4. CALCULAR TOTALES Y ESTADÍSTICAS
     # ============================================
     
+    # Página actual (paginación por cursor: fecha, creación, id; con búsqueda, primero la relevancia)
+    page_size = parse_page_size(request.GET.get('page_size'))
+    ordering = ordering_for(filters)
+    try:
+        page = paginate(with_list_columns(transactions_list), request.GET.get('cursor'), page_size, ordering)
+    except InvalidCursor:
+        messages.warning(request, "La página solicitada no es válida, mostrando la primera")
+        page = paginate(with_list_columns(transactions_list), None, page_size, ordering)
+    
     # Calcular totales para las transacciones filtradas
+    # (sumas en centavos, 0 si no hay filas)
     totals = transactions_list.aggregate(
-        total_income=Sum('amount', filter=models.Q(transaction_type='INCOME')),
-        total_expenses=Sum('amount', filter=models.Q(transaction_type='EXPENSE')),
-        total_investments=Sum('amount', filter=models.Q(transaction_type='INVESTMENT'))
+        total_income=cents_sum('amount', filter=models.Q(transaction_type='INCOME')),
+        total_expenses=cents_sum('amount', filter=models.Q(transaction_type='EXPENSE')),
+        total_investments=cents_sum('amount', filter=models.Q(transaction_type='INVESTMENT')),
+        transaction_count=Count('id')
     )
     
-    # Obtener valores o 0 si son None
-    total_income = totals['total_income'] or Decimal('0')
-    total_expenses = totals['total_expenses'] or Decimal('0')
-    total_investments = totals['total_investments'] or Decimal('0')
+    total_income = totals['total_income']
+    total_expenses = totals['total_expenses']
+    total_investments = totals['total_investments']
     
     # Calcular balance
     balance = total_income - total_expenses - total_investments
     
     # Calcular estadísticas adicionales
-    transaction_count = transactions_list.count()
+    transaction_count = totals['transaction_count']
     
-    # Calcular promedio de transacciones
-    avg_transaction = Decimal('0')
+    # Calcular promedio de transacciones (redondeado al centavo)
+    avg_transaction = 0
     if transaction_count > 0:
         total_all = total_income + total_expenses + total_investments
-        avg_transaction = total_all / transaction_count
+        avg_transaction = round(total_all / transaction_count)
     
     # ============================================
     # 5. DATOS PARA GRÁFICOS (opcional)
@@ -219,28 +243,31 @@ def transactions(request):
     thirty_days_ago = timezone.now() - timedelta(days=30)
     recent_transactions = transactions_list.filter(date__gte=thirty_days_ago)
     
-    category_totals = []
-    for category in categories:
-        cat_total = recent_transactions.filter(
-            category=category,
-            transaction_type='EXPENSE'
-        ).aggregate(Sum('amount'))['amount__sum'] or Decimal('0')
-        
-        if cat_total > 0:
-            category_totals.append({
-                'name': category.name,
-                'total': float(cat_total),
-                'color': category.color,
-                'icon': category.icon
-            })
+    category_totals = [
+        {
+            'name': row['name'],
+            'total': to_float(row['total']),
+            'color': row['color'],
+            'icon': row['icon']
+        }
+        for row in category_rollup(recent_transactions, transaction_type='EXPENSE')
+    ]
     
     # ============================================
     # 6. PREPARAR CONTEXTO PARA EL TEMPLATE
     # ============================================
     
     context = {
-        # Lista principal
-        'transactions': transactions_list,
+        # Lista principal (solo la página actual)
+        'transactions': page.items,
+        'page': page,
+        'page_size': page_size,
+        'page_size_choices': [25, 50, 100, 200],
+        'next_page_url': _page_url(request, filters, page_size, page.next_cursor) if page.has_next else None,
+        'first_page_url': _page_url(request, filters, page_size) if request.GET.get('cursor') else None,
+        'export_url': f"{reverse('export_transactions')}?{urlencode(filters)}",
+        'export_formats': [(code, label) for code, label in ExportJob.FORMAT_CHOICES
+                           if code in available_export_formats()],
         'form': form,
         'categories': categories,
         
@@ -248,15 +275,15 @@ def transactions(request):
         'filters': filters,
         
         # Totales y estadísticas
-        'total_income': total_income,
-        'total_expenses': total_expenses,
-        'total_investments': total_investments,
-        'balance': balance,
+        'total_income': to_decimal(total_income),
+        'total_expenses': to_decimal(total_expenses),
+        'total_investments': to_decimal(total_investments),
+        'balance': to_decimal(balance),
         'transaction_count': transaction_count,
-        'avg_transaction': avg_transaction,
+        'avg_transaction': to_decimal(avg_transaction),
         
         # Datos para gráficos
-        'category_totals': json.dumps(category_totals),
+        'category_totals': fast_dumps(category_totals),
         'category_data': category_totals,  # También disponible sin JSON
         
         # Fechas útiles
@@ -266,7 +293,7 @@ def transactions(request):
         # Mensajes adicionales
         'has_filters': bool(filters),
         'is_filtered': any([filters.get('type'), filters.get('category'), 
-                           filters.get('start_date'), filters.get('end_date')]),
+                           filters.get('start_date'), filters.get('end_date'), filters.get('q')]),
     }
     
     # ============================================
@@ -298,9 +325,31 @@ def categories(request):
     
     return render(request, 'finances/categories.html', context)
 
+# Retorno de cada inversión en SQL (NULL si el monto inicial es 0). La división se hace en
+# punto flotante porque SQLite divide enteros si los montos no tienen centavos.
+INVESTMENT_ROI = Cast(
+    Round(
+        Cast(models.F('current_value') - models.F('initial_amount'), models.FloatField()) * 100
+        / Cast(NullIf('initial_amount', 0), models.FloatField()),
+        2,
+    ),
+    models.DecimalField(max_digits=12, decimal_places=2),
+)
+
+# Días del resumen de rendimiento de la página de inversiones
+PORTFOLIO_SUMMARY_DAYS = 365
+
+def _cached_portfolio(user, start_date, end_date):
+    # Misma entrada de caché para la página de inversiones y la API
+    return finances_cache.get_or_build(
+        user.pk, 'portfolio', [start_date.isoformat(), end_date.isoformat()],
+        lambda: portfolio(user, start_date, end_date),
+    )
+
 @login_required
 def investments(request):
-    investments_list = Investment.objects.filter(user=request.user)
+    user_investments = Investment.objects.filter(user=request.user)
+    investments_list = user_investments.annotate(roi_pct=INVESTMENT_ROI)
     
     if request.method == 'POST':
         form = InvestmentForm(request.POST)
@@ -313,70 +362,96 @@ def investments(request):
     else:
         form = InvestmentForm()
     
+    # Totales en un solo aggregate
+    totals = user_investments.aggregate(
+        total_value=cents_sum('current_value'),
+        total_initial=cents_sum('initial_amount'),
+        active_count=Count('id', filter=models.Q(is_active=True)),
+    )
+    today = timezone.localdate()
+    
     context = {
         'investments': investments_list,
         'form': form,
+        'import_form': ImportValuationsForm(),
+        'total_value': to_decimal(totals['total_value']),
+        'total_initial': to_decimal(totals['total_initial']),
+        'total_roi': round(percentage(totals['total_value'] - totals['total_initial'], totals['total_initial']), 2),
+        'active_count': totals['active_count'],
+        'performance': _cached_portfolio(request.user, today - timedelta(days=PORTFOLIO_SUMMARY_DAYS), today),
     }
     
     return render(request, 'finances/investments.html', context)
 
+@login_required
+def import_valuations(request):
+    """
+    Carga valuaciones de inversiones desde un CSV (Inversión, Fecha, Valor)
+    """
+    if request.method == 'POST':
+        form = ImportValuationsForm(request.POST, request.FILES)
+        if form.is_valid():
+            try:
+                result = run_valuation_import(request.user, form.cleaned_data['file'].file)
+            except InvalidImportFile as e:
+                messages.error(request, f'❌ {e}')
+            else:
+                if result.created:
+                    messages.success(request, f'✅ {result.created} valuaciones importadas exitosamente.')
+                for line, message in result.errors[:5]:
+                    messages.warning(request, f'Línea {line}: {message}')
+                if result.error_count > 5:
+                    messages.warning(request, f'... y {result.error_count - 5} filas más con errores.')
+        else:
+            messages.error(request, '❌ Selecciona un archivo CSV.')
+    return redirect('investments')
+
+# Sin respuesta condicional: es una página HTML completa (token CSRF, mensajes,
+# navegación) que no depende solo de los datos; las APIs de los gráficos sí la usan
 @login_required
 def reports(request):
     # Get date range for reports
     end_date = timezone.now()
     start_date = end_date - timedelta(days=365)
     
-    # Monthly income/expense data
+    # Monthly income/expense data (una sola consulta agrupada por mes)
     monthly_data = {}
-    current = start_date.replace(day=1)
-    
-    while current <= end_date:
-        month_start = current
-        month_end = (month_start + timedelta(days=32)).replace(day=1) - timedelta(days=1)
-        
-        income = Transaction.objects.filter(
-            user=request.user,
-            transaction_type='INCOME',
-            date__range=[month_start, month_end]
-        ).aggregate(Sum('amount'))['amount__sum'] or Decimal('0')
-        
-        expense = Transaction.objects.filter(
-            user=request.user,
-            transaction_type='EXPENSE',
-            date__range=[month_start, month_end]
-        ).aggregate(Sum('amount'))['amount__sum'] or Decimal('0')
-        
-        monthly_data[current.strftime('%Y-%m')] = {
-            'income': float(income),
-            'expense': float(expense),
-            'balance': float(income - expense),
-            'label': current.strftime('%b %Y')
+    for month, totals in monthly_totals(request.user, start_date, end_date).items():
+        income = totals['INCOME']
+        expense = totals['EXPENSE']
+        monthly_data[month.strftime('%Y-%m')] = {
+            'income': to_float(income),
+            'expense': to_float(expense),
+            'balance': to_float(income - expense),
+            'label': month.strftime('%b %Y')
         }
-        
-        current = (current + timedelta(days=32)).replace(day=1)
     
-    # Category spending for the last 6 months
+    # Category spending for the last 6 months (meses completos)
     six_months_ago = end_date - timedelta(days=180)
-    category_spending = {}
-    
-    categories = Category.objects.filter(user=request.user, category_type='EXPENSE')
-    for category in categories:
-        total = Transaction.objects.filter(
-            user=request.user,
-            category=category,
-            transaction_type='EXPENSE',
-            date__gte=six_months_ago
-        ).aggregate(Sum('amount'))['amount__sum'] or Decimal('0')
-        
-        if total > 0:
-            category_spending[category.name] = {
-                'total': float(total),
-                'color': category.color
-            }
+    category_spending = {
+        row['name']: {'total': to_float(row['total']), 'color': row['color']}
+        for row in monthly_category_rollup(
+            request.user, six_months_ago, end_date,
+            transaction_type='EXPENSE', category_type='EXPENSE'
+        )
+    }
+    
+    # Saldo al cierre de cada día del período (DailyBalance: una lectura por rango)
+    balance = balance_series(request.user, timezone.localdate(start_date), timezone.localdate(end_date))
+    balance_data = {
+        'dates': [day.strftime('%Y-%m-%d') for day in balance],
+        'balances': [float(amount) for amount in balance.values()],
+    }
+    
+    # Promedio móvil, pronóstico del mes y gastos inusuales (NumPy, en caché hasta que cambien los datos)
+    analysis = _cached_analysis(request.user, timezone.localdate(end_date))
     
     context = {
-        'monthly_data': json.dumps(monthly_data),
-        'category_spending': json.dumps(category_spending),
+        'monthly_data': fast_dumps(monthly_data),
+        'category_spending': fast_dumps(category_spending),
+        'balance_data': fast_dumps(balance_data),
+        'analysis': analysis,
+        'analysis_data': fast_dumps({key: analysis[key] for key in ('months', 'totals', 'rolling')}),
         'start_date': start_date.strftime('%Y-%m-%d'),
         'end_date': end_date.strftime('%Y-%m-%d'),
     }
@@ -430,8 +505,10 @@ def delete_transaction(request, transaction_id):
     return redirect('transactions')
 
 @login_required
-def get_financial_data(request):
-    """API endpoint for chart data"""
+@condition_on_data_version
+async def get_financial_data(request):
+    """API endpoint for chart data (vista async: ORM async bajo ASGI)"""
+    user = await request.auser()
     data = {}
     
     # Last 6 months data
@@ -442,34 +519,16 @@ def get_financial_data(request):
     income_data = []
     expense_data = []
     
-    current = start_date.replace(day=1)
-    while current <= end_date:
-        month_start = current
-        month_end = (month_start + timedelta(days=32)).replace(day=1) - timedelta(days=1)
-        
-        income = Transaction.objects.filter(
-            user=request.user,
-            transaction_type='INCOME',
-            date__range=[month_start, month_end]
-        ).aggregate(Sum('amount'))['amount__sum'] or Decimal('0')
-        
-        expense = Transaction.objects.filter(
-            user=request.user,
-            transaction_type='EXPENSE',
-            date__range=[month_start, month_end]
-        ).aggregate(Sum('amount'))['amount__sum'] or Decimal('0')
-        
-        months.append(current.strftime('%b'))
-        income_data.append(float(income))
-        expense_data.append(float(expense))
-        
-        current = (current + timedelta(days=32)).replace(day=1)
+    for month, totals in (await amonthly_totals(user, start_date, end_date)).items():
+        months.append(month.strftime('%b'))
+        income_data.append(to_float(totals['INCOME']))
+        expense_data.append(to_float(totals['EXPENSE']))
     
     data['months'] = months
     data['income'] = income_data
     data['expense'] = expense_data
     
-    return JsonResponse(data)
+    return FastJsonResponse(data)
 
 # Para eliminar categorías
 @login_required
@@ -520,21 +579,65 @@ def edit_transaction(request, transaction_id):
     
     return render(request, 'finances/edit_transaction.html', context)
 
+def _parse_date_param(value, default):
+    """Convierte un parámetro YYYY-MM-DD en date; si falta o no es válido, usa `default`."""
+    try:
+        return parse_date(value or '') or default
+    except ValueError:
+        return default
+
+# Máximo de períodos por serie del gasto por categoría (unos 10 años por día)
+MAX_SPENDING_PERIODS = 3660
+
 # API para datos de categorías
 @login_required
-def get_category_spending(request):
-
-    # Implementa según necesites
-    return JsonResponse({})    
+@condition_on_data_version
+async def get_category_spending(request):
+    """
+    API con el gasto por categoría en un rango de fechas (por defecto, el mes actual),
+    en columnas: una lista por atributo de categoría y, con granularidad, una serie por categoría.
+    Acepta ?start_date=YYYY-MM-DD&end_date=YYYY-MM-DD&granularity=day|week|month&top=N
+    (con top, las demás categorías se agrupan en "Otros").
+    """
+    user = await request.auser()
+    today = timezone.now().date()
+    start_date = _parse_date_param(request.GET.get('start_date'), today.replace(day=1))
+    end_date = _parse_date_param(request.GET.get('end_date'), today)
+    
+    granularity = request.GET.get('granularity') or None
+    if granularity is not None and granularity not in SPENDING_GRANULARITIES:
+        return JsonResponse({
+            'success': False,
+            'error': f"Granularidad no válida (use {', '.join(SPENDING_GRANULARITIES)})",
+        }, status=400)
+    try:
+        top = int(request.GET['top']) if request.GET.get('top') else None
+    except ValueError:
+        top = 0
+    if top is not None and top < 1:
+        return JsonResponse({'success': False, 'error': 'top debe ser un entero mayor a 0'}, status=400)
+    
+    days = (end_date - start_date).days
+    periods = {'day': days, 'week': days // 7, 'month': days // 28}.get(granularity, 0)
+    if days < 0 or periods > MAX_SPENDING_PERIODS:
+        return JsonResponse({
+            'success': False,
+            'error': f'Rango no válido (máximo {MAX_SPENDING_PERIODS} períodos)',
+        }, status=400)
+    
+    return FastJsonResponse(await acategory_spending(user, start_date, end_date, granularity, top))
 
 
 @login_required
-def get_transaction_stats(request):
+@condition_on_data_version
+async def get_transaction_stats(request):
     """
     API para obtener estadísticas de transacciones (para AJAX)
     """
     if request.method == 'GET' and request.headers.get('X-Requested-With') == 'XMLHttpRequest':
         try:
+            user = await request.auser()
+            
             # Obtener período del request
             period = request.GET.get('period', 'month')  # month, week, year
             
@@ -550,69 +653,403 @@ def get_transaction_stats(request):
             else:
                 start_date = today - timedelta(days=30)
             
-            # Obtener transacciones del período
-            transactions = Transaction.objects.filter(
-                user=request.user,
-                date__gte=start_date,
-                date__lte=today
-            )
+            # Sumas por tipo y conteo del período en un solo aggregate
+            totals, transaction_count = await aperiod_stats(user, start_date, today)
             
             # Calcular estadísticas
             stats = {
-                'total_income': float(transactions.filter(
-                    transaction_type='INCOME'
-                ).aggregate(Sum('amount'))['amount__sum'] or Decimal('0')),
-                
-                'total_expenses': float(transactions.filter(
-                    transaction_type='EXPENSE'
-                ).aggregate(Sum('amount'))['amount__sum'] or Decimal('0')),
-                
-                'total_investments': float(transactions.filter(
-                    transaction_type='INVESTMENT'
-                ).aggregate(Sum('amount'))['amount__sum'] or Decimal('0')),
-                
-                'transaction_count': transactions.count(),
+                'total_income': to_float(totals['INCOME']),
+                'total_expenses': to_float(totals['EXPENSE']),
+                'total_investments': to_float(totals['INVESTMENT']),
+                'transaction_count': transaction_count,
                 'period': period,
                 'start_date': start_date.strftime('%Y-%m-%d'),
                 'end_date': today.strftime('%Y-%m-%d'),
             }
             
-            return JsonResponse({'success': True, 'stats': stats})
+            return FastJsonResponse({'success': True, 'stats': stats})
             
         except Exception as e:
             return JsonResponse({'success': False, 'error': str(e)})
     
     return JsonResponse({'success': False, 'error': 'Método no permitido'})    
 
+
+@login_required
+@condition_on_data_version
+async def get_chart_data(request):
+    """
+    API por lotes con varias series de gráficos en una sola respuesta.
+    Acepta ?series=trend,stats_week,stats_month,stats_year,categories,investments
+    (por defecto todas); las de transacciones salen de una sola consulta.
+    """
+    user = await request.auser()
+    requested = [name for value in request.GET.getlist('series') for name in value.split(',') if name]
+    unknown = sorted(set(requested) - set(CHART_SERIES))
+    if unknown:
+        return JsonResponse({'success': False, 'error': f"Series no válidas: {', '.join(unknown)}"}, status=400)
+    series = sorted(set(requested)) or list(CHART_SERIES)
+    today = timezone.localdate()
+    
+    # Caché por usuario: se invalida sola cuando cambian sus transacciones o inversiones
+    data = await sync_to_async(finances_cache.get_or_build)(
+        user.pk, 'chart_data', [today.isoformat(), *series], lambda: chart_series(user, series, today),
+    )
+    
+    return FastJsonResponse({'success': True, 'series': data})
+
+# Rango máximo de la serie de saldo (un punto por día)
+MAX_BALANCE_RANGE_DAYS = 366 * 10
+
+@login_required
+@condition_on_data_version
+async def get_balance(request):
+    """
+    API de saldo acumulado. Con ?date=YYYY-MM-DD devuelve el saldo al cierre de
+    ese día; si no, la serie diaria entre ?start_date= y ?end_date= (por
+    defecto, el último año).
+    """
+    user = await request.auser()
+    today = timezone.now().date()
+    
+    if 'date' in request.GET:
+        day = _parse_date_param(request.GET['date'], None)
+        if day is None:
+            return JsonResponse({'success': False, 'error': 'Fecha no válida (use YYYY-MM-DD)'}, status=400)
+        balance = await abalance_at(user, day)
+        return JsonResponse({'success': True, 'date': day.strftime('%Y-%m-%d'), 'balance': float(balance)})
+    
+    end_date = _parse_date_param(request.GET.get('end_date'), today)
+    start_date = _parse_date_param(request.GET.get('start_date'), end_date - timedelta(days=365))
+    if start_date > end_date or (end_date - start_date).days > MAX_BALANCE_RANGE_DAYS:
+        return JsonResponse({
+            'success': False,
+            'error': f'Rango no válido (máximo {MAX_BALANCE_RANGE_DAYS} días)',
+        }, status=400)
+    
+    series = await abalance_series(user, start_date, end_date)
+    return JsonResponse({
+        'success': True,
+        'start_date': start_date.strftime('%Y-%m-%d'),
+        'end_date': end_date.strftime('%Y-%m-%d'),
+        'dates': [day.strftime('%Y-%m-%d') for day in series],
+        'balances': [float(amount) for amount in series.values()],
+    })
+
+def _cached_analysis(user, today, months=DEFAULT_ANALYSIS_MONTHS):
+    # Misma entrada de caché para la página de reportes y la API
+    return finances_cache.get_or_build(
+        user.pk, 'analytics', [today.isoformat(), months], lambda: analyze(user, today, months),
+    )
+
+@login_required
+@condition_on_data_version
+async def get_analytics(request):
+    """
+    API de análisis del historial: totales mensuales con promedio móvil,
+    variación mensual, pronóstico del mes por categoría y gastos inusuales.
+    Acepta ?months= (meses analizados, incluido el actual).
+    """
+    user = await request.auser()
+    try:
+        months = int(request.GET.get('months', DEFAULT_ANALYSIS_MONTHS))
+    except ValueError:
+        months = 0
+    if not 2 <= months <= MAX_ANALYSIS_MONTHS:
+        return JsonResponse({
+            'success': False,
+            'error': f'Meses no válidos (entre 2 y {MAX_ANALYSIS_MONTHS})',
+        }, status=400)
+    
+    data = await sync_to_async(_cached_analysis)(user, timezone.localdate(), months)
+    return FastJsonResponse({'success': True, **data})
+
+@login_required
+@condition_on_data_version
+async def get_portfolio(request):
+    """
+    API del portafolio de inversiones: valor en el tiempo, retorno ponderado
+    por tiempo y distribución por tipo. Acepta ?start_date=YYYY-MM-DD&end_date=YYYY-MM-DD
+    (por defecto, el último año).
+    """
+    user = await request.auser()
+    today = timezone.localdate()
+    end_date = _parse_date_param(request.GET.get('end_date'), today)
+    start_date = _parse_date_param(request.GET.get('start_date'), end_date - timedelta(days=PORTFOLIO_SUMMARY_DAYS))
+    if start_date > end_date:
+        return JsonResponse({'success': False, 'error': 'Rango no válido'}, status=400)
+    
+    data = await sync_to_async(_cached_portfolio)(user, start_date, end_date)
+    return FastJsonResponse({'success': True, **data})
+
+@login_required
+def get_transactions_page(request):
+    """
+    API con una página del listado de transacciones (para scroll infinito).
+    Acepta los mismos filtros que la vista `transactions` más ?cursor= y ?page_size=
+    """
+    transactions_list, filters, filter_errors = filter_transactions(
+        Transaction.objects.filter(user=request.user), request.GET
+    )
+    if filter_errors:
+        return JsonResponse({'success': False, 'error': filter_errors[0]}, status=400)
+    
+    page_size = parse_page_size(request.GET.get('page_size'))
+    try:
+        page = paginate(with_list_columns(transactions_list), request.GET.get('cursor'), page_size,
+                        ordering_for(filters))
+    except InvalidCursor as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+    
+    results = [
+        {
+            'id': transaction.id,
+            'date': transaction.date.strftime('%Y-%m-%d'),
+            'description': transaction.description,
+            'transaction_type': transaction.transaction_type,
+            'amount': float(transaction.amount),
+            'category': {
+                'id': transaction.category.id,
+                'name': transaction.category.name,
+                'color': transaction.category.color,
+                'icon': transaction.category.icon,
+            },
+        }
+        for transaction in page
+    ]
+    
+    return JsonResponse({
+        'success': True,
+        'results': results,
+        'next_cursor': page.next_cursor,
+        'next_url': _page_url(request, filters, page_size, page.next_cursor) if page.has_next else None,
+    })
+
+# Filas por lote al recorrer el cursor del servidor durante la exportación
+EXPORT_CHUNK_SIZE = 2000
+
+class Echo:
+    """Objeto tipo archivo que devuelve lo que se le escribe (para csv.writer en streaming)."""
+    def write(self, value):
+        return value
+
+def _export_line(writer, row, username):
+    date, description, category_name, type_label, amount = row
+    return writer.writerow([
+        date.strftime('%d/%m/%Y'),
+        description,
+        category_name,
+        type_label,
+        str(amount),
+        username
+    ])
+
+def export_rows(transactions, username):
+    """Genera las líneas CSV una a una sin cargar el queryset completo en memoria."""
+    writer = csv.writer(Echo())
+    
+    yield writer.writerow(EXPORT_HEADER)
+    
+    for row in export_values(transactions, EXPORT_CHUNK_SIZE):
+        yield _export_line(writer, row, username)
+
+async def aexport_rows(transactions, username):
+    """Versión async de export_rows, para servir el CSV en streaming bajo ASGI."""
+    writer = csv.writer(Echo())
+    
+    yield writer.writerow(EXPORT_HEADER)
+    
+    async for row in aexport_values(transactions, EXPORT_CHUNK_SIZE):
+        yield _export_line(writer, row, username)
+
 @login_required
 def export_transactions(request):
     """
-    Vista para exportar transacciones a CSV
+    Vista para exportar transacciones a CSV.
+    Respeta los mismos filtros que `transactions` (type, category, start_date, end_date, q)
+    y envía el archivo en streaming con un cursor del lado del servidor. Bajo ASGI el
+    contenido es un iterador async: Django cargaría uno sync completo en memoria.
     """
-    from django.http import HttpResponse
-    import csv
+    transactions = export_queryset(request.user, request.GET)
+    rows = aexport_rows if isinstance(request, ASGIRequest) else export_rows
     
-    # Crear respuesta CSV
-    response = HttpResponse(content_type='text/csv')
+    response = StreamingHttpResponse(
+        rows(transactions, request.user.username),
+        content_type='text/csv'
+    )
     response['Content-Disposition'] = 'attachment; filename="transacciones.csv"'
+    return response
+
+
+# Trabajos recientes que se muestran en la página de exportaciones
+EXPORT_JOBS_SHOWN = 20
+
+def _export_job_data(job):
+    return {
+        'id': job.id,
+        'status': job.status,
+        'status_display': job.get_status_display(),
+        'progress': job.progress,
+        'processed_rows': job.processed_rows,
+        'total_rows': job.total_rows,
+        'error': job.error,
+        'download_url': reverse('download_export', args=[job.id]) if job.status == 'DONE' else None,
+    }
+
+@login_required
+def export_jobs(request):
+    """
+    Exportaciones en segundo plano: encola una nueva (POST con file_format y los
+    filtros del listado) y muestra las recientes con su avance.
+    """
+    if request.method == 'POST':
+        file_format = request.POST.get('file_format', '')
+        if file_format in available_export_formats():
+            create_export_job(request.user, file_format, request.POST)
+            messages.success(request, '✅ Exportación en cola. Podrás descargarla aquí cuando esté lista.')
+        else:
+            messages.error(request, '❌ Formato de exportación no disponible.')
+        return redirect('export_jobs')
+    
+    jobs = list(ExportJob.objects.filter(user=request.user)[:EXPORT_JOBS_SHOWN])
+    return render(request, 'finances/export_jobs.html', {
+        'jobs': jobs,
+        'has_active_jobs': any(not job.is_finished for job in jobs),
+    })
+
+@login_required
+def export_job_status(request, job_id):
+    """API con el estado y el avance de una exportación (para actualizar la página sin recargar)."""
+    job = get_object_or_404(ExportJob, id=job_id, user=request.user)
+    return JsonResponse({'success': True, 'job': _export_job_data(job)})
+
+@login_required
+def download_export(request, job_id):
+    """Descarga el archivo de una exportación terminada (solo su dueño)."""
+    job = get_object_or_404(ExportJob, id=job_id, user=request.user, status='DONE')
+    if not job.file or not job.file.storage.exists(job.file.name):
+        raise Http404("El archivo de la exportación ya no está disponible")
+    extension, content_type, _ = EXPORT_FORMATS[job.file_format]
+    return FileResponse(job.file.open('rb'), as_attachment=True, filename=f'transacciones.{extension}',
+                        content_type=content_type)
+
+
+@login_required
+def import_transactions(request):
+    """
+    Vista para importar transacciones desde un archivo CSV u OFX
+    """
+    result = None
     
-    writer = csv.writer(response)
+    if request.method == 'POST':
+        form = ImportTransactionsForm(request.POST, request.FILES)
+        if form.is_valid():
+            upload = form.cleaned_data['file']
+            file_format = form.cleaned_data['file_format'] or detect_format(upload.name)
+            try:
+                result = run_import(request.user, upload.file, file_format)
+            except InvalidImportFile as e:
+                messages.error(request, f'❌ {e}')
+            else:
+                if result.created:
+                    messages.success(request, f'✅ {result.created} transacciones importadas exitosamente.')
+                if result.has_errors:
+                    messages.warning(request, f'{result.error_count} filas no se pudieron importar.')
+    else:
+        form = ImportTransactionsForm()
     
-    # Escribir encabezados
-    writer.writerow(['Fecha', 'Descripción', 'Categoría', 'Tipo', 'Monto', 'Usuario'])
+    return render(request, 'finances/import_transactions.html', {'form': form, 'result': result})
+
+
+def _parse_month_param(value, default):
+    """Convierte un parámetro AAAA-MM en el primer día de ese mes; si no es válido, usa `default`."""
+    try:
+        return datetime.strptime(value or '', '%Y-%m').date()
+    except ValueError:
+        return default
+
+@login_required
+def budgets(request):
+    """
+    Presupuestos: alta y lista, más el resumen presupuesto contra gasto real
+    por categoría para un rango de meses (?start_month=AAAA-MM&end_month=AAAA-MM).
+    """
+    if request.method == 'POST':
+        form = BudgetForm(request.user, request.POST)
+        if form.is_valid():
+            form.save()
+            messages.success(request, '✅ Presupuesto creado exitosamente.')
+            return redirect(request.get_full_path())
+        messages.error(request, '❌ Por favor corrige los errores en el formulario.')
+    else:
+        form = BudgetForm(request.user, initial={'month': month_start(timezone.now())})
+    
+    current_month = month_start(timezone.now())
+    start_month = _parse_month_param(request.GET.get('start_month'), current_month)
+    end_month = _parse_month_param(request.GET.get('end_month'), start_month)
+    if end_month < start_month:
+        start_month, end_month = end_month, start_month
+    
+    overview = budget_overview(request.user, start_month, end_month)
+    budget_list = (
+        Budget.objects
+        .filter(user=request.user, month__gte=start_month, month__lte=end_month)
+        .select_related('category')
+        .order_by('-month', 'category__name')
+    )
+    
+    context = {
+        'form': form,
+        'overview': overview,
+        'alerts': [row for row in overview if row['over_limit'] or row['over_budget']],
+        'budgets': budget_list,
+        'totals': {
+            'allocated': sum((row['allocated'] for row in overview), Decimal('0')),
+            'spent': sum((row['spent'] for row in overview), Decimal('0')),
+        },
+        'start_month': start_month,
+        'end_month': end_month,
+    }
+    context['totals']['remaining'] = context['totals']['allocated'] - context['totals']['spent']
     
-    # Obtener transacciones
-    transactions = Transaction.objects.filter(user=request.user).order_by('-date')
+    return render(request, 'finances/budgets.html', context)
+
+@login_required
+def edit_budget(request, budget_id):
+    budget = get_object_or_404(Budget, id=budget_id, user=request.user)
     
-    # Escribir datos
-    for transaction in transactions:
-        writer.writerow([
-            transaction.date.strftime('%d/%m/%Y'),
-            transaction.description or '',
-            transaction.category.name,
-            transaction.get_transaction_type_display(),
-            str(transaction.amount),
-            transaction.user.username
-        ])
+    if request.method == 'POST':
+        form = BudgetForm(request.user, request.POST, budget=budget)
+        if form.is_valid():
+            budget = form.save()
+            messages.success(request, '✅ Presupuesto actualizado exitosamente.')
+            return redirect(f"{reverse('budgets')}?start_month={budget.month:%Y-%m}")
+        messages.error(request, '❌ Por favor corrige los errores en el formulario.')
+    else:
+        form = BudgetForm(request.user, budget=budget)
     
-    return response   
\ No newline at end of file
+    return render(request, 'finances/edit_budget.html', {'form': form, 'budget': budget})
+
+@login_required
+def delete_budget(request, budget_id):
+    budget = get_object_or_404(Budget, id=budget_id, user=request.user)
+    if request.method == 'POST':
+        budget.delete()
+        messages.success(request, 'Presupuesto eliminado exitosamente.')
+    return redirect('budgets')
+
+
+@staff_member_required
+def instrumentation_metrics(request):
+    """
+    Métricas acumuladas por QueryInstrumentationMiddleware en este proceso
+    (consultas, tiempos y consultas repetidas por nombre de URL).
+    ?reset=1 vacía los contadores después de leerlos.
+    """
+    data = {
+        'enabled': getattr(settings, 'FINANCES_INSTRUMENTATION', False),
+        'views': instrumentation_registry.snapshot(),
+    }
+    if request.GET.get('reset'):
+        instrumentation_registry.reset()
+    return JsonResponse(data)
@@ -2,6 +2,9 @@
 ASGI config for home_finance project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+The JSON chart APIs are async views; serve them with
+``uvicorn home_finance.asgi:application``. The CSV export switches to an
+async iterator under ASGI so it keeps streaming instead of being buffered.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
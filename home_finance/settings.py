@@ -39,6 +39,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'finances',
     'crispy_forms',
     'crispy_bootstrap5',
@@ -60,8 +61,17 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'finances.middleware.QueryInstrumentationMiddleware',
 ]
 
+# Instrumentación por petición: consultas, tiempo SQL, consultas repetidas,
+# render de plantillas y tiempo total por vista (encabezado Server-Timing,
+# log rotativo y /api/metrics/). Sin efecto si está desactivada.
+FINANCES_INSTRUMENTATION = config('FINANCES_INSTRUMENTATION', default=DEBUG, cast=bool)
+# Veces que debe repetirse una consulta para reportarla como duplicada
+FINANCES_DUPLICATE_QUERY_THRESHOLD = config('FINANCES_DUPLICATE_QUERY_THRESHOLD', default=2, cast=int)
+FINANCES_INSTRUMENTATION_LOG = config('FINANCES_INSTRUMENTATION_LOG', default=str(BASE_DIR / 'logs' / 'instrumentation.log'))
+
 ROOT_URLCONF = 'home_finance.urls'
 
 TEMPLATES = [
@@ -98,6 +108,71 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+# Memoria local por defecto (un proceso). Con varios procesos de servidor usar
+# 'file' o 'db' para que la invalidación llegue a todos ('db' requiere
+# ejecutar `python manage.py createcachetable`).
+
+CACHE_BACKEND = config('CACHE_BACKEND', default='locmem')
+
+CACHE_BACKENDS = {
+    'locmem': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'home-finance',
+    },
+    'file': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': config('CACHE_LOCATION', default=str(BASE_DIR / 'cache')),
+    },
+    'db': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': config('CACHE_LOCATION', default='finances_cache'),
+    },
+}
+
+CACHES = {
+    'default': CACHE_BACKENDS[CACHE_BACKEND],
+}
+
+# Segundos que vive una entrada de la caché por usuario (se invalida antes si cambian los datos)
+FINANCES_CACHE_TIMEOUT = config('FINANCES_CACHE_TIMEOUT', default=3600, cast=int)
+
+# Días que se conservan las exportaciones terminadas (manage.py run_export_worker las purga)
+FINANCES_EXPORT_RETENTION_DAYS = config('FINANCES_EXPORT_RETENTION_DAYS', default=7, cast=int)
+
+
+# Logging
+# https://docs.djangoproject.com/en/4.2/topics/logging/
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'instrumentation': {
+            'format': '%(asctime)s %(levelname)s %(message)s',
+        },
+    },
+    'handlers': {
+        'instrumentation_file': {
+            'class': 'finances.instrumentation.RotatingFileHandler',
+            'filename': FINANCES_INSTRUMENTATION_LOG,
+            'maxBytes': 5 * 1024 * 1024,
+            'backupCount': 5,
+            'encoding': 'utf-8',
+            'formatter': 'instrumentation',
+        },
+    },
+    'loggers': {
+        'finances.instrumentation': {
+            'handlers': ['instrumentation_file'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 